@@ -1,79 +1,400 @@
 # app.py
 
 import os
-from flask import Flask, request, jsonify, send_from_directory, redirect, url_for, session, Response
+from flask import Blueprint, Flask, request, jsonify, redirect, url_for, session, Response, g
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 import uuid
 import requests
 import traceback
 import zipfile
-import io
-
-from config import ML_API_BASE_URL, WATERMARK_LOGO_PATH
-from PIL import Image, ImageOps
-from r2_storage import upload_to_r2, list_objects, get_object_url, delete_from_r2, get_object_bytes
+import json
+import hashlib
+import time
+import tempfile
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from config import (
+    ML_API_BASE_URL,
+    WATERMARK_LOGO_PATH,
+    R2_LISTING_CONCURRENCY,
+    PHOTO_PAGE_MAX_LIMIT,
+    EVENT_LISTING_MAX_AGE,
+    EVENT_LISTING_SHARED_MAX_AGE,
+    BULK_MAX_ROWS,
+    REFERENCE_PHOTO_FACE_CROP,
+    REFERENCE_PHOTO_LEGACY_MAX_BYTES,
+    UPLOAD_DUPLICATE_POLICY,
+    DUPLICATE_HAMMING_THRESHOLD,
+    DUPLICATE_SCAN_BATCH,
+    UPLOAD_KEY_MODE,
+    DIRECT_UPLOADS_ENABLED,
+    DIRECT_UPLOAD_MAX_BYTES,
+    DIRECT_UPLOAD_URL_EXPIRY_SECONDS,
+    R2_MULTIPART_PART_SIZE,
+    R2_MULTIPART_CONCURRENCY,
+    UPLOAD_SESSION_MAX_BYTES,
+    ALBUM_DELETE_CHUNK_SIZE,
+    RENDITION_SIZES,
+    READ_YOUR_WRITES_SECONDS,
+)
+from PIL import Image
+from r2_storage import upload_to_r2, upload_bytes_to_r2, list_objects, get_object_url, delete_from_r2, get_object_bytes
+from r2_storage import (
+    head_object,
+    presigned_put_url,
+    presigned_part_url,
+    create_multipart_upload,
+    complete_multipart_upload,
+    abort_multipart_upload,
+    get_content_type,
+    list_all_objects,
+    delete_objects_bulk,
+    copy_objects_bulk,
+    list_objects_page,
+    upload_parts,
+    list_parts,
+)
 from db import (
     add_user,
     get_user,
+    get_user_credentials,
     get_user_by_email,
     add_album,
     grant_album_access,
+    grant_album_access_bulk,
+    add_users_bulk,
     create_or_get_google_user,
     get_accessible_albums_for_user,
     get_albums_for_photographer,
     update_user_reference_photo,
+    replace_user_reference_photo,
     update_user_password,
     init_db,
     delete_album,
+    begin_request_scope,
+    end_request_scope,
+    request_wrote,
+    release_connection,
+    transaction,
+    set_album_stats,
+    record_photos_added,
+    record_photos_removed,
+    get_pool_stats,
+    add_photos,
+    get_album_photo_index,
+    delete_photos_by_keys,
+    record_renditions,
+    get_rendition_sizes,
+    claim_upload_request,
+    complete_upload_request,
+    release_upload_request,
+    create_upload_session,
+    get_upload_session,
+    touch_upload_session,
+    close_upload_session,
+    expire_upload_sessions,
+    start_album_deletion,
+    get_album_deletion,
+    get_deleting_album_slugs,
+    claim_album_deletion,
+    record_album_deletion_progress,
+    finish_album_deletion,
+    get_stalled_album_deletions,
+    get_album_access_usernames,
 )
 from auth import create_token, verify_token, authenticate_user
+import metrics
+import profiling
+import memory
+import imaging
+import compression
+from static_assets import StaticAssets
+import image_pool
+from image_pool import ImagePoolBusy
+from jobs import JobRunner
+from duplicates import find_matches, group_duplicates
+from embeddings import embedding_file_name, merge_documents, rewrite_urls
+from listings import LISTING_FORMATS, compact_photo_listing, full_photo_entries, originals_prefix
+from renditions import (
+    complete_sizes,
+    rendition_keys,
+    rendition_prefix,
+    rendition_urls,
+    rendition_urls_for_key,
+    upload_renditions,
+)
 
-app = Flask(__name__, static_folder='frontend')
-app.secret_key = os.environ.get("FLASK_SECRET_KEY", "super-secret-key-for-flask-session")
-CORS(app)
-
-# Ensure database tables are created when the application starts.
-init_db()
+# Routes, request hooks and CLI commands are registered on this blueprint;
+# create_app() builds the Flask app around it.
+bp = Blueprint('main', __name__, cli_group=None)
+static_assets = StaticAssets(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend'))
 
+# Legacy reference photos were kept here before they moved to R2; it is only
+# read as a fallback, never created.
 UPLOAD_FOLDER = 'uploads'
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
+
+
+def create_app():
+    """Build the Flask app.
+
+    Importing this module does no I/O: R2 and database clients are created on
+    first use, and tables are created by ``flask --app app init-db``.
+    """
+    app = Flask(__name__, static_folder=None)
+    app.secret_key = os.environ.get("FLASK_SECRET_KEY", "super-secret-key-for-flask-session")
+    CORS(app)
+    app.register_blueprint(bp)
+    job_runner.init_app(app)
+    static_assets.load()
+    return app
+
+
+def __getattr__(name):
+    # ``app`` is built on first access, so ``gunicorn app:app`` and
+    # ``flask --app app`` work without every import paying for it.
+    if name == 'app':
+        globals()['app'] = create_app()
+        return globals()['app']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Cookie holding the end (epoch seconds) of a client's read-your-writes window
+READ_YOUR_WRITES_COOKIE = 'rw_until'
+
+
+@bp.before_app_request
+def _open_db_scope():
+    # db.py helpers share one lazily-opened session for the whole request.
+    # A client that wrote recently, through any worker, reads the primary.
+    try:
+        recent_write = float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+    except ValueError:
+        recent_write = False
+    g.db_scope_token = begin_request_scope(primary_only=recent_write)
+
+
+@bp.before_app_request
+def _start_request_timer():
+    g.metrics_route = request.url_rule.rule if request.url_rule else "unmatched"
+    g.metrics_route_token = metrics.set_route(g.metrics_route)
+    g.metrics_start = time.perf_counter()
+
+
+@bp.before_app_request
+def _maybe_start_profiler():
+    g.profiler = profiling.start(request.headers.get(profiling.PROFILE_HEADER))
+
+
+# Endpoints that decode images or build archives; their peak memory is
+# tracked and they are refused while the worker is over its soft limit.
+MEMORY_TRACKED_ENDPOINTS = {
+    'main.upload_single_file_route',
+    'main.download_photo',
+    'main.download_photos_as_zip',
+    'main.signup',
+    'main.finalize_google_signup',
+    'main.update_profile_photo',
+    'main.vip_register',
+    'main.vip_update_photo',
+    'main.find_my_photos',
+}
+
+
+def over_memory_budget_response(message):
+    response = jsonify({"error": message, "code": "over_memory_budget"})
+    response.status_code = 503
+    response.headers['Retry-After'] = '30'
+    return response
+
+
+@bp.before_app_request
+def _start_memory_tracking():
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    if request.endpoint not in MEMORY_TRACKED_ENDPOINTS:
+        return None
+    if memory.over_soft_limit():
+        print(f"[memory] request_id={g.request_id} route={g.metrics_route} refused: worker over soft limit")
+        return over_memory_budget_response("Server is busy, please retry shortly.")
+    g.memory_tracker = memory.start(g.metrics_route)
+    return None
+
+
+@bp.app_errorhandler(memory.OverBudget)
+def _handle_over_budget(exc):
+    print(f"[memory] request_id={g.get('request_id')} route={g.get('metrics_route')} rejected: {exc}")
+    return over_memory_budget_response(str(exc))
+
+
+@bp.app_errorhandler(ImagePoolBusy)
+def _handle_image_pool_busy(exc):
+    print(f"[image_pool] request_id={g.get('request_id')} route={g.get('metrics_route')} rejected: {exc}")
+    response = jsonify({"error": str(exc), "code": "image_pool_busy"})
+    response.status_code = 503
+    response.headers['Retry-After'] = '5'
+    return response
+
+
+@bp.app_errorhandler(BrokenProcessPool)
+def _handle_image_pool_broken(exc):
+    # The pool is recreated on the next job, so a retry will usually succeed
+    print(f"[image_pool] request_id={g.get('request_id')} route={g.get('metrics_route')} worker died: {exc}")
+    response = jsonify({"error": "Image processing was interrupted, please retry shortly.", "code": "image_pool_broken"})
+    response.status_code = 503
+    response.headers['Retry-After'] = '5'
+    return response
+
+
+@bp.after_app_request
+def _mark_recent_write(response):
+    if request_wrote():
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE,
+            f"{time.time() + READ_YOUR_WRITES_SECONDS:.0f}",
+            max_age=int(READ_YOUR_WRITES_SECONDS) or 1,
+            httponly=True,
+            samesite='Lax',
+        )
+    return response
+
+
+@bp.after_app_request
+def _set_request_id_header(response):
+    request_id = g.get('request_id')
+    if request_id:
+        response.headers['X-Request-ID'] = request_id
+    return response
+
+
+@bp.after_app_request
+def _remember_response_status(response):
+    # Observed in teardown, which also runs when no response reached this hook
+    g.metrics_status = response.status_code
+    return response
+
+
+@bp.after_app_request
+def _compress_json_response(response):
+    return compression.compress_response(response, request.accept_encodings)
+
+
+@bp.teardown_app_request
+def _record_request_timing(exc):
+    # Runs even when a handler or hook raised, so those 500s are counted too
+    start = g.pop('metrics_start', None)
+    if start is not None:
+        status = 500 if exc is not None else g.get('metrics_status', 500)
+        metrics.observe_request(g.metrics_route, request.method, status, time.perf_counter() - start)
+
+
+@bp.teardown_app_request
+def _close_db_scope(_exc):
+    token = g.pop('db_scope_token', None)
+    if token is not None:
+        end_request_scope(token)
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiling.finish(profiler, g.get('metrics_route', 'unmatched'))
+    tracker = g.pop('memory_tracker', None)
+    if tracker is not None:
+        memory.stop(tracker)
+        metrics.observe_peak_memory(tracker.label, tracker.peak_delta)
+        print(
+            f"[memory] request_id={g.get('request_id')} route={tracker.label} "
+            f"peak_delta={tracker.peak_delta / 1048576:.1f}MiB peak_rss={tracker.peak / 1048576:.1f}MiB"
+        )
+    route_token = g.pop('metrics_route_token', None)
+    if route_token is not None:
+        metrics.reset_route(route_token)
+
+
+def _pool_metrics():
+    stats = get_pool_stats()
+    for attr, help_text in (
+        ("checkedout", "Connections currently checked out of the pool."),
+        ("checkedin", "Idle connections held by the pool."),
+        ("overflow", "Connections opened beyond the pool size."),
+    ):
+        samples = [((("engine", entry["engine"]),), entry[attr]) for entry in stats if attr in entry]
+        yield f"faceapp_db_pool_{attr}", "gauge", help_text, samples
+
+
+metrics.registry.register_collector(_pool_metrics)
+
+
+def _image_pool_metrics():
+    yield "faceapp_image_pool_pending_jobs", "gauge", "Image jobs queued or running in the process pool.", [((), image_pool.pending_jobs())]
+
+
+metrics.registry.register_collector(_image_pool_metrics)
+
+
+# Background jobs run inside an app context (set by create_app) so they can
+# use the same helpers
+job_runner = JobRunner()
+
+
+def _job_metrics():
+    yield "faceapp_jobs", "gauge", "Background jobs queued or running in this worker, by status.", [
+        ((("status", status),), count) for status, count in job_runner.counts().items()
+    ]
+
+
+metrics.registry.register_collector(_job_metrics)
+
+
+# Shared, bounded pool for fanning out R2 listings across requests.
+r2_listing_pool = ThreadPoolExecutor(max_workers=R2_LISTING_CONCURRENCY, thread_name_prefix="r2-list")
+
+
+def album_stats_from_r2(photographer, album_id):
+    """Count an album's photos in R2 and pick its cover key."""
+    all_files = list_objects(f"event_albums/{photographer}/{album_id}/")
+    actual_photos = [obj for obj in all_files if not obj.endswith('/') and not obj.endswith('.placeholder')]
+    return len(actual_photos), (actual_photos[0] if actual_photos else None)
+
+
+DUPLICATE_POLICIES = ('keep', 'skip', 'replace')
+UPLOAD_KEY_MODES = ('uuid', 'content')
+
+
+def fingerprint_r2_photo(key):
+    """Index row for a photo already in R2, or None if it could not be read."""
+    photo_bytes, _content_type, _error = get_object_bytes(key)
+    if photo_bytes is None:
+        return None
+    try:
+        fingerprint = image_pool.run(imaging.fingerprint, photo_bytes)
+    except Exception as exc:
+        print(f"Warning: could not fingerprint {key}: {exc}")
+        return None
+    return {
+        "object_key": key,
+        "filename": key.split('/')[-1].split('_', 1)[-1],
+        "content_hash": fingerprint.content_hash,
+        "phash": fingerprint.phash,
+        "size_bytes": len(photo_bytes),
+        "width": fingerprint.width,
+        "height": fingerprint.height,
+    }
+
+
+def vip_username_for(name):
+    """Generate a unique username from a display name."""
+    base_username = name.lower().replace(' ', '_').replace('.', '')[:20]
+    return f"{base_username}_{uuid.uuid4().hex[:6]}"
+
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in {'png', 'jpg', 'jpeg', 'gif', 'heic'}
 
 
-def apply_watermark(image_path, logo_path=WATERMARK_LOGO_PATH):
-    """Apply watermark logo to top-right corner of image."""
-    try:
-        # Load and fix EXIF rotation
-        base_image = Image.open(image_path)
-        base_image = ImageOps.exif_transpose(base_image)
-        base_image = base_image.convert("RGBA")
-        
-        # Load logo
-        logo = Image.open(logo_path).convert("RGBA")
-        
-        # Resize logo to 1/8th of image width
-        base_width, base_height = base_image.size
-        logo_width = base_width // 10
-        logo_ratio = logo_width / logo.width
-        logo_height = int(logo.height * logo_ratio)
-        logo = logo.resize((logo_width, logo_height), Image.LANCZOS)
-        
-        # Position: top-right corner
-        position = (base_width - logo.width, 0)
-        
-        # Paste logo
-        base_image.paste(logo, position, logo)
-        
-        # Save result (overwrite original)
-        base_image.convert("RGB").save(image_path, quality=95)
-        return True
-    except Exception as e:
-        print(f"Watermark error: {e}")
-        return False
+def ml_post(endpoint, **kwargs):
+    """POST to the ML service, timed as an ``ml.<endpoint>`` stage."""
+    with metrics.stage(f"ml.{endpoint.strip('/')}"):
+        return requests.post(f"{ML_API_BASE_URL}{endpoint}", **kwargs)
 
 
 def _local_reference_photo_path(ref_photo_path: str) -> str:
@@ -88,7 +409,8 @@ def reference_photo_exists(ref_photo_path: str) -> bool:
 
     ref_photo_url = get_object_url(ref_photo_path)
     try:
-        head_response = requests.head(ref_photo_url, timeout=10)
+        with metrics.stage("r2.head_reference_photo"):
+            head_response = requests.head(ref_photo_url, timeout=10)
         if head_response.status_code == 200:
             content_type = head_response.headers.get("Content-Type", "").lower()
             if "image" in content_type:
@@ -115,7 +437,8 @@ def fetch_reference_photo_bytes(ref_photo_path: str):
 
     ref_photo_url = get_object_url(ref_photo_path)
     try:
-        response = requests.get(ref_photo_url, timeout=30)
+        with metrics.stage("r2.fetch_reference_photo"):
+            response = requests.get(ref_photo_url, timeout=30)
         response.raise_for_status()
         content_type = response.headers.get("Content-Type", "").lower()
         if "image" not in content_type:
@@ -141,9 +464,68 @@ def fetch_reference_photo_bytes(ref_photo_path: str):
             error_message = str(exc)
         return None, error_message
 
+def detect_reference_face(photo_bytes):
+    """Ask the ML service for the largest face in a reference photo.
+
+    Expects ``{"faces": [{"bbox": [x1, y1, x2, y2], ...}]}`` in pixels of the
+    photo sent; returns the box or None.
+    """
+    try:
+        response = ml_post(
+            "detect_faces/",
+            files={"file": ("reference_image.jpg", photo_bytes, "image/jpeg")},
+            timeout=30
+        )
+        response.raise_for_status()
+        faces = response.json().get("faces") or []
+    except (requests.exceptions.RequestException, ValueError, AttributeError) as e:
+        print(f"Warning: Face detection failed for reference photo: {e}")
+        return None
+    boxes = [face.get("bbox") for face in faces if isinstance(face, dict) and len(face.get("bbox") or []) == 4]
+    if not boxes:
+        return None
+    return max(boxes, key=lambda box: (box[2] - box[0]) * (box[3] - box[1]))
+
+
+def normalize_reference_photo_bytes(photo_bytes, face_crop=REFERENCE_PHOTO_FACE_CROP):
+    """Auto-orient, downscale and re-encode a reference photo as JPEG.
+
+    With ``face_crop`` the result is also cropped to the detected face.
+    Returns ``(bytes, normalized)``; photos Pillow cannot decode (e.g. HEIC)
+    are returned unchanged with ``normalized`` False.  Pool and memory budget
+    errors propagate to their error handlers.
+    """
+    try:
+        with metrics.stage("image.normalize_reference"):
+            normalized = image_pool.run(imaging.normalize_reference_photo, photo_bytes)
+    except (OSError, ValueError, SyntaxError) as e:
+        print(f"Warning: Could not decode reference photo, storing it as uploaded: {e}")
+        return photo_bytes, False
+
+    if face_crop:
+        face_box = detect_reference_face(normalized)
+        if face_box:
+            with metrics.stage("image.crop_reference"):
+                normalized = image_pool.run(imaging.crop_to_face, normalized, face_box)
+    return normalized, True
+
+
+def store_reference_photo(username, photo_file):
+    """Normalize an uploaded reference photo and store it under user_profiles/.
+
+    Returns ``(success, r2_path, public_url)``.
+    """
+    photo_bytes, normalized = normalize_reference_photo_bytes(photo_file.read())
+    filename = secure_filename(photo_file.filename)
+    if normalized:
+        filename = f"{os.path.splitext(filename)[0] or 'reference'}.jpg"
+    r2_path = f"user_profiles/{username}/{uuid.uuid4()}_{filename}"
+    upload_success, public_url = upload_bytes_to_r2(photo_bytes, r2_path, 'image/jpeg' if normalized else None)
+    return upload_success, r2_path, public_url
+
 # --- Google OAuth Placeholder Endpoints ---
 
-@app.route('/api/auth/google/login')
+@bp.route('/api/auth/google/login')
 def google_login():
     """
     (Placeholder) Initiates the Google OAuth 2.0 flow.
@@ -151,7 +533,7 @@ def google_login():
     """
     return jsonify({"message": "This is a placeholder for Google login. In a real app, you'd be redirected to Google."})
 
-@app.route('/api/auth/google/callback')
+@bp.route('/api/auth/google/callback')
 def google_callback():
     """
     (Placeholder) Handles the callback from Google after user consent.
@@ -176,30 +558,42 @@ def google_callback():
 
 
 # --- Static File Serving & Routes ---
-@app.route('/')
+# Files are served from the in-memory manifest built at startup
+def static_response(path):
+    response = static_assets.response(path, request)
+    if response is None:
+        return jsonify({"error": "Not found"}), 404
+    return response
+
+@bp.route('/')
 def index():
-    return send_from_directory('frontend', 'index.html')
+    return static_response('index.html')
 
-@app.route('/google_signup_finalize.html')
+@bp.route('/google_signup_finalize.html')
 def google_signup_finalize_page():
-    return send_from_directory('frontend', 'google_signup_finalize.html')
+    return static_response('google_signup_finalize.html')
 
-@app.route('/event.html')
+@bp.route('/event.html')
 def event_page():
-    return send_from_directory('frontend', 'event.html')
+    return static_response('event.html')
 
-@app.route('/admin')
+@bp.route('/admin')
 def admin_page():
     return redirect('/login.html')
 
-@app.route('/<path:path>')
+@bp.route('/frontend/<path:path>')
+def serve_frontend_prefixed(path):
+    # Pages link the logo as frontend/uploads/...
+    return static_response(path)
+
+@bp.route('/<path:path>')
 def serve_static(path):
-    if os.path.exists(os.path.join(app.static_folder, path)):
-        return send_from_directory('frontend', path)
-    return send_from_directory('frontend', 'index.html')
+    if path.startswith('api/'):
+        return jsonify({"error": "Not found"}), 404
+    return static_response(path)
 
 # --- API Endpoints ---
-@app.route('/api/auth/login', methods=['POST'])
+@bp.route('/api/auth/login', methods=['POST'])
 def login():
     data = request.get_json()
     username = data.get('username')
@@ -218,7 +612,7 @@ def login():
         })
     return jsonify({"error": "Invalid credentials"}), 401
 
-@app.route('/api/auth/signup', methods=['POST'])
+@bp.route('/api/auth/signup', methods=['POST'])
 def signup():
     if 'username' not in request.form or 'password' not in request.form:
         return jsonify({"error": "Username and password are required."}), 400
@@ -232,14 +626,7 @@ def signup():
     if not (username and password and ref_photo and allowed_file(ref_photo.filename)):
         return jsonify({"error": "Invalid form data or file type."}), 400
         
-    filename = secure_filename(ref_photo.filename)
-    unique_name = f"{uuid.uuid4()}_{filename}"
-    local_path = os.path.join(UPLOAD_FOLDER, unique_name)
-    ref_photo.save(local_path)
-    
-    r2_path = f"user_profiles/{username}/{unique_name}"
-    upload_success, _public_url = upload_to_r2(local_path, r2_path)
-    os.remove(local_path)
+    upload_success, r2_path, _public_url = store_reference_photo(username, ref_photo)
     
     if not upload_success:
         return jsonify({"error": "Could not save reference photo."}), 500
@@ -252,7 +639,7 @@ def signup():
         
     return jsonify({"message": "User registered successfully!"}), 201
 
-@app.route('/api/auth/google/finalize', methods=['POST'])
+@bp.route('/api/auth/google/finalize', methods=['POST'])
 def finalize_google_signup():
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
     if not token:
@@ -270,14 +657,7 @@ def finalize_google_signup():
         return jsonify({"valid": False, "error": str(e)}), 401
 
     ref_photo = request.files['ref_photo']
-    filename = secure_filename(ref_photo.filename)
-    unique_name = f"{uuid.uuid4()}_{filename}"
-    local_path = os.path.join(UPLOAD_FOLDER, unique_name)
-    ref_photo.save(local_path)
-    
-    r2_path = f"user_profiles/{username}/{unique_name}"
-    upload_to_r2(local_path, r2_path)
-    os.remove(local_path)
+    _upload_success, r2_path, _public_url = store_reference_photo(username, ref_photo)
     
     if update_user_reference_photo(username, r2_path, role='attendee'):
         user = get_user(username)
@@ -293,7 +673,7 @@ def finalize_google_signup():
         return jsonify({"error": "User not found."}), 404
 
 
-@app.route('/api/auth/verify', methods=['GET'])
+@bp.route('/api/auth/verify', methods=['GET'])
 def verify_auth_token():
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
     try:
@@ -313,7 +693,7 @@ def verify_auth_token():
         return jsonify({"valid": False, "error": str(e)}), 401
 
 
-@app.route('/api/profile/photo', methods=['POST'])
+@bp.route('/api/profile/photo', methods=['POST'])
 def update_profile_photo():
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
     try:
@@ -348,26 +728,13 @@ def update_profile_photo():
     if file_size and file_size > max_bytes:
         return jsonify({"error": "File too large. Max size is 20 MB."}), 400
 
-    filename = secure_filename(avatar_file.filename)
-    unique_name = f"{uuid.uuid4()}_{filename}"
-    local_path = os.path.join(UPLOAD_FOLDER, unique_name)
-    avatar_file.save(local_path)
-
-    r2_path = f"user_profiles/{username}/{unique_name}"
-    upload_success, public_url = upload_to_r2(local_path, r2_path)
-
-    try:
-        os.remove(local_path)
-    except OSError:
-        pass
+    upload_success, r2_path, public_url = store_reference_photo(username, avatar_file)
 
     if not upload_success or not public_url:
         return jsonify({"error": "Could not upload photo."}), 500
 
-    user = get_user(username)
-    previous_path = user.ref_photo_path if user else None
-
-    if not update_user_reference_photo(username, r2_path):
+    updated, previous_path = replace_user_reference_photo(username, r2_path)
+    if not updated:
         delete_from_r2(r2_path)
         return jsonify({"error": "User not found."}), 404
 
@@ -380,7 +747,7 @@ def update_profile_photo():
     })
 
 
-@app.route('/api/profile/password', methods=['POST'])
+@bp.route('/api/profile/password', methods=['POST'])
 def update_profile_password():
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
     try:
@@ -396,11 +763,11 @@ def update_profile_password():
     if not new_password or len(new_password) < 8:
         return jsonify({"error": "New password must be at least 8 characters."}), 400
 
-    user = get_user(username)
-    if not user:
+    credentials = get_user_credentials(username)
+    if not credentials:
         return jsonify({"error": "User not found."}), 404
 
-    stored_password = user.password or ''
+    stored_password = credentials[1] or ''
     if stored_password and stored_password != current_password:
         return jsonify({"error": "Current password is incorrect."}), 400
 
@@ -412,7 +779,7 @@ def update_profile_password():
 
     return jsonify({"message": "Password updated successfully."})
 
-@app.route('/api/album/<photographer_username>/<album_id>/share', methods=['GET'])
+@bp.route('/api/album/<photographer_username>/<album_id>/share', methods=['GET'])
 def get_shareable_link(photographer_username, album_id):
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
     try:
@@ -429,7 +796,7 @@ def get_shareable_link(photographer_username, album_id):
         "full_access_link": full_access_link
     })
 
-@app.route('/api/grant-access', methods=['POST'])
+@bp.route('/api/grant-access', methods=['POST'])
 def grant_access_endpoint():
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
     try:
@@ -468,7 +835,128 @@ def grant_access_endpoint():
     return jsonify({"message": message}), 200
 
 
-@app.route('/api/attendee/albums', methods=['GET'])
+@bp.route('/api/grant-access/bulk', methods=['POST'])
+def grant_access_bulk_endpoint():
+    """Grant a list of users access to one of the photographer's albums."""
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    try:
+        payload = verify_token(token)
+        username = payload['sub']
+        if payload.get('role') != 'photographer':
+            return jsonify({"error": "Only photographers can grant album access."}), 403
+    except Exception as e:
+        return jsonify({"error": "Authentication required", "details": str(e)}), 401
+
+    data = request.get_json(silent=True) or {}
+    album_id = data.get('album_id')
+    usernames = data.get('usernames') or []
+    if not album_id or not isinstance(usernames, list) or not usernames:
+        return jsonify({"error": "album_id and a non-empty usernames list are required."}), 400
+    if len(usernames) > BULK_MAX_ROWS:
+        return jsonify({"error": f"At most {BULK_MAX_ROWS} usernames per request."}), 400
+
+    ok, message, results = grant_album_access_bulk([str(u) for u in usernames], username, album_id)
+    if not ok:
+        return jsonify({"error": message}), 404
+    return jsonify({"message": message, "results": results}), 200
+
+
+@bp.route('/api/users/bulk', methods=['POST'])
+def add_users_bulk_endpoint():
+    """Import a guest list as VIP attendees, optionally granting album access."""
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    try:
+        payload = verify_token(token)
+        username = payload['sub']
+        if payload.get('role') != 'photographer':
+            return jsonify({"error": "Only photographers can import guests."}), 403
+    except Exception as e:
+        return jsonify({"error": "Authentication required", "details": str(e)}), 401
+
+    data = request.get_json(silent=True) or {}
+    guests = data.get('users') or []
+    album_id = data.get('album_id')
+    if not isinstance(guests, list) or not guests:
+        return jsonify({"error": "A non-empty users list is required."}), 400
+    if len(guests) > BULK_MAX_ROWS:
+        return jsonify({"error": f"At most {BULK_MAX_ROWS} users per request."}), 400
+
+    rows = []
+    for guest in guests:
+        guest = guest if isinstance(guest, dict) else {}
+        name = (guest.get('name') or '').strip()
+        email = (guest.get('email') or '').strip().lower() or None
+        rows.append({
+            "username": vip_username_for(name) if name and email else None,
+            "email": email,
+            "role": "vip_attendee",
+        })
+
+    results = add_users_bulk(rows)
+
+    response = {"results": results}
+    if album_id:
+        usernames = [r["username"] for r in results if r["status"] in ("created", "exists")]
+        ok, message, grants = grant_album_access_bulk(usernames, username, album_id)
+        if not ok:
+            return jsonify({"error": message, "results": results}), 404
+        response["access"] = grants
+
+    created = sum(1 for r in results if r["status"] == "created")
+    response["message"] = f"Created {created} users."
+    return jsonify(response), 200
+
+
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+PUBLIC_LISTING_CACHE_CONTROL = (
+    f"public, max-age={EVENT_LISTING_MAX_AGE}, s-maxage={EVENT_LISTING_SHARED_MAX_AGE}, "
+    f"stale-while-revalidate={EVENT_LISTING_SHARED_MAX_AGE}"
+)
+
+
+def listing_etag(*parts):
+    """Strong ETag value for a listing, from whatever determines its content."""
+    digest = hashlib.sha256(json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str).encode())
+    return digest.hexdigest()[:32]
+
+
+def client_has_etag(etag):
+    """Whether If-None-Match names ``etag``, in any compressed variant."""
+    if_none_match = request.if_none_match
+    if if_none_match.star_tag:
+        return True
+    return any(
+        compression.strip_encoding_suffix(tag) == etag
+        for tag in if_none_match.as_set(include_weak=True)
+    )
+
+
+def conditional_json(body, etag=None, cache_control=PRIVATE_CACHE_CONTROL):
+    """jsonify a listing with an ETag, or answer 304 if the client already has it.
+
+    ``etag`` defaults to a digest of ``body``. Listings that can compute it
+    from their R2 keys pass it in, so a 304 skips serializing the body.
+    If-None-Match is compared weakly (RFC 9110) and ignoring the encoding
+    suffix, so a tag weakened by a compressing proxy still matches. Private listings vary on Authorization
+    so no shared cache hands one user's albums to another.
+    """
+    etag = etag or listing_etag(body)
+    if client_has_etag(etag):
+        # The same representation ETag and Vary as the 200, which gets them
+        # from compression.compress_response
+        response = Response(status=304)
+        response.set_etag(compression.representation_etag(etag, request.accept_encodings))
+        response.vary.add('Accept-Encoding')
+    else:
+        response = jsonify(body)
+        response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    if cache_control == PRIVATE_CACHE_CONTROL:
+        response.vary.add('Authorization')
+    return response
+
+
+@bp.route('/api/attendee/albums', methods=['GET'])
 def get_attendee_albums():
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
     try:
@@ -477,33 +965,43 @@ def get_attendee_albums():
     except Exception as e:
         return jsonify({"error": "Authentication required", "details": str(e)}), 401
 
-    accessible_albums = get_accessible_albums_for_user(attendee_username)
+    accessible_albums = [
+        album for album in get_accessible_albums_for_user(attendee_username)
+        if album.get("photographer") and album.get("album_id")
+    ]
+
+    # Albums whose counters were never reconciled are checked in R2 concurrently,
+    # then written back so later listings are served from the database alone.
+    stale = [album for album in accessible_albums if not album.get("reconciled")]
+    if stale:
+        release_connection()
+        stats = r2_listing_pool.map(
+            metrics.propagate_route(lambda album: album_stats_from_r2(album["photographer"], album["album_id"])),
+            stale,
+        )
+        with transaction():
+            for album, (photo_count, cover_key) in zip(stale, stats):
+                album["photo_count"] = photo_count
+                album["cover"] = cover_key
+                set_album_stats(album["photographer"], album["album_id"], photo_count, cover_key)
 
+    cover_sizes = get_rendition_sizes([album["cover"] for album in accessible_albums if album.get("cover")])
     formatted_albums = []
     for album_metadata in accessible_albums:
-        photographer = album_metadata.get("photographer")
-        album_id = album_metadata.get("album_id")
-        if not photographer or not album_id:
-            continue
-
-        prefix = f"event_albums/{photographer}/{album_id}/"
-        all_files = list_objects(prefix)
-        actual_photos = [obj for obj in all_files if not obj.endswith('/') and not obj.endswith('.placeholder')]
-
-        album_name = album_metadata.get("name") or album_id.replace('-', ' ').title()
-        cover_image_url = get_object_url(actual_photos[0]) if actual_photos else None
-
+        album_id = album_metadata["album_id"]
+        cover_key = album_metadata.get("cover")
         formatted_albums.append({
             "id": album_id,
-            "name": album_name,
-            "photographer": photographer,
-            "cover": cover_image_url,
-            "photo_count": len(actual_photos)
+            "name": album_metadata.get("name") or album_id.replace('-', ' ').title(),
+            "photographer": album_metadata["photographer"],
+            "cover": get_object_url(cover_key) if cover_key else None,
+            "cover_renditions": rendition_urls_for_key(cover_key, cover_sizes.get(cover_key)),
+            "photo_count": album_metadata.get("photo_count") or 0,
         })
 
-    return jsonify(formatted_albums)
+    return conditional_json(formatted_albums)
 
-@app.route('/api/create-album', methods=['POST'])
+@bp.route('/api/create-album', methods=['POST'])
 def create_album():
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
     try:
@@ -521,6 +1019,8 @@ def create_album():
     album_display_name = data['name']
     album_id = secure_filename(album_display_name.lower().replace(' ', '-'))
     if not album_id: return jsonify({"error": "Invalid album name"}), 400
+    if album_id in get_deleting_album_slugs(username):
+        return jsonify({"error": "An album with this name is still being deleted. Try again shortly."}), 409
     
     created, message = add_album(username, album_id, album_display_name)
     if not created:
@@ -535,19 +1035,17 @@ def create_album():
             
             if not actual_files:
                 print(f"Detected zombie album '{album_id}' for {username}. Cleaning up DB and retrying creation.", flush=True)
-                delete_album(username, album_id)
-                # Retry creation
-                created, message = add_album(username, album_id, album_display_name)
+                # Delete and re-create in one transaction so a failed retry leaves the old row intact.
+                with transaction():
+                    delete_album(username, album_id)
+                    created, message = add_album(username, album_id, album_display_name)
         
         if not created:
             status_code = 404 if message == "Photographer not found." else 409
             return jsonify({"error": message}), status_code
     
     r2_placeholder_path = f"event_albums/{username}/{album_id}/.placeholder"
-    temp_placeholder_file = os.path.join(UPLOAD_FOLDER, f"{uuid.uuid4()}_.placeholder")
-    with open(temp_placeholder_file, 'w') as f: f.write('')
-    upload_success, _ = upload_to_r2(temp_placeholder_file, r2_placeholder_path)
-    os.remove(temp_placeholder_file)
+    upload_success, _ = upload_bytes_to_r2(b"", r2_placeholder_path)
     
     if upload_success:
         return jsonify({"message": "Album created successfully", "album": {"id": album_id, "name": album_display_name}}), 201
@@ -556,7 +1054,159 @@ def create_album():
         delete_album(username, album_id) 
         return jsonify({"error": "Failed to create album in storage"}), 500
 
-@app.route('/api/upload-single-file', methods=['POST'])
+def upload_options(values):
+    """Read ``duplicate_policy`` and ``key_mode`` from form or JSON values.
+
+    Returns ``(duplicate_policy, key_mode, error)``.
+    """
+    duplicate_policy = (values.get('duplicate_policy') or UPLOAD_DUPLICATE_POLICY).lower()
+    if duplicate_policy not in DUPLICATE_POLICIES:
+        return None, None, "duplicate_policy must be keep, skip or replace."
+    key_mode = (values.get('key_mode') or UPLOAD_KEY_MODE).lower()
+    if key_mode not in UPLOAD_KEY_MODES:
+        return None, None, "key_mode must be uuid or content."
+    return duplicate_policy, key_mode, None
+
+
+def ingest_photo(username, album_id, original_filename, image_bytes, duplicate_policy, key_mode):
+    """Fingerprint, watermark, store and embed one uploaded photo.
+
+    Returns ``(body, status_code)`` for the upload response.
+    """
+    # Fingerprint first: duplicates can be skipped before any heavy work
+    with metrics.stage("image.fingerprint"):
+        fingerprint = image_pool.run(imaging.fingerprint, image_bytes)
+    if fingerprint.width is None:
+        return {"success": False, "error": "File is not a readable image."}, 400
+    index = get_album_photo_index(username, album_id)
+    # Image processing, R2 and the ML API follow; don't hold a pooled connection
+    release_connection()
+
+    if key_mode == 'content':
+        # Content-addressed: the same bytes always map to the same photo
+        stored = next((photo for photo in index if photo["content_hash"] == fingerprint.content_hash), None)
+        if stored:
+            photo_id = stored["object_key"].split('/')[-1]
+            stored_sizes = get_rendition_sizes([stored["object_key"]], username).get(stored["object_key"])
+            return {
+                "success": True,
+                "existing": True,
+                "name": original_filename,
+                "id": photo_id,
+                "url": get_object_url(stored["object_key"]),
+                "renditions": rendition_urls(username, album_id, photo_id, stored_sizes),
+            }, 200
+        unique_name = f"{fingerprint.content_hash[:32]}{os.path.splitext(original_filename)[1].lower()}"
+    else:
+        unique_name = f"{uuid.uuid4()}_{original_filename}"
+
+    matches = find_matches(fingerprint.content_hash, fingerprint.phash, index)
+    duplicates = [describe_duplicate(photo, match, distance) for photo, match, distance in matches]
+    if duplicates and duplicate_policy == 'skip':
+        existing = duplicates[0]
+        existing_key = f"event_albums/{username}/{album_id}/{existing['id']}"
+        stored_sizes = get_rendition_sizes([existing_key], username).get(existing_key)
+        return {
+            "success": True,
+            "skipped": True,
+            "name": original_filename,
+            "id": existing["id"],
+            "url": existing["url"],
+            "renditions": rendition_urls(username, album_id, existing["id"], stored_sizes),
+            "duplicates": duplicates,
+        }, 200
+
+    logo_path = WATERMARK_LOGO_PATH if os.path.exists(WATERMARK_LOGO_PATH) else None
+    if not logo_path:
+        print(f"Warning: Watermark logo not found at {WATERMARK_LOGO_PATH}")
+
+    # Watermark and renditions run in the image pool, which also applies the
+    # memory budget to the decode; the format implied by the file name is
+    # kept, as the R2 content type is derived from it.  Nothing is stored if
+    # this fails: the original must never be published without its
+    # watermark.  Pool and budget errors propagate to a 503.
+    try:
+        with metrics.stage("image.process_upload"):
+            processed = image_pool.run(
+                imaging.process_upload,
+                image_bytes,
+                logo_path,
+                image_format=Image.registered_extensions().get(os.path.splitext(unique_name)[1].lower()),
+            )
+        image_bytes, renditions = processed.image, processed.renditions
+    except (OSError, ValueError, SyntaxError) as e:
+        print(f"Could not decode {original_filename}: {e}")
+        return {"success": False, "error": "File is not a readable image."}, 400
+    except (ImagePoolBusy, BrokenProcessPool, memory.OverBudget):
+        raise
+    except Exception as e:
+        print(f"Watermark error for {original_filename}: {e}")
+        return {"success": False, "error": "Failed to process image."}, 500
+    if processed.max_pixels:
+        print(f"[memory] request_id={g.get('request_id')} downscaled {original_filename} to {processed.max_pixels} pixels")
+
+    upload_size = len(image_bytes)
+    r2_path = f"event_albums/{username}/{album_id}/{unique_name}"
+    upload_success, public_url = upload_bytes_to_r2(image_bytes, r2_path)
+    del image_bytes
+
+    if not upload_success:
+        return {"success": False, "error": "Failed to upload to R2 storage."}, 500
+
+    record_photos_added(username, album_id, object_key=r2_path)
+    add_photos(username, album_id, [{
+        "object_key": r2_path,
+        "filename": original_filename,
+        "content_hash": fingerprint.content_hash,
+        "phash": fingerprint.phash,
+        "size_bytes": upload_size,
+        "width": fingerprint.width,
+        "height": fingerprint.height,
+    }])
+
+    # Thumbnail/preview renditions; the original is already stored, so
+    # missing ones are logged, left out of responses and listings, and
+    # fixed later by backfill_renditions.py
+    stored_sizes = upload_renditions(username, album_id, unique_name, renditions)
+    del renditions
+    record_renditions(username, album_id, {r2_path: stored_sizes})
+    if len(stored_sizes) < len(RENDITION_SIZES):
+        print(f"Warning: Could not store all renditions for {original_filename}")
+
+    # Call ML API to generate face embeddings for this photo
+    try:
+        ml_response = ml_post(
+            "add_embeddings_from_urls/",
+            data={
+                "urls": [public_url],
+                "embedding_file": embedding_file_name(username, album_id)
+            },
+            timeout=120
+        )
+        if ml_response.status_code == 200:
+            ml_data = ml_response.json()
+            print(f"Embeddings generated: {ml_data.get('added_count', 0)} faces added for {original_filename}")
+        else:
+            print(f"Warning: ML API returned {ml_response.status_code} for {original_filename}")
+    except requests.exceptions.RequestException as e:
+        print(f"Warning: Could not generate embeddings for {original_filename}: {e}")
+
+    replaced = []
+    if duplicates and duplicate_policy == 'replace':
+        replaced, _errors = delete_album_photos(username, album_id, [photo["id"] for photo in duplicates])
+
+    return {
+        "success": True,
+        "name": original_filename,
+        "url": public_url,
+        "id": unique_name,
+        "renditions": rendition_urls(username, album_id, unique_name, stored_sizes),
+        "duplicates": duplicates,
+        "replaced": [key.split('/')[-1] for key in replaced],
+    }, 200
+
+
+@bp.route('/api/upload-single-file', methods=['POST'])
 def upload_single_file_route():
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
     try:
@@ -573,49 +1223,442 @@ def upload_single_file_route():
     album_id = request.form.get('album')
     if not album_id: return jsonify({"error": "Album ID is missing"}), 400
 
-    if file_to_upload and allowed_file(file_to_upload.filename):
-        original_filename = secure_filename(file_to_upload.filename)
-        unique_name = f"{uuid.uuid4()}_{original_filename}"
-        local_path = os.path.join(UPLOAD_FOLDER, unique_name)
-        file_to_upload.save(local_path)
-        
-        # Apply watermark before uploading
-        if os.path.exists(WATERMARK_LOGO_PATH):
-            apply_watermark(local_path)
-        else:
-            print(f"Warning: Watermark logo not found at {WATERMARK_LOGO_PATH}")
-        
-        r2_path = f"event_albums/{username}/{album_id}/{unique_name}"
-        upload_success, public_url = upload_to_r2(local_path, r2_path)
-        os.remove(local_path)
-        
-        if upload_success:
-            # Call ML API to generate face embeddings for this photo
-            try:
-                embedding_file_name = f"{username}-{album_id}_embeddings.json"
-                ml_response = requests.post(
-                    f"{ML_API_BASE_URL}add_embeddings_from_urls/",
-                    data={
-                        "urls": [public_url],
-                        "embedding_file": embedding_file_name
-                    },
-                    timeout=120
-                )
-                if ml_response.status_code == 200:
-                    ml_data = ml_response.json()
-                    print(f"Embeddings generated: {ml_data.get('added_count', 0)} faces added for {original_filename}")
-                else:
-                    print(f"Warning: ML API returned {ml_response.status_code} for {original_filename}")
-            except requests.exceptions.RequestException as e:
-                print(f"Warning: Could not generate embeddings for {original_filename}: {e}")
-            
-            return jsonify({"success": True, "name": original_filename, "url": public_url, "id": unique_name}), 200
+    if not (file_to_upload and allowed_file(file_to_upload.filename)):
+        return jsonify({"success": False, "error": "File type not allowed or no file submitted."}), 400
+
+    duplicate_policy, key_mode, error = upload_options(request.form)
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+
+    # A retried request with the same Idempotency-Key gets the first response
+    idempotency_key = request.headers.get('Idempotency-Key', '').strip()
+    if idempotency_key:
+        if len(idempotency_key) > 255:
+            return jsonify({"success": False, "error": "Idempotency-Key is too long."}), 400
+        state, previous = claim_upload_request(username, idempotency_key, album_id)
+        if state == "in_progress":
+            response = jsonify({
+                "success": False,
+                "error": "An upload with this Idempotency-Key is still in progress.",
+                "code": "idempotency_key_in_progress",
+            })
+            response.headers["Retry-After"] = "5"
+            return response, 409
+        if state == "completed":
+            if previous["album_slug"] != album_id:
+                return jsonify({
+                    "success": False,
+                    "error": "This Idempotency-Key was used for a different album.",
+                    "code": "idempotency_key_reused",
+                }), 422
+            response = jsonify(previous["response"])
+            response.headers["Idempotent-Replayed"] = "true"
+            return response, 200
+
+    original_filename = secure_filename(file_to_upload.filename)
+    try:
+        body, status_code = ingest_photo(
+            username, album_id, original_filename, file_to_upload.read(), duplicate_policy, key_mode
+        )
+    except BaseException:
+        if idempotency_key:
+            release_upload_request(username, idempotency_key)
+        raise
+
+    if idempotency_key:
+        if status_code == 200:
+            object_key = f"event_albums/{username}/{album_id}/{body['id']}"
+            complete_upload_request(username, idempotency_key, object_key, body)
         else:
-            return jsonify({"success": False, "error": "Failed to upload to R2 storage."}), 500
+            release_upload_request(username, idempotency_key)
+    return jsonify(body), status_code
+
+def incoming_prefix(username, album_id):
+    """Staging prefix for originals the browser uploads straight to R2."""
+    return f"incoming/{username}/{album_id}/"
+
+
+def ingest_incoming_photo(username, album_id, incoming_key, original_filename, duplicate_policy, key_mode):
+    """Job body for a direct upload: ingest the staged object, then drop it."""
+    image_bytes, _content_type, error = get_object_bytes(incoming_key)
+    if image_bytes is None:
+        raise RuntimeError(f"Uploaded file could not be read: {error}")
+
+    # Unlike a request, a job can wait for the image pool instead of failing
+    for attempt in range(30):
+        try:
+            body, status_code = ingest_photo(
+                username, album_id, original_filename, image_bytes, duplicate_policy, key_mode
+            )
+            break
+        except (ImagePoolBusy, BrokenProcessPool):
+            time.sleep(min(2 ** attempt, 10))
     else:
-        return jsonify({"success": False, "error": "File type not allowed or no file submitted."}), 400
+        raise RuntimeError("Image processing stayed at capacity, please retry.")
+    if status_code != 200:
+        raise RuntimeError(body.get("error") or "Upload failed.")
+
+    delete_from_r2(incoming_key)
+    return body
+
 
-@app.route('/api/albums', methods=['GET'])
+@bp.route('/api/uploads/direct', methods=['POST'])
+def create_direct_upload():
+    """Issue presigned URLs so the browser can upload an original straight to R2."""
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    try:
+        payload = verify_token(token)
+        username = payload['sub']
+        if payload.get('role') != 'photographer':
+            return jsonify({"error": "Only photographers can upload photos."}), 403
+    except Exception as e:
+        return jsonify({"error": "Authentication failed", "details": str(e)}), 401
+
+    if not DIRECT_UPLOADS_ENABLED:
+        return jsonify({"error": "Direct uploads are disabled.", "code": "direct_uploads_disabled"}), 404
+
+    data = request.get_json(silent=True) or {}
+    album_id = data.get('album')
+    filename = data.get('filename') or ''
+    size = data.get('size')
+    if not album_id:
+        return jsonify({"error": "Album ID is missing"}), 400
+    if not allowed_file(filename):
+        return jsonify({"error": "File type not allowed."}), 400
+    if not isinstance(size, int) or size <= 0:
+        return jsonify({"error": "size must be the file size in bytes."}), 400
+    if size > DIRECT_UPLOAD_MAX_BYTES:
+        return jsonify({"error": f"File too large. Max size is {DIRECT_UPLOAD_MAX_BYTES} bytes."}), 413
+
+    original_filename = secure_filename(filename)
+    key = f"{incoming_prefix(username, album_id)}{uuid.uuid4().hex}/{original_filename}"
+    content_type = get_content_type(original_filename)
+    if size <= R2_MULTIPART_PART_SIZE:
+        return jsonify({
+            "key": key,
+            "content_type": content_type,
+            "url": presigned_put_url(key, content_type, DIRECT_UPLOAD_URL_EXPIRY_SECONDS),
+            "expires_in": DIRECT_UPLOAD_URL_EXPIRY_SECONDS,
+        }), 201
+
+    created, upload_id = create_multipart_upload(key, content_type)
+    if not created:
+        return jsonify({"error": "Could not start the upload in storage."}), 502
+    # S3 allows at most 10,000 parts per upload
+    part_size = max(R2_MULTIPART_PART_SIZE, -(-size // 10000))
+    part_count = -(-size // part_size)
+    return jsonify({
+        "key": key,
+        "content_type": content_type,
+        "multipart": {
+            "upload_id": upload_id,
+            "part_size": part_size,
+            "parts": [
+                {"part_number": number, "url": presigned_part_url(key, upload_id, number, DIRECT_UPLOAD_URL_EXPIRY_SECONDS)}
+                for number in range(1, part_count + 1)
+            ],
+        },
+        "expires_in": DIRECT_UPLOAD_URL_EXPIRY_SECONDS,
+    }), 201
+
+
+def _direct_upload_request():
+    """Authenticate a finalize/abort call and check its key is the caller's.
+
+    Returns ``(username, data, error_response)``.
+    """
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    try:
+        payload = verify_token(token)
+        username = payload['sub']
+        if payload.get('role') != 'photographer':
+            return None, None, (jsonify({"error": "Only photographers can upload photos."}), 403)
+    except Exception as e:
+        return None, None, (jsonify({"error": "Authentication failed", "details": str(e)}), 401)
+
+    if not DIRECT_UPLOADS_ENABLED:
+        return None, None, (jsonify({"error": "Direct uploads are disabled.", "code": "direct_uploads_disabled"}), 404)
+
+    data = request.get_json(silent=True) or {}
+    album_id = data.get('album') or ''
+    key = data.get('key') or ''
+    if not album_id or not key.startswith(incoming_prefix(username, album_id)) or '..' in key.split('/'):
+        return None, None, (jsonify({"error": "Unknown upload key."}), 400)
+    return username, data, None
+
+
+@bp.route('/api/uploads/direct/finalize', methods=['POST'])
+def finalize_direct_upload():
+    """Queue watermarking, renditions and embeddings for a direct upload."""
+    username, data, error_response = _direct_upload_request()
+    if error_response:
+        return error_response
+    album_id, key = data['album'], data['key']
+
+    duplicate_policy, key_mode, error = upload_options(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    # Finalizing the same upload again reports the job already started
+    job = job_runner.find(key)
+    if job is None:
+        multipart = data.get('multipart')
+        if multipart:
+            completed, error = complete_multipart_upload(key, multipart.get('upload_id'), multipart.get('parts') or [])
+            if not completed:
+                return jsonify({"error": "Could not complete the multipart upload.", "details": error}), 502
+
+        stored = head_object(key)
+        if stored is None:
+            return jsonify({"error": "Uploaded file not found in storage."}), 404
+        if stored["size"] > DIRECT_UPLOAD_MAX_BYTES:
+            delete_from_r2(key)
+            return jsonify({"error": f"File too large. Max size is {DIRECT_UPLOAD_MAX_BYTES} bytes."}), 413
+
+        original_filename = secure_filename(data.get('filename') or key.rsplit('/', 1)[-1])
+        job = job_runner.submit(
+            "ingest_upload", username, ingest_incoming_photo,
+            username, album_id, key, original_filename, duplicate_policy, key_mode,
+            dedupe_key=key,
+        )
+
+    return jsonify({
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": url_for('main.get_job', job_id=job.id),
+    }), 202
+
+
+@bp.route('/api/uploads/direct/abort', methods=['POST'])
+def abort_direct_upload():
+    """Discard a direct upload the browser gave up on."""
+    username, data, error_response = _direct_upload_request()
+    if error_response:
+        return error_response
+
+    upload_id = (data.get('multipart') or {}).get('upload_id')
+    if upload_id:
+        abort_multipart_upload(data['key'], upload_id)
+    delete_from_r2(data['key'])
+    return jsonify({"message": "Upload discarded."})
+
+
+def expire_stale_upload_sessions():
+    """Expire idle upload sessions and abort their multipart uploads."""
+    expired = expire_upload_sessions()
+    for upload_session in expired:
+        abort_multipart_upload(upload_session["object_key"], upload_session["r2_upload_id"])
+    return len(expired)
+
+
+@bp.cli.command("expire-upload-sessions")
+def expire_upload_sessions_command():
+    """Abort the parts of upload sessions idle past UPLOAD_SESSION_TTL_SECONDS."""
+    print(f"Expired {expire_stale_upload_sessions()} upload session(s).")
+
+
+def upload_session_progress(upload_session, parts):
+    """Client view of a session, with progress taken from R2's part list."""
+    part_size = upload_session["part_size"]
+    total_parts = -(-upload_session["size"] // part_size)
+    received = {part["part_number"] for part in parts or []}
+    missing = [number for number in range(1, total_parts + 1) if number not in received]
+    view = {key: value for key, value in upload_session.items() if key not in ("object_key", "r2_upload_id")}
+    view.update({
+        "total_parts": total_parts,
+        "max_chunk_bytes": part_size * max(1, R2_MULTIPART_CONCURRENCY),
+        "received_bytes": sum(part["size"] for part in parts or []),
+        "missing_parts": missing,
+        "next_offset": (missing[0] - 1) * part_size if missing else upload_session["size"],
+    })
+    return view
+
+
+def _upload_session_request(session_id):
+    """Authenticate a photographer and load one of their upload sessions.
+
+    Returns ``(username, upload_session, error_response)``.
+    """
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    try:
+        payload = verify_token(token)
+        username = payload['sub']
+        if payload.get('role') != 'photographer':
+            return None, None, (jsonify({"error": "Only photographers can upload photos."}), 403)
+    except Exception as e:
+        return None, None, (jsonify({"error": "Authentication failed", "details": str(e)}), 401)
+
+    upload_session = get_upload_session(username, session_id)
+    if upload_session is None:
+        return None, None, (jsonify({"error": "Upload session not found."}), 404)
+    return username, upload_session, None
+
+
+@bp.route('/api/upload-sessions', methods=['POST'])
+def create_upload_session_route():
+    """Start a resumable upload; chunks are then PUT at part-aligned offsets."""
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    try:
+        payload = verify_token(token)
+        username = payload['sub']
+        if payload.get('role') != 'photographer':
+            return jsonify({"error": "Only photographers can upload photos."}), 403
+    except Exception as e:
+        return jsonify({"error": "Authentication failed", "details": str(e)}), 401
+
+    data = request.get_json(silent=True) or {}
+    album_id = data.get('album')
+    filename = data.get('filename') or ''
+    size = data.get('size')
+    if not album_id:
+        return jsonify({"error": "Album ID is missing"}), 400
+    if not allowed_file(filename):
+        return jsonify({"error": "File type not allowed."}), 400
+    if not isinstance(size, int) or size <= 0:
+        return jsonify({"error": "size must be the file size in bytes."}), 400
+    if size > UPLOAD_SESSION_MAX_BYTES:
+        return jsonify({"error": f"File too large. Max size is {UPLOAD_SESSION_MAX_BYTES} bytes."}), 413
+
+    expire_stale_upload_sessions()
+
+    original_filename = secure_filename(filename)
+    key = f"{incoming_prefix(username, album_id)}{uuid.uuid4().hex}/{original_filename}"
+    release_connection()
+    created, r2_upload_id = create_multipart_upload(key, get_content_type(original_filename))
+    if not created:
+        return jsonify({"error": "Could not start the upload in storage."}), 502
+
+    # S3 allows at most 10,000 parts per upload
+    part_size = max(R2_MULTIPART_PART_SIZE, -(-size // 10000))
+    upload_session = create_upload_session(username, album_id, original_filename, size, part_size, key, r2_upload_id)
+    if upload_session is None:
+        abort_multipart_upload(key, r2_upload_id)
+        return jsonify({"error": "Photographer not found."}), 404
+    return jsonify(upload_session_progress(upload_session, [])), 201
+
+
+@bp.route('/api/upload-sessions/<session_id>', methods=['GET'])
+def get_upload_session_route(session_id):
+    """Report which parts R2 already has, so a client knows where to resume."""
+    _username, upload_session, error_response = _upload_session_request(session_id)
+    if error_response:
+        return error_response
+    parts = []
+    if upload_session["status"] == "open":
+        release_connection()
+        parts = list_parts(upload_session["object_key"], upload_session["r2_upload_id"])
+    return jsonify(upload_session_progress(upload_session, parts))
+
+
+@bp.route('/api/upload-sessions/<session_id>', methods=['PUT'])
+def upload_session_chunk(session_id):
+    """Store the chunk at ``?offset=``: one or more whole parts, or the tail of the file."""
+    _username, upload_session, error_response = _upload_session_request(session_id)
+    if error_response:
+        return error_response
+    if upload_session["status"] != "open":
+        return jsonify({"error": f"Upload session is {upload_session['status']}."}), 409
+
+    size, part_size = upload_session["size"], upload_session["part_size"]
+    offset = request.args.get('offset', type=int)
+    length = request.content_length
+    if offset is None or offset < 0 or offset >= size or offset % part_size:
+        return jsonify({"error": f"offset must be a multiple of {part_size} below {size}."}), 400
+    if not length or offset + length > size or (length % part_size and offset + length != size):
+        return jsonify({"error": f"A chunk must be whole parts of {part_size} bytes, or end at {size}."}), 400
+    if length > part_size * max(1, R2_MULTIPART_CONCURRENCY):
+        return jsonify({"error": f"Chunks are limited to {part_size * max(1, R2_MULTIPART_CONCURRENCY)} bytes."}), 413
+
+    chunk = request.get_data(cache=False)
+    if len(chunk) != length:
+        return jsonify({"error": "Chunk body is shorter than its Content-Length."}), 400
+
+    release_connection()
+    stored, parts = upload_parts(
+        upload_session["object_key"], upload_session["r2_upload_id"], chunk, offset // part_size + 1, part_size
+    )
+    del chunk
+    if not stored:
+        return jsonify({
+            "error": "Some parts could not be stored; query the session and resend the missing ones.",
+            "stored_parts": [part["part_number"] for part in parts],
+        }), 502
+    touch_upload_session(session_id)
+    return jsonify({"offset": offset, "length": length, "stored_parts": [part["part_number"] for part in parts]})
+
+
+@bp.route('/api/upload-sessions/<session_id>/complete', methods=['POST'])
+def complete_upload_session(session_id):
+    """Assemble the parts and queue the photo's ingest job."""
+    username, upload_session, error_response = _upload_session_request(session_id)
+    if error_response:
+        return error_response
+
+    job = job_runner.find(upload_session["object_key"])
+    if upload_session["status"] == "completed" or job:
+        job = job or job_runner.get(upload_session["job_id"] or "")
+        if job is None:
+            return jsonify({"error": "Upload session is already completed."}), 409
+        return jsonify({"job_id": job.id, "status": job.status, "status_url": url_for('main.get_job', job_id=job.id)}), 202
+    if upload_session["status"] != "open":
+        return jsonify({"error": f"Upload session is {upload_session['status']}."}), 409
+
+    data = request.get_json(silent=True) or {}
+    duplicate_policy, key_mode, error = upload_options(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    release_connection()
+    parts = list_parts(upload_session["object_key"], upload_session["r2_upload_id"])
+    if parts is None:
+        return jsonify({"error": "The upload no longer exists in storage."}), 410
+    progress = upload_session_progress(upload_session, parts)
+    if progress["missing_parts"] or progress["received_bytes"] != upload_session["size"]:
+        return jsonify({"error": "Upload is incomplete.", **progress}), 409
+
+    completed, error = complete_multipart_upload(upload_session["object_key"], upload_session["r2_upload_id"], parts)
+    if not completed:
+        return jsonify({"error": "Could not complete the multipart upload.", "details": error}), 502
+
+    job = job_runner.submit(
+        "ingest_upload", username, ingest_incoming_photo,
+        username, upload_session["album_id"], upload_session["object_key"], upload_session["filename"],
+        duplicate_policy, key_mode,
+        dedupe_key=upload_session["object_key"],
+    )
+    close_upload_session(session_id, "completed", job.id)
+    return jsonify({"job_id": job.id, "status": job.status, "status_url": url_for('main.get_job', job_id=job.id)}), 202
+
+
+@bp.route('/api/upload-sessions/<session_id>', methods=['DELETE'])
+def abort_upload_session(session_id):
+    """Abandon a session and discard the parts already uploaded."""
+    _username, upload_session, error_response = _upload_session_request(session_id)
+    if error_response:
+        return error_response
+    if not close_upload_session(session_id, "aborted"):
+        return jsonify({"error": f"Upload session is {upload_session['status']}."}), 409
+    release_connection()
+    abort_multipart_upload(upload_session["object_key"], upload_session["r2_upload_id"])
+    return jsonify({"message": "Upload session aborted."})
+
+
+@bp.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    try:
+        payload = verify_token(token)
+        username = payload['sub']
+    except Exception as e:
+        return jsonify({"error": "Authentication failed", "details": str(e)}), 401
+
+    job = job_runner.get(job_id)
+    if job is None or job.owner != username:
+        return jsonify({"error": "Job not found."}), 404
+    return jsonify(job.to_dict())
+
+
+@bp.route('/api/albums', methods=['GET'])
 def get_albums():
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
     try:
@@ -634,10 +1677,11 @@ def get_albums():
                 album["album_id"]: album
                 for album in get_albums_for_photographer(username)
             }
+            deleting = set(get_deleting_album_slugs(username))
 
             for album_prefix in album_prefixes:
                 album_id = album_prefix.rstrip('/').split('/')[-1]
-                if not album_id:
+                if not album_id or album_id in deleting:
                     continue
 
                 album_details = photographer_albums.get(album_id, {})
@@ -652,28 +1696,112 @@ def get_albums():
                     "id": album_id,
                     "name": album_name,
                     "cover": cover_image_url,
+                    "cover_key": actual_photos[0] if actual_photos else None,
                     "photo_count": photo_count,
                 }
                 formatted_albums.append(album_data)
+
+            cover_sizes = get_rendition_sizes(
+                [album["cover_key"] for album in formatted_albums if album["cover_key"]], username
+            )
+            for album_data in formatted_albums:
+                cover_key = album_data.pop("cover_key")
+                album_data["cover_renditions"] = rendition_urls_for_key(cover_key, cover_sizes.get(cover_key))
         
-        return jsonify(formatted_albums)
+        return conditional_json(formatted_albums)
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": "Could not retrieve albums.", "details": str(e)}), 500
 
-@app.route('/api/event/<photographer_username>/<album_id>', methods=['GET'])
+def photo_page_params(values):
+    """Read ``limit`` and ``after`` for a photo listing.
+
+    Returns ``(limit, after, error)``; ``limit`` is None for an unpaginated
+    listing.
+    """
+    after = values.get('after', '')
+    if '/' in after:
+        return None, None, "Invalid cursor."
+    if values.get('limit') is None:
+        return None, after, None
+    try:
+        limit = int(values['limit'])
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= PHOTO_PAGE_MAX_LIMIT:
+        return None, None, f"limit must be between 1 and {PHOTO_PAGE_MAX_LIMIT}."
+    return limit, after, None
+
+
+def album_photo_page(prefix, limit, after=''):
+    """Up to ``limit`` photo keys under an album prefix that sort after ``after``.
+
+    Keys come back in R2's (byte-wise) key order, which is stable as photos
+    are added or removed. Returns ``(keys, next_cursor)``; the cursor is the
+    last photo's file name, or None on the last page.
+    """
+    keys = []
+    start_after = prefix + after if after else ''
+    while True:
+        page, truncated = list_objects_page(prefix, min(limit + 1 - len(keys), 1000), start_after)
+        keys.extend(key for key in page if not key.endswith('/') and not key.endswith('.placeholder'))
+        if len(keys) > limit or not truncated or not page:
+            break
+        start_after = page[-1]
+    if len(keys) > limit:
+        return keys[:limit], keys[limit - 1][len(prefix):]
+    return keys, None
+
+
+def album_photo_listing(photographer, album_id, values, cache_control=PRIVATE_CACHE_CONTROL):
+    """Photos of an album as the JSON list, or a ``{photos, next_cursor}`` page when ``limit`` is given.
+
+    ``format=compact`` always answers an object in the compact shape of
+    ``listings.compact_photo_listing``. The ETag is a digest of the listed
+    keys, so an unchanged listing is answered with a 304 without building or
+    serializing the photos.
+    """
+    limit, after, error = photo_page_params(values)
+    if error:
+        return jsonify({"error": error}), 400
+    listing_format = values.get('format', 'full')
+    if listing_format not in LISTING_FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(LISTING_FORMATS)}."}), 400
+
+    prefix = originals_prefix(photographer, album_id)
+    if limit is None:
+        keys = [key for key in list_objects(prefix) if not key.endswith('/') and not key.endswith('.placeholder')]
+        next_cursor = None
+    else:
+        keys, next_cursor = album_photo_page(prefix, limit, after)
+
+    stored_sizes = get_rendition_sizes(keys, photographer)
+    etag = listing_etag(prefix, listing_format, limit, keys, next_cursor, stored_sizes)
+    if client_has_etag(etag):
+        return conditional_json(None, etag, cache_control)
+
+    if listing_format == 'compact':
+        body = compact_photo_listing(photographer, album_id, keys, stored_sizes)
+        body["next_cursor"] = next_cursor
+    elif limit is None:
+        body = full_photo_entries(photographer, album_id, keys, stored_sizes)
+    else:
+        body = {"photos": full_photo_entries(photographer, album_id, keys, stored_sizes), "next_cursor": next_cursor}
+    return conditional_json(body, etag, cache_control)
+
+
+@bp.route('/api/event/<photographer_username>/<album_id>', methods=['GET'])
 def get_event_album_photos(photographer_username, album_id):
     # This endpoint is now public for the "Full Access" link.
     # No token verification is performed here.
     try:
-        prefix = f"event_albums/{photographer_username}/{album_id}/"
-        photo_keys = list_objects(prefix)
-        photos = [{"id": key.split('/')[-1], "url": get_object_url(key), "name": key.split('/')[-1]} for key in photo_keys if not key.endswith('/') and not key.endswith('.placeholder')]
-        return jsonify(photos)
+        return album_photo_listing(
+            photographer_username, album_id, request.args, cache_control=PUBLIC_LISTING_CACHE_CONTROL
+        )
     except Exception as e:
         return jsonify({"error": "Could not retrieve event photos.", "details": str(e)}), 500
 
-@app.route('/api/find-my-photos/<photographer_username>/<album_id>', methods=['GET'])
+@bp.route('/api/find-my-photos/<photographer_username>/<album_id>', methods=['GET'])
 def find_my_photos(photographer_username, album_id):
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
     try:
@@ -686,6 +1814,7 @@ def find_my_photos(photographer_username, album_id):
         attendee = get_user(attendee_username)
         if not attendee or not attendee.ref_photo_path:
             return jsonify({"error": "Reference photo not found for user."}), 404
+        release_connection()
 
         ref_photo_bytes, fetch_error = fetch_reference_photo_bytes(attendee.ref_photo_path)
         if ref_photo_bytes is None:
@@ -693,25 +1822,29 @@ def find_my_photos(photographer_username, album_id):
                 "error": fetch_error or "Reference photo missing. Please upload a new reference photo.",
                 "code": "reference_photo_missing",
             }), 404
-        
-        embedding_file_name = f"{photographer_username}-{album_id}_embeddings.json"
-        api_endpoint = f"{ML_API_BASE_URL}find_similar_faces/"
+
+        # References stored before normalization existed are shrunk before
+        # they are sent; the stored original is left as it is.
+        if len(ref_photo_bytes) > REFERENCE_PHOTO_LEGACY_MAX_BYTES:
+            ref_photo_bytes, _normalized = normalize_reference_photo_bytes(ref_photo_bytes, face_crop=False)
         
         files_payload = { "file": ("reference_image.jpg", ref_photo_bytes, "image/jpeg") }
-        data_payload = { "embedding_file": embedding_file_name, "threshold": "0.34" }
+        data_payload = { "embedding_file": embedding_file_name(photographer_username, album_id), "threshold": "0.34" }
         
-        ml_response = requests.post(api_endpoint, files=files_payload, data=data_payload, timeout=60)
+        ml_response = ml_post("find_similar_faces/", files=files_payload, data=data_payload, timeout=60)
         ml_response.raise_for_status()
         
         return jsonify(ml_response.json()), ml_response.status_code
 
+    except (ImagePoolBusy, BrokenProcessPool, memory.OverBudget):
+        raise
     except requests.exceptions.RequestException as e:
         return jsonify({"error": "Failed to connect to ML service or download reference photo.", "details": str(e)}), 503
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": "An internal error occurred while finding matches.", "details": str(e)}), 500
 
-@app.route('/api/albums/<album_id>/photos', methods=['GET'])
+@bp.route('/api/albums/<album_id>/photos', methods=['GET'])
 def get_album_photos(album_id):
     """Get all photos from a specific album for the authenticated photographer"""
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
@@ -723,31 +1856,13 @@ def get_album_photos(album_id):
         if payload.get('role') == 'attendee':
             return jsonify({"error": "Access denied. Photographers only."}), 403
         
-        # Build the prefix for this album
-        prefix = f"event_albums/{username}/{album_id}/"
-        
-        # Get all objects in the album
-        photo_keys = list_objects(prefix)
-        
-        # Filter out directories and placeholder files, format the response
-        photos = []
-        for key in photo_keys:
-            if not key.endswith('/') and not key.endswith('.placeholder'):
-                photo_id = key.split('/')[-1]
-                photo_url = get_object_url(key)
-                photos.append({
-                    "id": photo_id,
-                    "url": photo_url,
-                    "name": photo_id
-                })
-        
-        return jsonify(photos)
+        return album_photo_listing(username, album_id, request.args)
         
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": "Authentication required or failed to fetch photos.", "details": str(e)}), 401
 
-@app.route('/api/albums/batch', methods=['DELETE'])
+@bp.route('/api/albums/batch', methods=['DELETE'])
 def delete_albums_batch():
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
     try:
@@ -763,76 +1878,145 @@ def delete_albums_batch():
     if not album_ids:
         return jsonify({"error": "No album IDs provided."}), 400
 
-    deleted_count = 0
+    # Albums are hidden at once; their objects are removed by background jobs
+    deletions = []
     errors = []
-
     for album_id in album_ids:
-        try:
-            # 1. List all files in the album
-            prefix = f"event_albums/{username}/{album_id}/"
-            all_files = list_objects(prefix)
-            
-            # 2. Delete all files from R2
-            for file_key in all_files:
-                delete_from_r2(file_key)
-            
-            # 3. Remove from database
-            delete_album(username, album_id)
-            
-            # 4. Remove embedding file from R2 (if it exists separately, though usually in embeddings folder)
-            embedding_file = f"user_profiles/{username}/{username}-{album_id}_embeddings.json" # Potential location check
-            # Since embeddings are managed by ML API and stored in R2 bucket root or specific path,
-            # we might leave them or try to clean up if we knew the path. 
-            # Current ML API logic stores them in root with format: {username}-{album_id}_embeddings.json
-            embedding_filename = f"{username}-{album_id}_embeddings.json"
-            delete_from_r2(embedding_filename)
-
-            deleted_count += 1
-        except Exception as e:
-            errors.append(f"Failed to delete {album_id}: {str(e)}")
+        deletion = start_album_deletion(username, album_id)
+        if deletion is None:
+            errors.append(f"Failed to delete {album_id}: Album not found.")
+            continue
+        submit_album_deletion(username, deletion["id"])
+        deletions.append({
+            "album_id": album_id,
+            "deletion_id": deletion["id"],
+            "status_url": url_for('main.get_album_deletion_status', deletion_id=deletion["id"]),
+        })
 
     return jsonify({
-        "message": f"Deleted {deleted_count} albums.",
+        "message": f"Deleting {len(deletions)} albums.",
+        "deletions": deletions,
         "errors": errors
-    })
+    }), 202
 
 
-@app.route('/api/albums/<album_id>/photos/batch', methods=['DELETE'])
-def delete_photos_batch(album_id):
+def submit_album_deletion(username, deletion_id, lease_expires_at=None):
+    """Queue the deletion job once per lease: repeated polls of an unclaimed
+    deletion, or of one whose lease lapsed at ``lease_expires_at``, share a job."""
+    attempt = lease_expires_at.isoformat() if lease_expires_at else "unclaimed"
+    return job_runner.submit(
+        "delete_album", username, run_album_deletion, deletion_id, dedupe_key=f"{deletion_id}:{attempt}"
+    )
+
+
+def run_album_deletion(deletion_id):
+    """Job body: delete an album's objects chunk by chunk, then its embeddings and row.
+
+    Progress is saved after every chunk under a lease, so a deletion cut
+    short by a restart is picked up again where it stopped.
+    """
+    owner = f"{os.getpid()}:{uuid.uuid4().hex}"
+    deletion = claim_album_deletion(deletion_id, owner)
+    if deletion is None:
+        return {"deletion_id": deletion_id, "claimed": False}
+    username, album_id = deletion["photographer"], deletion["album_id"]
+    prefixes = [f"event_albums/{username}/{album_id}/", rendition_prefix(username, album_id)]
+
+    try:
+        if deletion["total_objects"] is None:
+            total = sum(len(list_all_objects(prefix)) for prefix in prefixes)
+            record_album_deletion_progress(deletion_id, owner, total_objects=total)
+
+        for prefix in prefixes:
+            while True:
+                keys = list_objects(prefix, limit=ALBUM_DELETE_CHUNK_SIZE)
+                if not keys:
+                    break
+                deleted, failed = delete_objects_bulk(keys)
+                if failed:
+                    key, error = next(iter(failed.items()))
+                    raise RuntimeError(f"{len(failed)} objects could not be deleted (first: {key}: {error})")
+                if not record_album_deletion_progress(deletion_id, owner, deleted=len(deleted)):
+                    print(f"[albums] deletion {deletion_id} lost its lease, stopping")
+                    return {"deletion_id": deletion_id, "claimed": False}
+
+        delete_from_r2(embedding_file_name(username, album_id))
+    except Exception as e:
+        finish_album_deletion(deletion_id, owner, error=str(e))
+        raise
+
+    finish_album_deletion(deletion_id, owner)
+    return {"deletion_id": deletion_id, "claimed": True}
+
+
+@bp.cli.command("resume-album-deletions")
+def resume_album_deletions_command():
+    """Finish album deletions whose worker stopped before completing them."""
+    stalled = get_stalled_album_deletions()
+    for deletion_id in stalled:
+        run_album_deletion(deletion_id)
+    print(f"Resumed {len(stalled)} album deletion(s).")
+
+
+@bp.route('/api/albums/deletions/<deletion_id>', methods=['GET'])
+def get_album_deletion_status(deletion_id):
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
     try:
         payload = verify_token(token)
         username = payload['sub']
-        if payload.get('role') != 'photographer':
-            return jsonify({"error": "Only photographers can delete photos."}), 403
     except Exception as e:
         return jsonify({"error": "Authentication failed", "details": str(e)}), 401
 
-    data = request.get_json()
-    photo_ids = data.get('photo_ids', [])
-    if not photo_ids:
-        return jsonify({"error": "No photo IDs provided."}), 400
+    deletion = get_album_deletion(username, deletion_id)
+    if deletion is None:
+        return jsonify({"error": "Album deletion not found."}), 404
+
+    # Nobody holds the lease (e.g. the worker restarted): resume it here
+    lease_expires_at = deletion.pop("lease_expires_at")
+    if deletion["status"] in ("pending", "running") and (
+        lease_expires_at is None or lease_expires_at < datetime.now(timezone.utc).replace(tzinfo=None)
+    ):
+        submit_album_deletion(username, deletion_id, lease_expires_at)
+
+    total = deletion["total_objects"]
+    deletion["progress"] = 1.0 if deletion["status"] == "done" else (
+        round(min(deletion["deleted_objects"] / total, 1.0), 3) if total else 0.0
+    )
+    return jsonify(deletion)
 
+
+def delete_album_photos(username, album_id, photo_ids):
+    """Delete photos (and their renditions, index rows and embeddings) from an album.
+
+    Returns ``(deleted_keys, errors)``.
+    """
+    deleted_keys = []
     deleted_urls = []
     errors = []
 
-    # 1. Delete from R2
-    for photo_id in photo_ids:
-        r2_path = f"event_albums/{username}/{album_id}/{photo_id}"
-        success, error = delete_from_r2(r2_path)
-        if success:
-            deleted_urls.append(get_object_url(r2_path))
+    # 1. Delete originals and renditions from R2 in bulk
+    originals = {f"event_albums/{username}/{album_id}/{photo_id}": photo_id for photo_id in photo_ids}
+    renditions = [key for photo_id in photo_ids for key in rendition_keys(username, album_id, photo_id)]
+    release_connection()
+    _deleted, failed = delete_objects_bulk(list(originals) + renditions)
+    for r2_path, photo_id in originals.items():
+        if r2_path in failed:
+            errors.append(f"Failed to delete {photo_id}: {failed[r2_path]}")
         else:
-            errors.append(f"Failed to delete {photo_id}: {error}")
+            deleted_keys.append(r2_path)
+            deleted_urls.append(get_object_url(r2_path))
+
+    with transaction():
+        record_photos_removed(username, album_id, deleted_keys)
+        delete_photos_by_keys(username, deleted_keys)
 
     # 2. Call ML API to remove embeddings
     if deleted_urls:
         try:
-            embedding_file_name = f"{username}-{album_id}_embeddings.json"
-            requests.post(
-                f"{ML_API_BASE_URL}remove_embedding/",
+            ml_post(
+                "remove_embedding/",
                 data={
-                    "embedding_file": embedding_file_name,
+                    "embedding_file": embedding_file_name(username, album_id),
                     "image_urls": json.dumps(deleted_urls)
                 },
                 timeout=30
@@ -841,15 +2025,287 @@ def delete_photos_batch(album_id):
             print(f"Warning: Failed to remove embeddings for deleted photos: {e}")
             # Don't fail the request if just embedding removal fails, but log it usually
 
+    return deleted_keys, errors
+
+
+def describe_duplicate(photo, match, distance):
+    """Public view of an indexed photo that matched an upload or a scan."""
+    photo_id = photo["object_key"].split('/')[-1]
+    return {
+        "id": photo_id,
+        "url": get_object_url(photo["object_key"]),
+        "filename": photo.get("filename"),
+        "match": match,
+        "distance": distance,
+    }
+
+
+def copy_album_contents(username, source_id, target_id, merge=False, delete_source=False):
+    """Job body: copy one album's photos into another entirely inside R2.
+
+    Originals and renditions are copied with CopyObject, the embeddings file
+    is carried over with its URLs rewritten (and joined with the target's on
+    a merge), and the duplicate index and counters follow.
+    """
+    source_prefix = f"event_albums/{username}/{source_id}/"
+    target_prefix = f"event_albums/{username}/{target_id}/"
+    originals = [key for key in list_all_objects(source_prefix) if not key.endswith('/') and not key.endswith('.placeholder')]
+    renditions = list_all_objects(rendition_prefix(username, source_id))
+    pairs = [(key, target_prefix + key[len(source_prefix):]) for key in originals]
+    pairs += [
+        (key, rendition_prefix(username, target_id) + key[len(rendition_prefix(username, source_id)):])
+        for key in renditions
+    ]
+    copied, failed = copy_objects_bulk(pairs)
+    copied = set(copied)
+    copied_originals = [target for source, target in pairs[:len(originals)] if target in copied]
+
+    # Carry the embeddings across instead of recomputing them
+    source_url, target_url = get_object_url(source_prefix), get_object_url(target_prefix)
+    document_bytes, _content_type, _error = get_object_bytes(embedding_file_name(username, source_id))
+    if document_bytes:
+        document = rewrite_urls(json.loads(document_bytes), source_url, target_url)
+        if merge:
+            existing, _content_type, _error = get_object_bytes(embedding_file_name(username, target_id))
+            document = merge_documents(json.loads(existing) if existing else None, document)
+        uploaded, _url = upload_bytes_to_r2(
+            json.dumps(document).encode(), embedding_file_name(username, target_id), "application/json"
+        )
+        if not uploaded:
+            failed[embedding_file_name(username, source_id)] = "Could not write the embeddings file."
+
+    key_map = dict(pairs)
+    add_photos(username, target_id, [
+        {**photo, "object_key": key_map[photo["object_key"]]}
+        for photo in get_album_photo_index(username, source_id)
+        if key_map.get(photo["object_key"]) in copied
+    ])
+    # A size counts as copied only if the source had it and every format arrived
+    source_sizes = get_rendition_sizes(originals, username)
+    record_renditions(username, target_id, {
+        target: [
+            size for size in complete_sizes(username, target_id, target.split('/')[-1], copied)
+            if size in source_sizes.get(source, ())
+        ]
+        for source, target in pairs[:len(originals)] if target in copied
+    })
+    photo_count, cover_key = album_stats_from_r2(username, target_id)
+    set_album_stats(username, target_id, photo_count, cover_key)
+
+    deletion = None
+    if merge:
+        grant_album_access_bulk(get_album_access_usernames(username, source_id), username, target_id)
+        if delete_source and not failed:
+            deletion = start_album_deletion(username, source_id)
+            if deletion:
+                submit_album_deletion(username, deletion["id"])
+
+    return {
+        "source": source_id,
+        "target": target_id,
+        "copied_photos": len(copied_originals),
+        "copied_objects": len(copied),
+        "errors": failed,
+        "source_deletion_id": deletion["id"] if deletion else None,
+    }
+
+
+def _album_copy_request(album_id):
+    """Authenticate a photographer and check the source album is theirs.
+
+    Returns ``(username, albums_by_id, data, error_response)``.
+    """
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    try:
+        payload = verify_token(token)
+        username = payload['sub']
+        if payload.get('role') != 'photographer':
+            return None, None, None, (jsonify({"error": "Only photographers can copy albums."}), 403)
+    except Exception as e:
+        return None, None, None, (jsonify({"error": "Authentication failed", "details": str(e)}), 401)
+
+    albums = {album["album_id"]: album for album in get_albums_for_photographer(username)}
+    if album_id not in albums:
+        return None, None, None, (jsonify({"error": "Album not found."}), 404)
+    return username, albums, request.get_json(silent=True) or {}, None
+
+
+@bp.route('/api/albums/<album_id>/copy', methods=['POST'])
+def copy_album(album_id):
+    """Duplicate an album (e.g. as a client proof set) without moving image bytes through the app."""
+    username, albums, data, error_response = _album_copy_request(album_id)
+    if error_response:
+        return error_response
+
+    album_display_name = data.get('name') or f"{albums[album_id]['name']} (copy)"
+    new_album_id = secure_filename(album_display_name.lower().replace(' ', '-'))
+    if not new_album_id:
+        return jsonify({"error": "Invalid album name"}), 400
+    if new_album_id in albums or new_album_id in get_deleting_album_slugs(username):
+        return jsonify({"error": "Album ID already exists for this photographer."}), 409
+
+    created, message = add_album(username, new_album_id, album_display_name)
+    if not created:
+        return jsonify({"error": message}), 409
+    upload_bytes_to_r2(b"", f"event_albums/{username}/{new_album_id}/.placeholder")
+
+    job = job_runner.submit("copy_album", username, copy_album_contents, username, album_id, new_album_id)
     return jsonify({
-        "message": f"Deleted {len(deleted_urls)} photos.",
+        "album": {"id": new_album_id, "name": album_display_name},
+        "job_id": job.id,
+        "status_url": url_for('main.get_job', job_id=job.id),
+    }), 202
+
+
+@bp.route('/api/albums/<album_id>/merge', methods=['POST'])
+def merge_album(album_id):
+    """Merge an album's photos, embeddings and guests into another album.
+
+    With ``delete_source`` the source album is deleted once everything was
+    copied.
+    """
+    username, albums, data, error_response = _album_copy_request(album_id)
+    if error_response:
+        return error_response
+
+    target_id = data.get('into')
+    if not target_id or target_id not in albums:
+        return jsonify({"error": "Target album not found."}), 404
+    if target_id == album_id:
+        return jsonify({"error": "An album cannot be merged into itself."}), 400
+
+    job = job_runner.submit(
+        "merge_album", username, copy_album_contents,
+        username, album_id, target_id, merge=True, delete_source=bool(data.get('delete_source')),
+        dedupe_key=f"merge:{username}:{album_id}:{target_id}",
+    )
+    return jsonify({"job_id": job.id, "status_url": url_for('main.get_job', job_id=job.id)}), 202
+
+
+@bp.route('/api/albums/<album_id>/photos/batch', methods=['DELETE'])
+def delete_photos_batch(album_id):
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    try:
+        payload = verify_token(token)
+        username = payload['sub']
+        if payload.get('role') != 'photographer':
+            return jsonify({"error": "Only photographers can delete photos."}), 403
+    except Exception as e:
+        return jsonify({"error": "Authentication failed", "details": str(e)}), 401
+
+    data = request.get_json()
+    photo_ids = data.get('photo_ids', [])
+    if not photo_ids:
+        return jsonify({"error": "No photo IDs provided."}), 400
+
+    deleted_keys, errors = delete_album_photos(username, album_id, photo_ids)
+
+    return jsonify({
+        "message": f"Deleted {len(deleted_keys)} photos.",
         "errors": errors
     })
 
 
+@bp.route('/api/albums/<album_id>/duplicates', methods=['GET'])
+def get_album_duplicates(album_id):
+    """Group an album's exact and near-duplicate photos.
+
+    ``?scan=true`` first fingerprints up to DUPLICATE_SCAN_BATCH photos that
+    were uploaded before the index existed; call it repeatedly until
+    ``unindexed`` reaches 0.
+    """
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    try:
+        payload = verify_token(token)
+        username = payload['sub']
+        if payload.get('role') != 'photographer':
+            return jsonify({"error": "Only photographers can review duplicates."}), 403
+    except Exception as e:
+        return jsonify({"error": "Authentication failed", "details": str(e)}), 401
+
+    threshold = request.args.get('threshold', DUPLICATE_HAMMING_THRESHOLD, type=int)
+    threshold = max(0, min(threshold, 64))
+    scan = request.args.get('scan', '').lower() in ('1', 'true', 'yes')
+
+    index = get_album_photo_index(username, album_id)
+    unindexed = None
+    scanned = 0
+    if scan:
+        indexed_keys = {photo["object_key"] for photo in index}
+        keys = list_all_objects(f"event_albums/{username}/{album_id}/")
+        missing = [
+            key for key in keys
+            if not key.endswith('/') and not key.endswith('.placeholder') and key not in indexed_keys
+        ]
+        batch = missing[:DUPLICATE_SCAN_BATCH]
+        release_connection()
+        rows = [row for row in r2_listing_pool.map(fingerprint_r2_photo, batch) if row]
+        if rows:
+            add_photos(username, album_id, rows)
+            index = get_album_photo_index(username, album_id)
+        scanned = len(rows)
+        unindexed = len(missing) - scanned
+
+    groups = []
+    for group in group_duplicates(index, threshold):
+        groups.append({
+            "match": group["match"],
+            "photos": [describe_duplicate(photo, group["match"], None) for photo in group["photos"]],
+        })
+
+    return jsonify({
+        "album_id": album_id,
+        "threshold": threshold,
+        "indexed": len(index),
+        "scanned": scanned,
+        "unindexed": unindexed,
+        "duplicate_photos": sum(len(group["photos"]) - 1 for group in groups),
+        "groups": groups,
+    })
+
+
+@bp.route('/api/db/pool-stats', methods=['GET'])
+def db_pool_stats():
+    """Expose per-engine connection pool statistics to photographers."""
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    try:
+        payload = verify_token(token)
+        if payload.get('role') != 'photographer':
+            return jsonify({"error": "Access denied. Photographers only."}), 403
+    except Exception as e:
+        return jsonify({"error": "Authentication required", "details": str(e)}), 401
+
+    return jsonify(get_pool_stats())
+
+
+@bp.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus scrape endpoint; protected when METRICS_TOKEN is set."""
+    expected = os.environ.get("METRICS_TOKEN")
+    if expected and request.headers.get('Authorization', '') != f"Bearer {expected}":
+        return jsonify({"error": "Authentication required"}), 401
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@bp.route('/api/admin/profiles', methods=['GET'])
+def profile_report():
+    """Top functions across stored request profiles (needs a signed profiling header)."""
+    if not profiling.verify_signature(request.headers.get(profiling.PROFILE_HEADER)):
+        return jsonify({"error": "A valid profiling signature is required."}), 403
+
+    route = request.args.get('route')
+    limit = request.args.get('limit', default=25, type=int)
+    sort = request.args.get('sort', 'cumulative')
+    return jsonify({
+        "routes": profiling.list_routes(),
+        "route": route,
+        "functions": profiling.top_functions(route, limit=limit, sort=sort),
+    })
+
+
 # --- VIP Registration (Simplified - No Password) ---
 
-@app.route('/api/download', methods=['GET'])
+@bp.route('/api/download', methods=['GET'])
 def download_photo():
     """Proxy download endpoint for photos - bypasses CORS issues and sets proper headers"""
     photo_key = request.args.get('key')
@@ -879,7 +2335,19 @@ def download_photo():
         return jsonify({"error": "Download failed", "details": str(e)}), 500
 
 
-@app.route('/api/download-zip', methods=['POST'])
+def _stream_file(handle, chunk_size=256 * 1024):
+    """Yield ``handle`` in chunks and close it once fully sent."""
+    try:
+        while True:
+            chunk = handle.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        handle.close()
+
+
+@bp.route('/api/download-zip', methods=['POST'])
 def download_photos_as_zip():
     """Create a ZIP file containing multiple photos and return it as a single download"""
     data = request.get_json()
@@ -889,12 +2357,13 @@ def download_photos_as_zip():
     if not photo_keys:
         return jsonify({"error": "No photo keys provided"}), 400
     
+    # Small archives stay in memory; past the zip budget they spill to disk.
+    zip_buffer = tempfile.SpooledTemporaryFile(max_size=memory.zip_spool_threshold())
     try:
-        # Create in-memory ZIP file
-        zip_buffer = io.BytesIO()
-        
+        total_bytes = 0
         with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
             for i, key in enumerate(photo_keys):
+                photo_bytes = None
                 try:
                     # Get photo bytes from R2
                     photo_bytes, content_type, error = get_object_bytes(key)
@@ -913,23 +2382,32 @@ def download_photos_as_zip():
                 except Exception as e:
                     print(f"Failed to add {key} to zip: {e}")
                     continue
-        
+                if photo_bytes:
+                    total_bytes += len(photo_bytes)
+                    memory.check_zip_size(total_bytes)
+                    del photo_bytes
+
+        zip_size = zip_buffer.tell()
         zip_buffer.seek(0)
-        
+
         return Response(
-            zip_buffer.getvalue(),
+            _stream_file(zip_buffer),
             mimetype='application/zip',
             headers={
                 'Content-Disposition': f'attachment; filename="{zip_filename}"',
-                'Content-Length': str(len(zip_buffer.getvalue()))
+                'Content-Length': str(zip_size)
             }
         )
+    except memory.OverBudget:
+        zip_buffer.close()
+        raise
     except Exception as e:
+        zip_buffer.close()
         traceback.print_exc()
         return jsonify({"error": "ZIP creation failed", "details": str(e)}), 500
 
 
-@app.route('/api/auth/vip-register', methods=['POST'])
+@bp.route('/api/auth/vip-register', methods=['POST'])
 def vip_register():
     """Register a VIP attendee with name, email, and face photo only (no password)."""
     if 'name' not in request.form or 'email' not in request.form:
@@ -953,18 +2431,10 @@ def vip_register():
         return jsonify({"error": "This email is already registered. Please use the login option."}), 409
     
     # Auto-generate username from name
-    base_username = name.lower().replace(' ', '_').replace('.', '')[:20]
-    username = f"{base_username}_{uuid.uuid4().hex[:6]}"
+    username = vip_username_for(name)
     
     # Save reference photo (same flow as regular signup)
-    filename = secure_filename(ref_photo.filename)
-    unique_name = f"{uuid.uuid4()}_{filename}"
-    local_path = os.path.join(UPLOAD_FOLDER, unique_name)
-    ref_photo.save(local_path)
-    
-    r2_path = f"user_profiles/{username}/{unique_name}"
-    upload_success, _public_url = upload_to_r2(local_path, r2_path)
-    os.remove(local_path)
+    upload_success, r2_path, _public_url = store_reference_photo(username, ref_photo)
     
     if not upload_success:
         return jsonify({"error": "Could not save reference photo."}), 500
@@ -995,7 +2465,7 @@ def vip_register():
     }), 201
 
 
-@app.route('/api/auth/vip-login', methods=['POST'])
+@bp.route('/api/auth/vip-login', methods=['POST'])
 def vip_login():
     """Auto-login for returning VIP users by email lookup."""
     data = request.get_json()
@@ -1035,7 +2505,7 @@ def vip_login():
     })
 
 
-@app.route('/api/auth/vip-update-photo', methods=['POST'])
+@bp.route('/api/auth/vip-update-photo', methods=['POST'])
 def vip_update_photo():
     """Allow VIP users to update their face photo if matching fails."""
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
@@ -1057,21 +2527,14 @@ def vip_update_photo():
         return jsonify({"error": "User not found."}), 404
     
     # Save new photo
-    filename = secure_filename(ref_photo.filename)
-    unique_name = f"{uuid.uuid4()}_{filename}"
-    local_path = os.path.join(UPLOAD_FOLDER, unique_name)
-    ref_photo.save(local_path)
-    
-    r2_path = f"user_profiles/{username}/{unique_name}"
-    upload_success, public_url = upload_to_r2(local_path, r2_path)
-    os.remove(local_path)
+    upload_success, r2_path, public_url = store_reference_photo(username, ref_photo)
     
     if not upload_success:
         return jsonify({"error": "Could not upload photo."}), 500
     
     # Delete old photo if exists
-    previous_path = user.ref_photo_path
-    if not update_user_reference_photo(username, r2_path):
+    updated, previous_path = replace_user_reference_photo(username, r2_path)
+    if not updated:
         delete_from_r2(r2_path)
         return jsonify({"error": "Could not update photo."}), 500
     
@@ -1084,5 +2547,14 @@ def vip_update_photo():
     })
 
 
+@bp.cli.command("init-db")
+def init_db_command():
+    """Create any missing database tables."""
+    init_db()
+    print("Database tables are up to date.")
+
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=int(os.environ.get("PORT", 8000)))
\ No newline at end of file
+    # The local development server creates the tables itself
+    init_db()
+    create_app().run(debug=True, host='0.0.0.0', port=int(os.environ.get("PORT", 8000)))
\ No newline at end of file
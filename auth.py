@@ -1,15 +1,26 @@
 # auth.py
 import jwt
 import datetime
+import hmac
+import time
 import uuid
-from config import JWT_SECRET
-from db import get_user
+from cache import TTLCache
+from config import JWT_SECRET, TOKEN_CACHE_SIZE
+from db import get_user_credentials
+from metrics import timed
+
+# Verified claims keyed by ``jti``; each entry lives until the token's ``exp``.
+_token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, clock=time.time)
 
 def authenticate_user(username, password):
-    """Check if username and password are valid by checking the database."""
-    user = get_user(username)
-    if user and user.password == password:
-        return user
+    """Check if username and password are valid by checking the database.
+
+    Always reads the primary, never the user cache, so a changed password
+    stops working on every worker at once.
+    """
+    credentials = get_user_credentials(username)
+    if credentials and credentials[1] is not None and credentials[1] == password:
+        return credentials[0]
     return None
 
 def create_token(subject, role, expires_in=86400):
@@ -28,7 +39,25 @@ def create_token(subject, role, expires_in=86400):
     token = jwt.encode(payload, JWT_SECRET, algorithm='HS256')
     return token
 
+@timed("auth.verify_token")
 def verify_token(token):
-    """Verify and decode a JWT token."""
+    """Verify and decode a JWT token.
+
+    Successfully verified claims are cached by ``jti`` until they expire, so
+    repeat requests with the same token skip signature verification.  A cache
+    hit still requires the presented token to match the one that was verified.
+    """
+    try:
+        jti = jwt.decode(token, options={"verify_signature": False}).get('jti')
+    except jwt.InvalidTokenError:
+        jti = None
+
+    if jti:
+        cached = _token_cache.get(jti)
+        if cached is not None and hmac.compare_digest(cached[0], token):
+            return dict(cached[1])
+
     payload = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
-    return payload
\ No newline at end of file
+    if jti and payload.get('jti') == jti and 'exp' in payload:
+        _token_cache.set(jti, (token, dict(payload)), expires_at=float(payload['exp']))
+    return payload
@@ -0,0 +1,100 @@
+"""Generate missing thumbnail/preview renditions for photos already in R2.
+
+Usage examples:
+    # Every album of every photographer
+    python backfill_renditions.py
+
+    # One photographer, or one album
+    python backfill_renditions.py --photographer demo
+    python backfill_renditions.py --photographer demo --album wedding-2024
+
+    # Regenerate even where renditions exist (e.g. after changing sizes)
+    python backfill_renditions.py --force
+
+Photos whose renditions are all present are skipped, so the script can be
+re-run safely after an interruption.  The sizes found or stored are recorded
+in the ``photo_renditions`` table, which is what listings advertise, so run
+it once for albums uploaded before that table existed.
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Set
+
+from db import record_renditions
+from r2_storage import R2_CONFIG, get_object_bytes, s3
+from renditions import ORIGINALS_ROOT, complete_sizes, rendition_keys, rendition_prefix, store_renditions
+
+
+def _iter_keys(prefix: str, delimiter: str = "") -> Iterator[str]:
+    paginator = s3.get_paginator("list_objects_v2")
+    params = {"Bucket": R2_CONFIG["bucket_name"], "Prefix": prefix}
+    if delimiter:
+        params["Delimiter"] = delimiter
+    for page in paginator.paginate(**params):
+        for item in page.get("CommonPrefixes", []):
+            yield item["Prefix"]
+        for item in page.get("Contents", []):
+            yield item["Key"]
+
+
+def _albums(photographer: str = None, album: str = None) -> Iterator[str]:
+    if photographer and album:
+        yield f"{ORIGINALS_ROOT}/{photographer}/{album}/"
+        return
+    photographers = [f"{ORIGINALS_ROOT}/{photographer}/"] if photographer else [
+        key for key in _iter_keys(f"{ORIGINALS_ROOT}/", "/") if key.endswith("/")
+    ]
+    for photographer_prefix in photographers:
+        for key in _iter_keys(photographer_prefix, "/"):
+            if key.endswith("/"):
+                yield key
+
+
+def _backfill_photo(photographer: str, album_id: str, key: str) -> str:
+    photo_bytes, _content_type, error = get_object_bytes(key)
+    if photo_bytes is None:
+        return f"failed ({error})"
+    try:
+        sizes = store_renditions(photographer, album_id, key.split("/")[-1], photo_bytes)
+    except Exception as exc:
+        return f"failed ({exc})"
+    record_renditions(photographer, album_id, {key: sizes})
+    return f"stored sizes {sizes}"
+
+
+def backfill_album(album_prefix: str, force: bool, workers: int) -> int:
+    _root, photographer, album_id = album_prefix.rstrip("/").split("/")
+    existing: Set[str] = set() if force else set(_iter_keys(rendition_prefix(photographer, album_id)))
+    originals = [key for key in _iter_keys(album_prefix) if not key.endswith("/") and not key.endswith(".placeholder")]
+    pending = [
+        key for key in originals
+        if force or not set(rendition_keys(photographer, album_id, key.split("/")[-1])) <= existing
+    ]
+    # Renditions already in R2 are recorded without being regenerated
+    record_renditions(photographer, album_id, {
+        key: complete_sizes(photographer, album_id, key.split("/")[-1], existing) for key in originals
+    })
+    print(f"{album_prefix}: {len(pending)} photo(s) to process")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for key, outcome in zip(pending, pool.map(lambda key: _backfill_photo(photographer, album_id, key), pending)):
+            print(f"  {key}: {outcome}")
+    return len(pending)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill photo renditions in R2.")
+    parser.add_argument("--photographer", help="Only process this photographer's albums.")
+    parser.add_argument("--album", help="Only process this album (requires --photographer).")
+    parser.add_argument("--force", action="store_true", help="Regenerate renditions that already exist.")
+    parser.add_argument("--workers", type=int, default=4, help="Photos processed concurrently (default: 4).")
+    args = parser.parse_args()
+    if args.album and not args.photographer:
+        parser.error("--album requires --photographer")
+
+    total = sum(backfill_album(prefix, args.force, args.workers) for prefix in _albums(args.photographer, args.album))
+    print(f"\nProcessed {total} photo(s).")
+
+
+if __name__ == "__main__":
+    main()
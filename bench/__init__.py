@@ -0,0 +1,4 @@
+"""Offline benchmark harness with local stand-ins for R2 and the ML service.
+
+Run ``python -m bench.run --help`` from the repository root.
+"""
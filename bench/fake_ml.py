@@ -0,0 +1,160 @@
+"""Stand-in for the face-recognition ML service used by the benchmarks.
+
+Implements the three endpoints the Flask app calls:
+
+* ``POST /add_embeddings_from_urls/`` -- form fields ``urls`` (repeated) and
+  ``embedding_file``; optionally downloads each URL like the real service.
+* ``POST /find_similar_faces/`` -- multipart ``file`` plus ``embedding_file``
+  and ``threshold``; returns a deterministic subset of the indexed URLs.
+* ``POST /remove_embedding/`` -- form fields ``embedding_file`` and
+  ``image_urls`` (JSON list).
+
+Embedding files are kept in memory and, when an object store is attached,
+also written to it as ``<embedding_file>`` JSON so the app sees them in R2.
+Every request sleeps for the configured latency first.
+"""
+
+import argparse
+import json
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+import requests
+
+
+class EmbeddingIndex:
+    def __init__(self, store=None, bucket: Optional[str] = None):
+        self._lock = threading.Lock()
+        self.files: Dict[str, List[dict]] = {}
+        self.store = store
+        self.bucket = bucket
+
+    def _load(self, name: str) -> List[dict]:
+        entries = self.files.get(name)
+        if entries is None and self.store is not None:
+            obj = self.store.get(self.bucket, name)
+            entries = json.loads(obj[0]) if obj else []
+            self.files[name] = entries
+        return entries if entries is not None else self.files.setdefault(name, [])
+
+    def _save(self, name: str) -> None:
+        if self.store is not None:
+            self.store.put(self.bucket, name, json.dumps(self.files[name]).encode(), "application/json")
+
+    def add(self, name: str, urls: List[str]) -> int:
+        with self._lock:
+            entries = self._load(name)
+            for url in urls:
+                entries.append({"url": url, "embedding": [round((hash(url) % 1000) / 1000.0, 3)] * 8})
+            self._save(name)
+            return len(urls)
+
+    def remove(self, name: str, urls: List[str]) -> int:
+        drop = set(urls)
+        with self._lock:
+            entries = self._load(name)
+            kept = [entry for entry in entries if entry["url"] not in drop]
+            self.files[name] = kept
+            self._save(name)
+            return len(entries) - len(kept)
+
+    def matches(self, name: str, limit: int = 25) -> List[dict]:
+        with self._lock:
+            entries = list(self._load(name))
+        return [{"url": entry["url"], "score": 0.9 - index * 0.01} for index, entry in enumerate(entries[:limit])]
+
+
+class FakeMLHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    index: EmbeddingIndex = None
+    latency: float = 0.0
+    fetch_urls: bool = False
+
+    def log_message(self, *_args):
+        pass
+
+    def _form(self) -> Dict[str, List]:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("multipart/form-data"):
+            message = BytesParser(policy=HTTP).parsebytes(
+                f"Content-Type: {content_type}\r\n\r\n".encode() + body
+            )
+            form: Dict[str, List] = {}
+            for part in message.iter_parts():
+                name = part.get_param("name", header="content-disposition")
+                payload = part.get_payload(decode=True) or b""
+                value = payload if part.get_filename() else payload.decode()
+                form.setdefault(name, []).append(value)
+            return form
+        return {k: v for k, v in parse_qs(body.decode(), keep_blank_values=True).items()}
+
+    def _json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        form = self._form()
+        if self.latency:
+            time.sleep(self.latency)
+        embedding_file = (form.get("embedding_file") or [""])[0]
+        path = self.path.split("?", 1)[0].strip("/")
+
+        if path == "add_embeddings_from_urls":
+            urls = form.get("urls") or []
+            if self.fetch_urls:
+                for url in urls:
+                    requests.get(url, timeout=30)
+            added = self.index.add(embedding_file, urls)
+            return self._json(200, {"added_count": added, "embedding_file": embedding_file})
+
+        if path == "find_similar_faces":
+            if not form.get("file"):
+                return self._json(400, {"detail": "file is required"})
+            matches = self.index.matches(embedding_file)
+            return self._json(200, {"matches": matches, "match_count": len(matches)})
+
+        if path == "remove_embedding":
+            urls = json.loads((form.get("image_urls") or ["[]"])[0])
+            removed = self.index.remove(embedding_file, urls)
+            return self._json(200, {"removed_count": removed})
+
+        self._json(404, {"detail": "Not Found"})
+
+
+def start(port: int = 0, latency: float = 0.0, store=None, bucket: Optional[str] = None, fetch_urls: bool = False):
+    """Start the server on a daemon thread; returns ``(server, index)``."""
+    index = EmbeddingIndex(store, bucket)
+    handler = type(
+        "BoundFakeMLHandler",
+        (FakeMLHandler,),
+        {"index": index, "latency": latency, "fetch_urls": fetch_urls},
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-ml", daemon=True).start()
+    return server, index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a stand-in for the face-recognition ML service.")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request.")
+    args = parser.parse_args()
+    server, _index = start(args.port, args.latency)
+    print(f"fake ML service listening on http://127.0.0.1:{server.server_address[1]}/")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
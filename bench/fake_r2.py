@@ -0,0 +1,313 @@
+"""In-memory S3-compatible server standing in for Cloudflare R2.
+
+Implements the subset of the S3 REST API that ``r2_storage`` and boto3 use:
+PutObject (including ``aws-chunked`` bodies and CopyObject), GetObject,
+HeadObject, DeleteObject, DeleteObjects, ListObjectsV2 and multipart uploads.
+Requests are path-style (``/<bucket>/<key>``) and signatures are not checked,
+so presigned URLs work as-is.  ``GET /<bucket>/<key>`` doubles as the public
+URL, so ``R2_PUBLIC_BASE_URL`` can be ``http://host:port/<bucket>``.
+
+Run standalone with ``python -m bench.fake_r2 --port 9000``.
+"""
+
+import argparse
+import hashlib
+import threading
+import time
+import uuid
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+import xml.etree.ElementTree as ET
+
+
+class ObjectStore:
+    """Thread-safe bucket -> key -> (bytes, content type, etag) store."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.buckets: Dict[str, Dict[str, Tuple[bytes, str, str, float]]] = {}
+        self.uploads: Dict[str, dict] = {}
+
+    def put(self, bucket: str, key: str, data: bytes, content_type: str = "application/octet-stream") -> str:
+        etag = hashlib.md5(data).hexdigest()
+        with self._lock:
+            self.buckets.setdefault(bucket, {})[key] = (data, content_type, etag, time.time())
+        return etag
+
+    def get(self, bucket: str, key: str) -> Optional[Tuple[bytes, str, str, float]]:
+        with self._lock:
+            return self.buckets.get(bucket, {}).get(key)
+
+    def delete(self, bucket: str, key: str) -> None:
+        with self._lock:
+            self.buckets.get(bucket, {}).pop(key, None)
+
+    def keys(self, bucket: str):
+        with self._lock:
+            return sorted(self.buckets.get(bucket, {}))
+
+
+class FakeR2Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    store: ObjectStore = None
+    latency: float = 0.0
+
+    def log_message(self, *_args):
+        pass
+
+    # -- helpers -------------------------------------------------------------
+    def _split(self):
+        parts = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(parts.query, keep_blank_values=True).items()}
+        path = unquote(parts.path).lstrip("/")
+        bucket, _, key = path.partition("/")
+        return bucket, key, query
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if "aws-chunked" in (self.headers.get("Content-Encoding") or "") or self.headers.get(
+            "x-amz-decoded-content-length"
+        ):
+            body = _decode_aws_chunked(body)
+        return body
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = "application/xml", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD" and body:
+            self.wfile.write(body)
+
+    def _error(self, status: int, code: str, message: str = ""):
+        body = f"<Error><Code>{code}</Code><Message>{escape(message)}</Message></Error>".encode()
+        self._send(status, body)
+
+    def _delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    # -- verbs ---------------------------------------------------------------
+    def do_PUT(self):
+        self._delay()
+        bucket, key, query = self._split()
+        body = self._read_body()
+        if "uploadId" in query:
+            upload = self.store.uploads.get(query["uploadId"])
+            if upload is None:
+                return self._error(404, "NoSuchUpload")
+            etag = hashlib.md5(body).hexdigest()
+            upload["parts"][int(query["partNumber"])] = (body, etag)
+            return self._send(200, headers={"ETag": f'"{etag}"'})
+
+        copy_source = self.headers.get("x-amz-copy-source")
+        if copy_source:
+            src_bucket, _, src_key = unquote(copy_source).lstrip("/").partition("/")
+            source = self.store.get(src_bucket, src_key)
+            if source is None:
+                return self._error(404, "NoSuchKey", src_key)
+            etag = self.store.put(bucket, key, source[0], source[1])
+            body = (
+                f"<CopyObjectResult><ETag>\"{etag}\"</ETag>"
+                f"<LastModified>{_iso(time.time())}</LastModified></CopyObjectResult>"
+            ).encode()
+            return self._send(200, body)
+
+        etag = self.store.put(bucket, key, body, self.headers.get("Content-Type") or "application/octet-stream")
+        self._send(200, headers={"ETag": f'"{etag}"'})
+
+    def do_GET(self):
+        self._delay()
+        bucket, key, query = self._split()
+        if not key:
+            return self._list(bucket, query)
+        if "uploadId" in query:
+            return self._list_parts(query["uploadId"])
+        obj = self.store.get(bucket, key)
+        if obj is None:
+            return self._error(404, "NoSuchKey", key)
+        data, content_type, etag, modified = obj
+        self._send(200, data, content_type, {"ETag": f'"{etag}"', "Last-Modified": formatdate(modified, usegmt=True)})
+
+    def do_HEAD(self):
+        self._delay()
+        bucket, key, _query = self._split()
+        obj = self.store.get(bucket, key)
+        if obj is None:
+            return self._send(404)
+        data, content_type, etag, modified = obj
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("ETag", f'"{etag}"')
+        self.send_header("Last-Modified", formatdate(modified, usegmt=True))
+        self.end_headers()
+
+    def do_DELETE(self):
+        self._delay()
+        bucket, key, query = self._split()
+        if "uploadId" in query:
+            self.store.uploads.pop(query["uploadId"], None)
+        else:
+            self.store.delete(bucket, key)
+        self._send(204)
+
+    def do_POST(self):
+        self._delay()
+        bucket, key, query = self._split()
+        body = self._read_body()
+        if "delete" in query:
+            return self._delete_objects(bucket, body)
+        if "uploads" in query:
+            upload_id = uuid.uuid4().hex
+            self.store.uploads[upload_id] = {
+                "bucket": bucket,
+                "key": key,
+                "content_type": self.headers.get("Content-Type") or "application/octet-stream",
+                "parts": {},
+            }
+            xml = (
+                f"<InitiateMultipartUploadResult><Bucket>{escape(bucket)}</Bucket>"
+                f"<Key>{escape(key)}</Key><UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>"
+            )
+            return self._send(200, xml.encode())
+        if "uploadId" in query:
+            upload = self.store.uploads.pop(query["uploadId"], None)
+            if upload is None:
+                return self._error(404, "NoSuchUpload")
+            numbers = [int(el.text) for el in ET.fromstring(body).iter() if el.tag.endswith("PartNumber")]
+            data = b"".join(upload["parts"][n][0] for n in sorted(numbers or upload["parts"]))
+            etag = self.store.put(bucket, key, data, upload["content_type"])
+            xml = (
+                f"<CompleteMultipartUploadResult><Bucket>{escape(bucket)}</Bucket><Key>{escape(key)}</Key>"
+                f"<ETag>\"{etag}\"</ETag></CompleteMultipartUploadResult>"
+            )
+            return self._send(200, xml.encode())
+        self._error(400, "InvalidRequest")
+
+    # -- listings ------------------------------------------------------------
+    def _list(self, bucket: str, query: Dict[str, str]):
+        if "uploads" in query:
+            uploads = "".join(
+                f"<Upload><Key>{escape(u['key'])}</Key><UploadId>{uid}</UploadId></Upload>"
+                for uid, u in list(self.store.uploads.items())
+                if u["bucket"] == bucket
+            )
+            return self._send(200, f"<ListMultipartUploadsResult>{uploads}</ListMultipartUploadsResult>".encode())
+
+        prefix = query.get("prefix", "")
+        delimiter = query.get("delimiter", "")
+        max_keys = int(query.get("max-keys", 1000))
+        start_after = query.get("continuation-token") or query.get("start-after") or ""
+
+        contents, prefixes = [], []
+        seen_prefixes = set()
+        truncated = False
+        last = None
+        for key in self.store.keys(bucket):
+            if not key.startswith(prefix) or key <= start_after:
+                continue
+            if len(contents) + len(prefixes) >= max_keys:
+                truncated = True
+                break
+            if delimiter:
+                rest = key[len(prefix):]
+                if delimiter in rest:
+                    common = prefix + rest.split(delimiter, 1)[0] + delimiter
+                    if common not in seen_prefixes:
+                        seen_prefixes.add(common)
+                        prefixes.append(common)
+                    # Resume after everything rolled up under this prefix.
+                    last = common + "\U0010ffff"
+                    continue
+            contents.append(key)
+            last = key
+
+        parts = [f"<ListBucketResult><Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix>"]
+        parts.append(f"<KeyCount>{len(contents) + len(prefixes)}</KeyCount><MaxKeys>{max_keys}</MaxKeys>")
+        parts.append(f"<IsTruncated>{'true' if truncated else 'false'}</IsTruncated>")
+        if truncated and last is not None:
+            parts.append(f"<NextContinuationToken>{escape(last)}</NextContinuationToken>")
+        for key in contents:
+            data, _ctype, etag, modified = self.store.get(bucket, key) or (b"", "", "", 0)
+            parts.append(
+                f"<Contents><Key>{escape(key)}</Key><LastModified>{_iso(modified)}</LastModified>"
+                f"<ETag>\"{etag}\"</ETag><Size>{len(data)}</Size><StorageClass>STANDARD</StorageClass></Contents>"
+            )
+        for common in prefixes:
+            parts.append(f"<CommonPrefixes><Prefix>{escape(common)}</Prefix></CommonPrefixes>")
+        parts.append("</ListBucketResult>")
+        self._send(200, "".join(parts).encode())
+
+    def _list_parts(self, upload_id: str):
+        upload = self.store.uploads.get(upload_id)
+        if upload is None:
+            return self._error(404, "NoSuchUpload")
+        parts = "".join(
+            f"<Part><PartNumber>{n}</PartNumber><ETag>\"{etag}\"</ETag><Size>{len(data)}</Size></Part>"
+            for n, (data, etag) in sorted(upload["parts"].items())
+        )
+        self._send(200, f"<ListPartsResult><UploadId>{upload_id}</UploadId>{parts}</ListPartsResult>".encode())
+
+    def _delete_objects(self, bucket: str, body: bytes):
+        keys = [el.text for el in ET.fromstring(body).iter() if el.tag.endswith("Key")]
+        deleted = []
+        for key in keys:
+            self.store.delete(bucket, key)
+            deleted.append(f"<Deleted><Key>{escape(key)}</Key></Deleted>")
+        self._send(200, f"<DeleteResult>{''.join(deleted)}</DeleteResult>".encode())
+
+
+def _iso(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(timestamp))
+
+
+def _decode_aws_chunked(body: bytes) -> bytes:
+    """Strip ``aws-chunked`` framing (chunk sizes, signatures and trailers)."""
+    out = bytearray()
+    pos = 0
+    while pos < len(body):
+        line_end = body.index(b"\r\n", pos)
+        size = int(body[pos:line_end].split(b";", 1)[0], 16)
+        pos = line_end + 2
+        if size == 0:
+            break
+        out += body[pos:pos + size]
+        pos += size + 2
+    return bytes(out)
+
+
+def start(port: int = 0, latency: float = 0.0, store: Optional[ObjectStore] = None):
+    """Start the server on a daemon thread; returns ``(server, store)``."""
+    store = store or ObjectStore()
+    handler = type("BoundFakeR2Handler", (FakeR2Handler,), {"store": store, "latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-r2", daemon=True).start()
+    return server, store
+
+
+def public_url(server, bucket: str, key: str = "") -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/{bucket}" + (f"/{quote(key)}" if key else "")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run an in-memory S3-compatible server.")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request.")
+    args = parser.parse_args()
+    server, _store = start(args.port, args.latency)
+    print(f"fake R2 listening on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
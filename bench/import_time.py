@@ -0,0 +1,87 @@
+"""Check that ``import app`` stays fast and free of side effects.
+
+Imports the app in ``--runs`` fresh interpreters and reports the median
+wall time of the import and of ``create_app()``.  Exits non-zero if the
+median import exceeds ``--budget-ms`` or if importing created an R2 client,
+a database engine or the static manifest, so it can gate CI.
+
+Examples::
+
+    python -m bench.import_time
+    python -m bench.import_time --runs 10 --budget-ms 600
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Median ``import app`` wall time allowed; tests/test_import_time.py uses it too.
+DEFAULT_BUDGET_MS = 800
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+import models, r2_storage
+side_effects = {
+    "r2_client": r2_storage._client is not None,
+    "db_engine": models.db_config._engine is not None,
+    "static_manifest": bool(app.static_assets.assets),
+}
+app.create_app()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "create_app_ms": (time.perf_counter() - imported) * 1000,
+    "side_effects": side_effects,
+}))
+"""
+
+
+def _probe(env) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=REPO_ROOT, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import-time budget check for app.py.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'import.db')}")
+        # The first run also warms the bytecode cache
+        _probe(env)
+        runs = [_probe(env) for _ in range(args.runs)]
+
+    import_ms = statistics.median(run["import_ms"] for run in runs)
+    create_app_ms = statistics.median(run["create_app_ms"] for run in runs)
+    side_effects = sorted({name for run in runs for name, happened in run["side_effects"].items() if happened})
+    print(json.dumps({
+        "runs": args.runs,
+        "import_ms": round(import_ms, 1),
+        "create_app_ms": round(create_app_ms, 1),
+        "budget_ms": args.budget_ms,
+        "import_side_effects": side_effects,
+    }, indent=2))
+
+    failures = []
+    if import_ms > args.budget_ms:
+        failures.append(f"import took {import_ms:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+    if side_effects:
+        failures.append(f"import created: {', '.join(side_effects)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Compare the full and compact photo-listing formats.
+
+Builds the JSON body of an album listing with ``--photos`` uploaded-style
+keys in each format and reports, per format: the build and serialization
+time (median over ``--repeat`` runs) and the payload size raw, gzipped and
+(if the ``brotli`` package is installed) brotli-compressed.  No R2 or
+database access is needed.
+
+Examples::
+
+    python -m bench.payload_bench
+    python -m bench.payload_bench --photos 10000 --repeat 20
+"""
+
+import argparse
+import gzip
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from typing import Callable, Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+PHOTOGRAPHER = "bench_photographer"
+ALBUM = "bench-album"
+
+
+def _keys(count: int) -> List[str]:
+    return sorted(
+        f"event_albums/{PHOTOGRAPHER}/{ALBUM}/{uuid.uuid4()}_IMG_{index:05d}.jpg"
+        for index in range(count)
+    )
+
+
+def _measure(build: Callable[[], object], repeat: int) -> Dict[str, object]:
+    import compression
+    from config import RESPONSE_COMPRESSION_LEVEL
+
+    build_timings, dump_timings = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = build()
+        built = time.perf_counter()
+        # Flask's jsonify uses json.dumps with compact separators in production
+        payload = json.dumps(body, separators=(",", ":")).encode()
+        build_timings.append(built - start)
+        dump_timings.append(time.perf_counter() - built)
+
+    start = time.perf_counter()
+    gzipped = gzip.compress(payload, compresslevel=RESPONSE_COMPRESSION_LEVEL, mtime=0)
+    gzip_ms = (time.perf_counter() - start) * 1000
+    result = {
+        "build_ms": round(statistics.median(build_timings) * 1000, 2),
+        "serialize_ms": round(statistics.median(dump_timings) * 1000, 2),
+        "bytes": len(payload),
+        "gzip_bytes": len(gzipped),
+        "gzip_ms": round(gzip_ms, 2),
+    }
+    if compression.brotli is not None:
+        start = time.perf_counter()
+        result["br_bytes"] = len(compression.compress(payload, "br"))
+        result["br_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Photo listing payload benchmark.")
+    parser.add_argument("--photos", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    from listings import compact_photo_listing, full_photo_entries
+
+    from config import RENDITION_SIZES
+
+    keys = _keys(args.photos)
+    stored_sizes = {key: list(RENDITION_SIZES) for key in keys}
+    results = {
+        "full": _measure(lambda: full_photo_entries(PHOTOGRAPHER, ALBUM, keys, stored_sizes), args.repeat),
+        "compact": _measure(lambda: compact_photo_listing(PHOTOGRAPHER, ALBUM, keys, stored_sizes), args.repeat),
+    }
+
+    print(json.dumps({"photos": args.photos, "results": results}, indent=2))
+    full, compact = results["full"], results["compact"]
+    print(f"raw: {full['bytes']} -> {compact['bytes']} bytes ({full['bytes'] / compact['bytes']:.1f}x)")
+    print(f"gzip: {full['gzip_bytes']} -> {compact['gzip_bytes']} bytes")
+    full_ms, compact_ms = full["build_ms"] + full["serialize_ms"], compact["build_ms"] + compact["serialize_ms"]
+    print(f"build + serialize: {full_ms:.2f} ms -> {compact_ms:.2f} ms ({full_ms / compact_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""Drive the main request paths against local R2/ML stand-ins and record results.
+
+Starts an in-memory S3 server (``bench.fake_r2``) and a fake ML service
+(``bench.fake_ml``) in this process, seeds a photographer, a VIP attendee and
+an album, then launches the Flask app in a subprocess pointed at them.  Each
+scenario is driven at every requested concurrency level and the throughput,
+p50/p99 latency, error count and the app's peak RSS are written to JSON.
+
+Examples::
+
+    python -m bench.run --output bench_results.json
+    python -m bench.run --scenarios event,find --concurrency 1,8,32 --ml-latency 0.2
+    python -m bench.run --output new.json --compare bench_results.json
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+from bench import fake_ml, fake_r2
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUCKET = "bench"
+PHOTOGRAPHER = "bench_photographer"
+VIP = "bench_vip"
+ALBUM = "bench-album"
+
+SCENARIOS = ("upload", "albums", "attendee_albums", "event", "find", "zip")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _jpeg(width: int, height: int, seed: int) -> bytes:
+    from PIL import Image
+
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height), (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    noise = Image.effect_noise((width // 4, height // 4), 40).convert("RGB").resize((width, height))
+    image = Image.blend(image, noise, 0.5)
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def _process_tree(pid: int) -> List[int]:
+    pids = [pid]
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as handle:
+                for child in handle.read().split():
+                    pids.extend(_process_tree(int(child)))
+    except OSError:
+        pass
+    return pids
+
+
+def _reset_peak_rss(pid: int) -> None:
+    """Reset VmHWM for the app's processes (Linux only, best effort)."""
+    for proc in _process_tree(pid):
+        try:
+            with open(f"/proc/{proc}/clear_refs", "w") as handle:
+                handle.write("5")
+        except OSError:
+            pass
+
+
+def _peak_rss_mb(pid: int) -> Optional[float]:
+    total_kb = 0
+    found = False
+    for proc in _process_tree(pid):
+        try:
+            with open(f"/proc/{proc}/status") as handle:
+                for line in handle:
+                    if line.startswith("VmHWM:"):
+                        total_kb += int(line.split()[1])
+                        found = True
+        except OSError:
+            pass
+    if not found:
+        return None
+    return round(total_kb / 1024.0, 1)
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.workdir = tempfile.mkdtemp(prefix="faceapp-bench-")
+        self.r2_server, self.store = fake_r2.start(latency=args.r2_latency)
+        self.ml_server, self.ml_index = fake_ml.start(
+            latency=args.ml_latency, store=self.store, bucket=BUCKET, fetch_urls=args.ml_fetch
+        )
+        self.r2_url = f"http://127.0.0.1:{self.r2_server.server_address[1]}"
+        self.public_base = fake_r2.public_url(self.r2_server, BUCKET)
+        self.app_port = _free_port()
+        self.base_url = f"http://127.0.0.1:{self.app_port}"
+        self.env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(self.workdir, 'bench.db')}",
+            R2_ENDPOINT_URL=self.r2_url,
+            R2_BUCKET_NAME=BUCKET,
+            R2_PUBLIC_BASE_URL=self.public_base,
+            R2_AWS_ACCESS_KEY_ID="bench",
+            R2_AWS_SECRET_ACCESS_KEY="bench",
+            AWS_DEFAULT_REGION="auto",
+            ML_API_BASE_URL=f"http://127.0.0.1:{self.ml_server.server_address[1]}/",
+        )
+        self.process = None
+        self.upload_image = _jpeg(args.image_width, args.image_height, seed=1)
+        self.photo_keys: List[str] = []
+
+    # -- setup ---------------------------------------------------------------
+    def seed(self) -> None:
+        os.environ.update({k: v for k, v in self.env.items() if k.startswith(("DATABASE_", "R2_", "ML_"))})
+        sys.path.insert(0, REPO_ROOT)
+        import auth
+        import db
+        from embeddings import embedding_file_name
+
+        db.init_db()
+        db.add_user(PHOTOGRAPHER, "bench-password", "photographer", None)
+        db.add_user(VIP, None, "vip_attendee", f"user_profiles/{VIP}/ref.jpg", email="vip@bench.local")
+        db.add_album(PHOTOGRAPHER, ALBUM, "Bench Album")
+        db.grant_album_access(VIP, PHOTOGRAPHER, ALBUM)
+
+        self.store.put(BUCKET, f"user_profiles/{VIP}/ref.jpg", _jpeg(800, 800, seed=2), "image/jpeg")
+        self.store.put(BUCKET, f"event_albums/{PHOTOGRAPHER}/{ALBUM}/.placeholder", b"")
+        photo = _jpeg(self.args.image_width, self.args.image_height, seed=3)
+        urls = []
+        for index in range(self.args.photos):
+            key = f"event_albums/{PHOTOGRAPHER}/{ALBUM}/seed_{index:05d}.jpg"
+            self.store.put(BUCKET, key, photo, "image/jpeg")
+            self.photo_keys.append(key)
+            urls.append(f"{self.public_base}/{key}")
+        self.ml_index.add(embedding_file_name(PHOTOGRAPHER, ALBUM), urls)
+
+        self.photographer_token = auth.create_token(PHOTOGRAPHER, "photographer")
+        self.vip_token = auth.create_token(VIP, "vip_attendee")
+
+    def start_app(self) -> None:
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "bench.serve_app", "--port", str(self.app_port)],
+            cwd=REPO_ROOT,
+            env=self.env,
+            stdout=subprocess.DEVNULL if not self.args.verbose else None,
+            stderr=subprocess.DEVNULL if not self.args.verbose else None,
+        )
+        deadline = time.time() + 60
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError("app exited during startup; rerun with --verbose")
+            try:
+                requests.get(f"{self.base_url}/metrics", timeout=1)
+                return
+            except requests.RequestException:
+                time.sleep(0.2)
+        raise RuntimeError("app did not start within 60s")
+
+    def stop(self) -> None:
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.r2_server.shutdown()
+        self.ml_server.shutdown()
+
+    # -- scenarios -----------------------------------------------------------
+    def _auth(self, token: str) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {token}"}
+
+    def scenario(self, name: str) -> Callable[[requests.Session, int], requests.Response]:
+        base = self.base_url
+        if name == "upload":
+            def call(session, i):
+                files = {"file": (f"bench_{i}.jpg", self.upload_image, "image/jpeg")}
+                return session.post(
+                    f"{base}/api/upload-single-file",
+                    files=files,
+                    data={"album": ALBUM},
+                    headers=self._auth(self.photographer_token),
+                )
+        elif name == "albums":
+            def call(session, i):
+                return session.get(f"{base}/api/albums", headers=self._auth(self.photographer_token))
+        elif name == "attendee_albums":
+            def call(session, i):
+                return session.get(f"{base}/api/attendee/albums", headers=self._auth(self.vip_token))
+        elif name == "event":
+            def call(session, i):
+                return session.get(f"{base}/api/event/{PHOTOGRAPHER}/{ALBUM}")
+        elif name == "find":
+            def call(session, i):
+                return session.get(
+                    f"{base}/api/find-my-photos/{PHOTOGRAPHER}/{ALBUM}", headers=self._auth(self.vip_token)
+                )
+        elif name == "zip":
+            def call(session, i):
+                keys = self.photo_keys[: self.args.zip_photos]
+                return session.post(f"{base}/api/download-zip", json={"photo_keys": keys, "filename": "bench.zip"})
+        else:
+            raise ValueError(f"unknown scenario {name!r}")
+        return call
+
+    def drive(self, name: str, concurrency: int) -> Dict[str, object]:
+        call = self.scenario(name)
+        total = max(self.args.requests, concurrency)
+        sessions = [requests.Session() for _ in range(concurrency)]
+        latencies: List[float] = []
+        errors = 0
+
+        def worker(slot: int):
+            nonlocal errors
+            session = sessions[slot]
+            for i in range(slot, total, concurrency):
+                start = time.perf_counter()
+                try:
+                    response = call(session, i)
+                    response.content
+                    failed = response.status_code >= 400
+                except requests.RequestException:
+                    failed = True
+                latencies.append(time.perf_counter() - start)
+                if failed:
+                    errors += 1
+
+        _reset_peak_rss(self.process.pid)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(worker, range(concurrency)))
+        elapsed = time.perf_counter() - started
+        for session in sessions:
+            session.close()
+
+        latencies.sort()
+        return {
+            "requests": total,
+            "errors": errors,
+            "seconds": round(elapsed, 4),
+            "throughput_rps": round(total / elapsed, 2) if elapsed else None,
+            "p50_ms": round(_percentile(latencies, 0.50) * 1000, 2),
+            "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+            "peak_rss_mb": _peak_rss_mb(self.process.pid),
+        }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous: dict, current: dict) -> None:
+    """Print throughput and p99 changes between two result files."""
+    print(f"\nComparison: {previous['meta'].get('git')} -> {current['meta'].get('git')}")
+    print(f"{'scenario':<18}{'conc':>6}{'rps old':>10}{'rps new':>10}{'Δrps':>9}{'p99 old':>10}{'p99 new':>10}{'Δp99':>9}")
+    for name, levels in current["results"].items():
+        for level, new in levels.items():
+            old = previous.get("results", {}).get(name, {}).get(level)
+            if not old:
+                continue
+
+            def delta(a, b):
+                return f"{(b - a) / a * 100:+.1f}%" if a else "n/a"
+
+            print(
+                f"{name:<18}{level:>6}{old['throughput_rps']:>10}{new['throughput_rps']:>10}"
+                f"{delta(old['throughput_rps'], new['throughput_rps']):>9}"
+                f"{old['p99_ms']:>10}{new['p99_ms']:>10}{delta(old['p99_ms'], new['p99_ms']):>9}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the app against local R2 and ML stand-ins.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of {SCENARIOS}.")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels.")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per scenario and level.")
+    parser.add_argument("--photos", type=int, default=200, help="Photos seeded into the album.")
+    parser.add_argument("--zip-photos", type=int, default=20, help="Photos per zip download.")
+    parser.add_argument("--image-width", type=int, default=2400)
+    parser.add_argument("--image-height", type=int, default=1600)
+    parser.add_argument("--r2-latency", type=float, default=0.005, help="Seconds added to every R2 request.")
+    parser.add_argument("--ml-latency", type=float, default=0.05, help="Seconds added to every ML request.")
+    parser.add_argument("--ml-fetch", action="store_true", help="Have the fake ML service download indexed URLs.")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="Earlier result file to compare against.")
+    parser.add_argument("--verbose", action="store_true", help="Show the app's stdout/stderr.")
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    harness = Harness(args)
+    results: Dict[str, Dict[str, dict]] = {}
+    try:
+        harness.seed()
+        harness.start_app()
+        for name in scenarios:
+            results[name] = {}
+            for level in levels:
+                result = harness.drive(name, level)
+                results[name][str(level)] = result
+                print(
+                    f"{name:<18} c={level:<4} {result['throughput_rps']:>8} rps  "
+                    f"p50 {result['p50_ms']:>8} ms  p99 {result['p99_ms']:>8} ms  "
+                    f"errors {result['errors']:<4} peak RSS {result['peak_rss_mb']} MB",
+                    flush=True,
+                )
+    finally:
+        harness.stop()
+
+    output = {
+        "meta": {
+            "git": _git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as handle:
+        json.dump(output, handle, indent=2)
+    print(f"\nWrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as handle:
+            compare(json.load(handle), output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""Serve ``app.app`` for the benchmark harness on a threaded werkzeug server.
+
+The harness sets ``DATABASE_URL``, ``R2_*`` and ``ML_API_BASE_URL`` in the
+environment before launching this module, so the app talks to the local
+stand-ins instead of Cloudflare and Cloud Run.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the Flask app for benchmarking.")
+    parser.add_argument("--port", type=int, required=True)
+    args = parser.parse_args()
+
+    from werkzeug.serving import make_server
+
+    import app as application
+
+    server = make_server("127.0.0.1", args.port, application.app, threaded=True)
+    print(f"serving on http://127.0.0.1:{args.port}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
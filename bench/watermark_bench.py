@@ -0,0 +1,179 @@
+"""Compare the legacy full-frame watermark with ``imaging.watermark_bytes``.
+
+Each variant runs in a fresh process so its peak RSS is not polluted by the
+other.  Reported per variant: median and best wall time per photo over
+``--repeat`` runs after a warm-up, and the peak RSS growth of the first of
+them.
+
+Examples::
+
+    python -m bench.watermark_bench
+    python -m bench.watermark_bench --width 6000 --height 4000 --orientation 6
+    python -m bench.watermark_bench --image path/to/photo.jpg --max-pixels 12000000
+"""
+
+import argparse
+import ctypes
+import io
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+from typing import Dict, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from bench.run import _jpeg  # noqa: E402
+
+
+def legacy_watermark(image_bytes: bytes, logo_path: str) -> bytes:
+    """``apply_watermark`` as it was before the region compositor, on bytes."""
+    from PIL import Image, ImageOps
+
+    base_image = Image.open(io.BytesIO(image_bytes))
+    base_image = ImageOps.exif_transpose(base_image)
+    base_image = base_image.convert("RGBA")
+
+    logo = Image.open(logo_path).convert("RGBA")
+    base_width, base_height = base_image.size
+    logo_width = base_width // 10
+    logo_ratio = logo_width / logo.width
+    logo_height = int(logo.height * logo_ratio)
+    logo = logo.resize((logo_width, logo_height), Image.LANCZOS)
+
+    position = (base_width - logo.width, 0)
+    base_image.paste(logo, position, logo)
+
+    buffer = io.BytesIO()
+    base_image.convert("RGB").save(buffer, "JPEG", quality=95)
+    return buffer.getvalue()
+
+
+def _reset_peak_rss() -> None:
+    try:
+        with open("/proc/self/clear_refs", "w") as handle:
+            handle.write("5")
+    except OSError:
+        pass
+
+
+def _release_free_memory() -> None:
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def _peak_rss() -> Optional[int]:
+    try:
+        with open("/proc/self/status") as handle:
+            for line in handle:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _current_rss() -> Optional[int]:
+    try:
+        with open("/proc/self/status") as handle:
+            for line in handle:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _run_variant(variant: str, image_bytes: bytes, logo_path: str, repeat: int, max_pixels: Optional[int], queue) -> None:
+    import imaging
+
+    if variant == "legacy":
+        work = lambda: legacy_watermark(image_bytes, logo_path)  # noqa: E731
+    else:
+        work = lambda: imaging.watermark_bytes(image_bytes, logo_path, max_pixels=max_pixels)  # noqa: E731
+
+    # Warm up (codecs, the compositor's logo cache), then hand the freed
+    # memory back to the OS so the measured run cannot quietly reuse it.
+    work()
+    _release_free_memory()
+
+    _reset_peak_rss()
+    baseline = _current_rss()
+    start = time.perf_counter()
+    output = work()
+    timings = [time.perf_counter() - start]
+    peak = _peak_rss()
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        work()
+        timings.append(time.perf_counter() - start)
+
+    queue.put({
+        "variant": variant,
+        "median_ms": round(statistics.median(timings) * 1000, 1),
+        "best_ms": round(min(timings) * 1000, 1),
+        "peak_rss_growth_mib": round((peak - baseline) / 1048576, 1) if peak and baseline else None,
+        "output_bytes": len(output),
+    })
+
+
+def _with_orientation(image_bytes: bytes, orientation: int) -> bytes:
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(image_bytes))
+    exif = image.getexif()
+    exif[0x0112] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=90, exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+def main() -> None:
+    from config import WATERMARK_LOGO_PATH
+
+    parser = argparse.ArgumentParser(description="Watermark micro-benchmark.")
+    parser.add_argument("--image", help="JPEG to watermark (default: a synthetic photo).")
+    parser.add_argument("--width", type=int, default=6000)
+    parser.add_argument("--height", type=int, default=4000)
+    parser.add_argument("--orientation", type=int, default=1, help="EXIF orientation for the synthetic photo.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-pixels", type=int, help="Also pass max_pixels to the new compositor.")
+    parser.add_argument("--logo", default=WATERMARK_LOGO_PATH)
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, "rb") as handle:
+            image_bytes = handle.read()
+    else:
+        image_bytes = _jpeg(args.width, args.height, seed=1)
+        if args.orientation != 1:
+            image_bytes = _with_orientation(image_bytes, args.orientation)
+
+    context = multiprocessing.get_context("spawn")
+    results: Dict[str, dict] = {}
+    for variant in ("legacy", "region"):
+        queue = context.Queue()
+        process = context.Process(
+            target=_run_variant,
+            args=(variant, image_bytes, args.logo, args.repeat, args.max_pixels, queue),
+        )
+        process.start()
+        results[variant] = queue.get()
+        process.join()
+
+    print(json.dumps({"input_bytes": len(image_bytes), "results": results}, indent=2))
+    legacy, region = results["legacy"], results["region"]
+    print(f"time: {legacy['median_ms']} ms -> {region['median_ms']} ms "
+          f"({legacy['median_ms'] / region['median_ms']:.2f}x)")
+    if legacy["peak_rss_growth_mib"] is not None:
+        print(f"peak RSS growth: {legacy['peak_rss_growth_mib']} MiB -> {region['peak_rss_growth_mib']} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Small in-process caches used on the hot authentication path."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a per-entry deadline.
+
+    Entries are evicted in least-recently-used order once ``maxsize`` is
+    reached.  The cache is per process, so every gunicorn worker keeps its own
+    copy; keep TTLs short for anything that can change in the database.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value or ``None`` if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None) -> None:
+        """Store ``value`` until ``expires_at`` (cache clock) or for the default TTL."""
+        if self.maxsize <= 0:
+            return
+        if expires_at is None:
+            expires_at = self._clock() + self.ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        """Drop a single entry if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
@@ -0,0 +1,77 @@
+"""Response compression for JSON API responses.
+
+Large listings are gzip-compressed (or brotli, when the optional ``brotli``
+package is installed and the client accepts it) once they exceed
+``RESPONSE_COMPRESSION_MIN_BYTES``; smaller bodies are not worth the CPU.
+The ETag of a response negotiated to gzip or brotli gets a ``-gzip``/``-br``
+suffix so caches never confuse the encodings.  The suffix depends only on the
+negotiated encoding (whether a body of that content is big enough to compress
+is fixed by the content), so a 304 can send the same ETag as the 200 without
+building the body: see ``representation_etag``.  ``strip_encoding_suffix``
+undoes the suffix when comparing ``If-None-Match``.
+"""
+
+import gzip
+from typing import Optional
+
+from config import RESPONSE_COMPRESSION_LEVEL, RESPONSE_COMPRESSION_MIN_BYTES
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {"application/json"}
+ENCODING_SUFFIXES = ("-br", "-gzip")
+
+
+def choose_encoding(accept_encodings) -> Optional[str]:
+    """Best supported encoding from a parsed Accept-Encoding header, or None."""
+    if brotli is not None and accept_encodings["br"]:
+        return "br"
+    if accept_encodings["gzip"]:
+        return "gzip"
+    return None
+
+
+def representation_etag(etag: str, accept_encodings) -> str:
+    """``etag`` with the suffix of the encoding negotiated for ``accept_encodings``."""
+    encoding = choose_encoding(accept_encodings)
+    return f"{etag}-{encoding}" if encoding else etag
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=RESPONSE_COMPRESSION_LEVEL, mtime=0)
+
+
+def compress_response(response, accept_encodings):
+    """Compress a Flask response in place if it is JSON and large enough."""
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None:
+        return response
+
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(representation_etag(etag, accept_encodings), weak)
+    data = response.get_data()
+    if len(data) >= RESPONSE_COMPRESSION_MIN_BYTES:
+        response.set_data(compress(data, encoding))
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def strip_encoding_suffix(etag: str) -> str:
+    for suffix in ENCODING_SUFFIXES:
+        if etag.endswith(suffix):
+            return etag[: -len(suffix)]
+    return etag
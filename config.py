@@ -2,20 +2,21 @@ import os
 
 # config.py
 
-# Cloudflare R2 Configuration
+# Cloudflare R2 Configuration (environment variables override the defaults,
+# e.g. to point at a local S3-compatible stand-in)
 R2_CONFIG = {
-    "endpoint_url": "https://d77faf28a1998fdf6570b068d634e752.r2.cloudflarestorage.com",
-    "bucket_name": "aadhishree",
-    "public_base_url": "https://pub-6180e377c2f14a43a3176359c6bb99be.r2.dev",
-    "aws_access_key_id": "80a73a52e450366c3a7ff125169d33e5",
-    "aws_secret_access_key": "fa1e5a21ddfd0cee7f9bd7d818bedff884a9af7f50c5e005423685d7eeaa6865",
+    "endpoint_url": os.environ.get("R2_ENDPOINT_URL", "https://d77faf28a1998fdf6570b068d634e752.r2.cloudflarestorage.com"),
+    "bucket_name": os.environ.get("R2_BUCKET_NAME", "aadhishree"),
+    "public_base_url": os.environ.get("R2_PUBLIC_BASE_URL", "https://pub-6180e377c2f14a43a3176359c6bb99be.r2.dev"),
+    "aws_access_key_id": os.environ.get("R2_AWS_ACCESS_KEY_ID", "80a73a52e450366c3a7ff125169d33e5"),
+    "aws_secret_access_key": os.environ.get("R2_AWS_SECRET_ACCESS_KEY", "fa1e5a21ddfd0cee7f9bd7d818bedff884a9af7f50c5e005423685d7eeaa6865"),
 }
 
 # JWT Secret Key
 JWT_SECRET = "pixelperfect-secure-albums-secret-key-2023"
 
 # ML API Base URL - InsightFace on Cloud Run
-ML_API_BASE_URL = "https://face-recognition-ml-912427501420.us-central1.run.app/"
+ML_API_BASE_URL = os.environ.get("ML_API_BASE_URL", "https://face-recognition-ml-912427501420.us-central1.run.app/")
 # ML_API_BASE_URL = "http://localhost:8080/"  # Local testing
 
 # Google OAuth Configuration (Replace with your actual credentials)
@@ -26,3 +27,152 @@ REDIRECT_URI = "https://gravience.com/oauth2/callback"
 
 # Watermark Configuration
 WATERMARK_LOGO_PATH = os.path.join(os.path.dirname(__file__), "frontend", "uploads", "Aaadishree Logo with Box Right.png")
+
+
+# Auth caches (per worker process). Set a size to 0 to disable a cache.
+# Cached users may be USER_CACHE_TTL_SECONDS stale on other workers; logins,
+# password checks and reference photo swaps always read the primary.
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", "4096"))
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL_SECONDS = float(os.environ.get("USER_CACHE_TTL_SECONDS", "30"))
+
+# Upper bound on concurrent R2 listings made while building album lists.
+R2_LISTING_CONCURRENCY = int(os.environ.get("R2_LISTING_CONCURRENCY", "8"))
+
+# Largest page of photos a listing returns when asked for ?limit= (R2 lists
+# at most 1,000 keys per request).
+PHOTO_PAGE_MAX_LIMIT = int(os.environ.get("PHOTO_PAGE_MAX_LIMIT", "500"))
+
+# Cache lifetimes for the public event photo listing (seconds): browsers
+# keep it for EVENT_LISTING_MAX_AGE, shared caches/CDNs for
+# EVENT_LISTING_SHARED_MAX_AGE. Authenticated listings are never cached
+# without revalidating their ETag.
+EVENT_LISTING_MAX_AGE = int(os.environ.get("EVENT_LISTING_MAX_AGE", "10"))
+EVENT_LISTING_SHARED_MAX_AGE = int(os.environ.get("EVENT_LISTING_SHARED_MAX_AGE", "60"))
+
+# JSON responses of at least RESPONSE_COMPRESSION_MIN_BYTES are gzip (or,
+# with the optional brotli package installed, brotli) compressed when the
+# client accepts it.
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.environ.get("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+RESPONSE_COMPRESSION_LEVEL = int(os.environ.get("RESPONSE_COMPRESSION_LEVEL", "6"))
+
+# The frontend is read into memory once at startup. Set
+# STATIC_ASSETS_RELOAD=true while editing it locally to pick up changes
+# (every static request then checks the files' modification times).
+STATIC_ASSETS_RELOAD = os.environ.get("STATIC_ASSETS_RELOAD", "False").lower() == "true"
+
+# Request profiling (off by default). With PROFILING_ENABLED=true, requests
+# carrying an X-Profile-Request header signed with PROFILING_SECRET, plus a
+# PROFILING_SAMPLE_RATE fraction of the rest, are profiled. Profiles are
+# written to PROFILING_DIR/<route>/, keeping the newest PROFILING_MAX_FILES.
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "False").lower() == "true"
+PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_SECRET = os.environ.get("PROFILING_SECRET", "")
+PROFILING_DIR = os.environ.get("PROFILING_DIR", "profiles")
+PROFILING_MAX_FILES = int(os.environ.get("PROFILING_MAX_FILES", "20"))
+
+# Bulk deletes send DeleteObjects requests of up to 1,000 keys, this many at once.
+R2_DELETE_CONCURRENCY = int(os.environ.get("R2_DELETE_CONCURRENCY", "4"))
+
+# Album copy/merge copies objects server-side (CopyObject), this many at once.
+R2_COPY_CONCURRENCY = int(os.environ.get("R2_COPY_CONCURRENCY", "16"))
+
+# Maximum rows accepted by the bulk import / bulk access endpoints.
+BULK_MAX_ROWS = int(os.environ.get("BULK_MAX_ROWS", "1000"))
+
+# After a user's own write, their reads stay on the primary for this long so
+# replica lag never hides the change from them (per worker by username, and
+# across workers through a cookie on the client that wrote).
+READ_YOUR_WRITES_SECONDS = float(os.environ.get("READ_YOUR_WRITES_SECONDS", "10"))
+
+# Per-request memory budgets for image and archive work (bytes, 0 disables).
+# MEMORY_BUDGET_MODE is "degrade" (downscale oversized images, spool big
+# archives to disk) or "reject" (answer 503). Only JPEGs can be downscaled
+# while decoding, so oversized images in other formats are refused in both
+# modes. The image budget is applied in the image pool process that decodes
+# the photo. Above MEMORY_SOFT_LIMIT_BYTES of RSS (the worker plus its image
+# pool processes), image and archive routes are refused outright.
+MEMORY_BUDGET_IMAGE_BYTES = int(os.environ.get("MEMORY_BUDGET_IMAGE_BYTES", str(512 << 20)))
+MEMORY_BUDGET_ZIP_BYTES = int(os.environ.get("MEMORY_BUDGET_ZIP_BYTES", str(256 << 20)))
+MEMORY_BUDGET_MODE = os.environ.get("MEMORY_BUDGET_MODE", "degrade").lower()
+MEMORY_SOFT_LIMIT_BYTES = int(os.environ.get("MEMORY_SOFT_LIMIT_BYTES", "0"))
+MEMORY_SAMPLE_INTERVAL_SECONDS = float(os.environ.get("MEMORY_SAMPLE_INTERVAL_SECONDS", "0.01"))
+
+# Renditions generated next to every uploaded photo: longest edge in pixels,
+# each stored as WebP with a JPEG fallback under event_renditions/.
+RENDITION_SIZES = tuple(int(size) for size in os.environ.get("RENDITION_SIZES", "320,1280").split(",") if size.strip())
+RENDITION_WEBP_QUALITY = int(os.environ.get("RENDITION_WEBP_QUALITY", "80"))
+RENDITION_JPEG_QUALITY = int(os.environ.get("RENDITION_JPEG_QUALITY", "82"))
+
+# Process pool for CPU-bound image work (watermark, renditions, reference
+# photo normalisation). 0 workers runs jobs inline on the request thread.
+# Uploads get a 503 once IMAGE_POOL_MAX_PENDING jobs are queued or running.
+IMAGE_POOL_WORKERS = int(os.environ.get("IMAGE_POOL_WORKERS", str(os.cpu_count() or 1)))
+IMAGE_POOL_MAX_PENDING = int(os.environ.get("IMAGE_POOL_MAX_PENDING", str(4 * (os.cpu_count() or 1))))
+IMAGE_POOL_TIMEOUT_SECONDS = float(os.environ.get("IMAGE_POOL_TIMEOUT_SECONDS", "120"))
+
+# Reference (face) photos are re-encoded as JPEG no larger than this on their
+# longest edge. With REFERENCE_PHOTO_FACE_CROP=true the ML service's
+# detect_faces/ endpoint is asked for the face and the photo is cropped to it
+# plus REFERENCE_PHOTO_FACE_MARGIN (fraction of the face size on each side).
+# Stored references above REFERENCE_PHOTO_LEGACY_MAX_BYTES are normalised
+# before each search sends them; the stored photo is not changed.
+REFERENCE_PHOTO_MAX_SIZE = int(os.environ.get("REFERENCE_PHOTO_MAX_SIZE", "1024"))
+REFERENCE_PHOTO_JPEG_QUALITY = int(os.environ.get("REFERENCE_PHOTO_JPEG_QUALITY", "88"))
+REFERENCE_PHOTO_FACE_CROP = os.environ.get("REFERENCE_PHOTO_FACE_CROP", "False").lower() == "true"
+REFERENCE_PHOTO_FACE_MARGIN = float(os.environ.get("REFERENCE_PHOTO_FACE_MARGIN", "0.6"))
+REFERENCE_PHOTO_LEGACY_MAX_BYTES = int(os.environ.get("REFERENCE_PHOTO_LEGACY_MAX_BYTES", str(1 << 20)))
+
+# Duplicate detection on upload. UPLOAD_DUPLICATE_POLICY is the default for
+# the upload form's duplicate_policy: "keep" (store anyway), "skip" (return
+# the existing photo) or "replace" (store the new one, delete the old).
+# Photos whose perceptual hashes differ by at most DUPLICATE_HAMMING_THRESHOLD
+# of 64 bits count as near-duplicates.
+UPLOAD_DUPLICATE_POLICY = os.environ.get("UPLOAD_DUPLICATE_POLICY", "keep").lower()
+DUPLICATE_HAMMING_THRESHOLD = int(os.environ.get("DUPLICATE_HAMMING_THRESHOLD", "6"))
+DUPLICATE_SCAN_BATCH = int(os.environ.get("DUPLICATE_SCAN_BATCH", "200"))
+
+# Upload object keys. "uuid" names originals {uuid}_{filename}; "content"
+# names them after the sha256 of the uploaded bytes, so uploading the same
+# file to an album again returns the stored photo. Independently, an upload
+# carrying an Idempotency-Key header is answered from the first response for
+# UPLOAD_IDEMPOTENCY_TTL_SECONDS; a claim still unfinished after
+# UPLOAD_IDEMPOTENCY_STALE_SECONDS is treated as abandoned.
+UPLOAD_KEY_MODE = os.environ.get("UPLOAD_KEY_MODE", "uuid").lower()
+UPLOAD_IDEMPOTENCY_TTL_SECONDS = int(os.environ.get("UPLOAD_IDEMPOTENCY_TTL_SECONDS", "86400"))
+UPLOAD_IDEMPOTENCY_STALE_SECONDS = int(os.environ.get("UPLOAD_IDEMPOTENCY_STALE_SECONDS", "600"))
+
+# Direct-to-R2 uploads: the browser PUTs originals to presigned URLs under
+# incoming/ and the app ingests them in a background job on finalize. Needs a
+# CORS rule on the bucket allowing PUT from the site, so it is off by default.
+# Files above R2_MULTIPART_PART_SIZE are sent as a multipart upload.
+DIRECT_UPLOADS_ENABLED = os.environ.get("DIRECT_UPLOADS_ENABLED", "False").lower() == "true"
+DIRECT_UPLOAD_MAX_BYTES = int(os.environ.get("DIRECT_UPLOAD_MAX_BYTES", str(200 * 1024 * 1024)))
+DIRECT_UPLOAD_URL_EXPIRY_SECONDS = int(os.environ.get("DIRECT_UPLOAD_URL_EXPIRY_SECONDS", "900"))
+R2_MULTIPART_PART_SIZE = int(os.environ.get("R2_MULTIPART_PART_SIZE", str(8 * 1024 * 1024)))
+
+# Background jobs (upload finalize, album copy, ...) run on JOB_WORKERS
+# threads per worker; their status is kept in the database, so any worker can
+# report it. Finished jobs are kept for JOB_RETENTION_SECONDS so clients can
+# poll their outcome. A job that has not changed status for JOB_STALE_SECONDS
+# is taken to be abandoned by a dead worker: it reports as failed and
+# submitting it again starts it afresh.
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_RETENTION_SECONDS = int(os.environ.get("JOB_RETENTION_SECONDS", "3600"))
+JOB_STALE_SECONDS = int(os.environ.get("JOB_STALE_SECONDS", "3600"))
+
+# Resumable upload sessions (create, PUT chunks at part-aligned offsets,
+# query progress, complete), backed by R2 multipart uploads. Up to
+# R2_MULTIPART_CONCURRENCY parts of a chunk are sent to R2 in parallel, which
+# also caps a chunk at that many parts. Sessions idle for longer than
+# UPLOAD_SESSION_TTL_SECONDS expire and their parts are aborted.
+R2_MULTIPART_CONCURRENCY = int(os.environ.get("R2_MULTIPART_CONCURRENCY", "4"))
+UPLOAD_SESSION_MAX_BYTES = int(os.environ.get("UPLOAD_SESSION_MAX_BYTES", str(200 * 1024 * 1024)))
+UPLOAD_SESSION_TTL_SECONDS = int(os.environ.get("UPLOAD_SESSION_TTL_SECONDS", "86400"))
+
+# Album deletion runs as a background job: objects are listed and deleted
+# ALBUM_DELETE_CHUNK_SIZE at a time, with progress saved after each chunk.
+# The worker renews a lease of ALBUM_DELETE_LEASE_SECONDS as it goes; a
+# deletion whose lease has lapsed is resumed by the next status check.
+ALBUM_DELETE_CHUNK_SIZE = int(os.environ.get("ALBUM_DELETE_CHUNK_SIZE", "1000"))
+ALBUM_DELETE_LEASE_SECONDS = int(os.environ.get("ALBUM_DELETE_LEASE_SECONDS", "60"))
@@ -1,43 +1,329 @@
 """Database helpers using SQLAlchemy models."""
 
+import json
+import threading
 import uuid
-from typing import Dict, List, Optional, Tuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
 
+from sqlalchemy import and_, case, delete, event, exists, func, insert, null, or_, select, update
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import aliased, joinedload
 
-from models import Album, User, db_config
+from cache import TTLCache
+from config import (
+    ALBUM_DELETE_LEASE_SECONDS,
+    JOB_RETENTION_SECONDS,
+    JOB_STALE_SECONDS,
+    READ_YOUR_WRITES_SECONDS,
+    UPLOAD_IDEMPOTENCY_STALE_SECONDS,
+    UPLOAD_IDEMPOTENCY_TTL_SECONDS,
+    UPLOAD_SESSION_TTL_SECONDS,
+    USER_CACHE_SIZE,
+    USER_CACHE_TTL_SECONDS,
+)
+from metrics import timed
+from models import Album, AlbumDeletion, BackgroundJob, Photo, PhotoRendition, UploadRequest, UploadSession, User, db_config, user_album_access
 
+# Short-lived cache of user records for the request hot path.  Only positive
+# lookups are cached and every user write through this module invalidates
+# its entry.  Other workers keep theirs until the TTL, so passwords and paths
+# that are about to be deleted are always read from the primary instead.
+_user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS)
 
-def init_db() -> None:
-    """Ensure that all database tables exist."""
-    db_config.create_tables()
+# Usernames that wrote recently; their reads skip the replicas until expiry.
+_recent_writers = TTLCache(maxsize=10000, ttl=READ_YOUR_WRITES_SECONDS)
+
+
+class _SessionScope:
+    """Session shared by every helper called within one request or transaction."""
+
+    __slots__ = ("session", "read_session", "depth", "wrote", "primary_only")
+
+    def __init__(self, primary_only: bool = False):
+        self.session = None
+        self.read_session = None
+        self.depth = 0
+        self.wrote = False
+        self.primary_only = primary_only
+
+
+_scope: ContextVar[Optional[_SessionScope]] = ContextVar("db_session_scope", default=None)
 
 
-def get_user(username: str) -> Optional[User]:
-    """Return a detached user object for the given username."""
-    session = db_config.get_session()
+def begin_request_scope(primary_only: bool = False):
+    """Start sharing one lazily-opened session between helpers.
+
+    Returns a token for :func:`end_request_scope`.  The Flask app calls this
+    from ``before_request`` so a request checks a pooled connection out at
+    most once instead of once per helper.  ``primary_only`` keeps every read
+    of the request off the replicas, e.g. for a client that wrote recently
+    through another worker.
+    """
+    return _scope.set(_SessionScope(primary_only))
+
+
+def request_wrote() -> bool:
+    """Whether the current request scope has committed any write."""
+    scope = _scope.get()
+    return scope is not None and scope.wrote
+
+
+def end_request_scope(token=None) -> None:
+    """Close the request's sessions (if any were opened) and leave the scope."""
+    scope = _scope.get()
     try:
-        user = session.query(User).filter_by(username=username).first()
-        if user:
-            session.expunge(user)
-        return user
+        if scope is not None:
+            for session in (scope.session, scope.read_session):
+                if session is not None:
+                    session.close()
+    finally:
+        if token is not None:
+            _scope.reset(token)
+        else:
+            _scope.set(None)
+
+
+def release_connection() -> None:
+    """Return the request's connection to the pool before slow external I/O.
+
+    The session stays usable and checks a connection out again on next use.
+    Does nothing inside :func:`transaction` or outside a request scope.
+    """
+    scope = _scope.get()
+    if scope is None or scope.depth:
+        return
+    for session in (scope.session, scope.read_session):
+        if session is not None:
+            session.commit()
+
+
+@contextmanager
+def transaction() -> Iterator[None]:
+    """Group several helper calls into a single database transaction.
+
+    Helpers flush instead of committing while inside the block; the work is
+    committed once on exit or rolled back if the block raises.  A helper that
+    hits an integrity error rolls the whole group back.
+    """
+    scope = _scope.get()
+    token = None
+    if scope is None:
+        scope = _SessionScope()
+        token = _scope.set(scope)
+
+    scope.depth += 1
+    try:
+        yield
+    except BaseException:
+        scope.depth -= 1
+        if scope.depth == 0 and scope.session is not None:
+            scope.session.rollback()
+        raise
+    else:
+        scope.depth -= 1
+        if scope.depth == 0 and scope.session is not None:
+            scope.session.commit()
     finally:
-        session.close()
+        if token is not None:
+            if scope.session is not None:
+                scope.session.close()
+            _scope.reset(token)
 
 
-def get_user_by_email(email: str) -> Optional[User]:
-    """Return a detached user object for the given email address."""
-    session = db_config.get_session()
+@contextmanager
+def _session_scope():
+    """Yield the scoped session, or a private one when no scope is active."""
+    scope = _scope.get()
+    if scope is None:
+        session = db_config.get_session()
+        try:
+            yield session
+        finally:
+            session.close()
+        return
+
+    if scope.session is None:
+        scope.session = db_config.get_session()
     try:
-        user = session.query(User).filter_by(email=email).first()
-        if user:
-            session.expunge(user)
-        return user
+        yield scope.session
+    except BaseException:
+        if not scope.depth:
+            scope.session.rollback()
+        raise
+
+
+@contextmanager
+def _read_session_scope(username: Optional[str] = None):
+    """Yield a session for read-only helpers, on a replica when that is safe.
+
+    Reads go to the primary inside :func:`transaction`, after the current
+    request has written, in a ``primary_only`` request scope, or while
+    ``username`` is within its read-your-writes window in this process.
+    """
+    scope = _scope.get()
+    if (
+        not db_config.has_replicas
+        or (username and _recent_writers.get(username))
+        or (scope is not None and (scope.depth or scope.wrote or scope.primary_only))
+    ):
+        with _session_scope() as session:
+            yield session
+        return
+
+    if scope is None:
+        session = db_config.get_read_session()
+        try:
+            yield session
+        finally:
+            session.close()
+        return
+
+    if scope.read_session is None:
+        scope.read_session = db_config.get_read_session()
+    try:
+        yield scope.read_session
+    except BaseException:
+        scope.read_session.rollback()
+        raise
+
+
+def _commit(session, *usernames: Optional[str]) -> None:
+    """Commit, or only flush while a :func:`transaction` block is open.
+
+    ``usernames`` are the users whose data changed; their reads stay on the
+    primary for ``READ_YOUR_WRITES_SECONDS``.
+    """
+    scope = _scope.get()
+    if scope is not None and scope.depth:
+        session.flush()
+    else:
+        session.commit()
+    if scope is not None:
+        scope.wrote = True
+    for username in usernames:
+        if username:
+            _recent_writers.set(username, True)
+
+
+class QueryCounter:
+    """Counts statements and pool checkouts issued by the current thread."""
+
+    def __init__(self):
+        self.statements = 0
+        self.checkouts = 0
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    """Count SQL statements and connection checkouts made inside the block.
+
+    Only activity on the calling thread is counted, so it is safe to use while
+    other requests are running.
+    """
+    counter = QueryCounter()
+    thread_id = threading.get_ident()
+    engine = db_config.engine
+
+    def on_execute(*_args, **_kwargs):
+        if threading.get_ident() == thread_id:
+            counter.statements += 1
+
+    def on_checkout(*_args, **_kwargs):
+        if threading.get_ident() == thread_id:
+            counter.checkouts += 1
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    event.listen(engine.pool, "checkout", on_checkout)
+    try:
+        yield counter
     finally:
-        session.close()
+        event.remove(engine, "before_cursor_execute", on_execute)
+        event.remove(engine.pool, "checkout", on_checkout)
+
+
+def init_db() -> None:
+    """Ensure that all database tables exist."""
+    db_config.create_tables()
+
+
+def get_pool_stats() -> List[Dict[str, object]]:
+    """Return connection pool statistics for the primary and any replicas."""
+    return db_config.pool_stats()
 
 
+class UserRecord(NamedTuple):
+    """Immutable snapshot of a user row, without the password."""
+    id: int
+    username: str
+    email: Optional[str]
+    role: str
+    ref_photo_path: Optional[str]
+    google_id: Optional[str]
+    is_active: bool
+
+
+_USER_RECORD_COLUMNS = (
+    User.id, User.username, User.email, User.role, User.ref_photo_path, User.google_id, User.is_active,
+)
+
+
+@timed("db.get_user")
+def get_user(username: str) -> Optional[UserRecord]:
+    """Return the user with the given username.
+
+    Results are served from a short-TTL, per-process cache and may be a few
+    seconds stale on other workers; use :func:`get_user_credentials` to check
+    a password and :func:`replace_user_reference_photo` to swap photos.
+    """
+    cached = _user_cache.get(username)
+    if cached is not None:
+        return cached
+
+    with _read_session_scope(username) as session:
+        row = session.execute(select(*_USER_RECORD_COLUMNS).where(User.username == username)).first()
+        if row is None:
+            return None
+        user = UserRecord(*row)
+        _user_cache.set(username, user)
+        return user
+
+
+@timed("db.get_user_credentials")
+def get_user_credentials(username: str) -> Optional[Tuple[UserRecord, Optional[str]]]:
+    """``(user, password)`` read from the primary, bypassing the cache."""
+    with _session_scope() as session:
+        row = session.execute(
+            select(*_USER_RECORD_COLUMNS, User.password).where(User.username == username)
+        ).first()
+        if row is None:
+            return None
+        return UserRecord(*row[:-1]), row[-1]
+
+
+def invalidate_user_cache(username: Optional[str] = None) -> None:
+    """Drop a cached user, or the whole cache when no username is given."""
+    if username is None:
+        _user_cache.clear()
+    else:
+        _user_cache.pop(username)
+
+
+@timed("db.get_user_by_email")
+def get_user_by_email(email: str) -> Optional[UserRecord]:
+    """Return the user with the given email address.
+
+    Used to log in and to check registrations, so it reads the primary: a
+    replica may not have an account that was just created.
+    """
+    with _session_scope() as session:
+        row = session.execute(select(*_USER_RECORD_COLUMNS).where(User.email == email)).first()
+        return UserRecord(*row) if row is not None else None
+
+
+@timed("db.add_user")
 def add_user(
     username: str,
     password: Optional[str],
@@ -47,30 +333,108 @@ def add_user(
     email: Optional[str] = None,
 ) -> Tuple[bool, str]:
     """Create a new user in the database."""
-    session = db_config.get_session()
-    try:
-        new_user = User(
-            username=username,
-            password=password,
-            role=role,
-            ref_photo_path=ref_photo_path,
-            google_id=google_id,
-            email=email,
-        )
-        session.add(new_user)
-        session.commit()
-        return True, "User added successfully."
-    except IntegrityError:
-        session.rollback()
-        return False, "Username or email already exists."
-    finally:
-        session.close()
+    with _session_scope() as session:
+        try:
+            new_user = User(
+                username=username,
+                password=password,
+                role=role,
+                ref_photo_path=ref_photo_path,
+                google_id=google_id,
+                email=email,
+            )
+            session.add(new_user)
+            _commit(session, username)
+            invalidate_user_cache(username)
+            return True, "User added successfully."
+        except IntegrityError:
+            session.rollback()
+            return False, "Username or email already exists."
+
+
+@timed("db.add_users_bulk")
+def add_users_bulk(users: List[Dict[str, Optional[str]]]) -> List[Dict[str, Optional[str]]]:
+    """Create many users with one lookup query and one multi-row insert.
+
+    Each input dict takes the same fields as :func:`add_user`.  Returns one
+    ``{"username", "email", "status"}`` entry per input row; status is one of
+    ``created``, ``exists`` (``username`` is then the existing account),
+    ``duplicate`` (repeated within the batch) or ``invalid``.
+    """
+    usernames = [row.get("username") for row in users if row.get("username")]
+    emails = [row.get("email") for row in users if row.get("email")]
+
+    with _session_scope() as session:
+        existing_by_username = {}
+        existing_by_email = {}
+        if usernames or emails:
+            conditions = []
+            if usernames:
+                conditions.append(User.username.in_(usernames))
+            if emails:
+                conditions.append(User.email.in_(emails))
+            for username, email in session.execute(
+                select(User.username, User.email).where(or_(*conditions))
+            ).all():
+                existing_by_username[username] = username
+                if email:
+                    existing_by_email[email] = username
+
+        results = []
+        to_insert = []
+        seen_usernames = set()
+        seen_emails = set()
+        for row in users:
+            username = row.get("username")
+            email = row.get("email")
+            result = {"username": username, "email": email}
+            results.append(result)
+            if not username:
+                result["status"] = "invalid"
+                continue
+            if username in seen_usernames or (email and email in seen_emails):
+                result["status"] = "duplicate"
+                continue
+            seen_usernames.add(username)
+            if email:
+                seen_emails.add(email)
+
+            existing = existing_by_username.get(username) or (email and existing_by_email.get(email))
+            if existing:
+                result["status"] = "exists"
+                result["username"] = existing
+                continue
+
+            result["status"] = "created"
+            to_insert.append(
+                {
+                    "username": username,
+                    "password": row.get("password"),
+                    "role": row.get("role") or "attendee",
+                    "ref_photo_path": row.get("ref_photo_path"),
+                    "google_id": row.get("google_id"),
+                    "email": email,
+                }
+            )
+
+        if to_insert:
+            stmt = _insert_ignoring_conflicts(session, User.__table__).returning(User.username)
+            inserted = set(session.execute(stmt, to_insert).scalars())
+            _commit(session, *(row["username"] for row in to_insert))
+            for username in inserted:
+                invalidate_user_cache(username)
+            # Rows created concurrently by someone else were skipped by the insert.
+            for result in results:
+                if result["status"] == "created" and result["username"] not in inserted:
+                    result["status"] = "exists"
 
+        return results
 
+
+@timed("db.create_or_get_google_user")
 def create_or_get_google_user(google_id: str, name: str, email: Optional[str]):
     """Return an existing Google user or create one with a pending role."""
-    session = db_config.get_session()
-    try:
+    with _session_scope() as session:
         existing_user = session.query(User).filter_by(google_id=google_id).first()
         if existing_user:
             session.expunge(existing_user)
@@ -93,18 +457,17 @@ def create_or_get_google_user(google_id: str, name: str, email: Optional[str]):
             google_id=google_id,
         )
         session.add(new_user)
-        session.commit()
+        _commit(session, candidate_username)
+        invalidate_user_cache(candidate_username)
         session.refresh(new_user)
         session.expunge(new_user)
         return new_user, True
-    finally:
-        session.close()
 
 
+@timed("db.add_album")
 def add_album(photographer_username: str, album_slug: str, album_name: str) -> Tuple[bool, str]:
     """Create a new album for a photographer."""
-    session = db_config.get_session()
-    try:
+    with _session_scope() as session:
         photographer = session.query(User).filter_by(username=photographer_username).first()
         if not photographer:
             return False, "Photographer not found."
@@ -123,44 +486,41 @@ def add_album(photographer_username: str, album_slug: str, album_name: str) -> T
             photographer=photographer,
         )
         session.add(album)
-        session.commit()
+        _commit(session, photographer_username)
         return True, "Album created successfully."
-    finally:
-        session.close()
 
 
+@timed("db.delete_album")
 def delete_album(photographer_username: str, album_slug: str) -> Tuple[bool, str]:
     """Delete an album from the database."""
-    session = db_config.get_session()
-    try:
-        photographer = session.query(User).filter_by(username=photographer_username).first()
-        if not photographer:
-            return False, "Photographer not found."
+    with _session_scope() as session:
+        try:
+            photographer = session.query(User).filter_by(username=photographer_username).first()
+            if not photographer:
+                return False, "Photographer not found."
 
-        album = (
-            session.query(Album)
-            .filter_by(photographer_id=photographer.id, album_id=album_slug)
-            .first()
-        )
-        if not album:
-            return False, "Album not found."
+            album = (
+                session.query(Album)
+                .filter_by(photographer_id=photographer.id, album_id=album_slug)
+                .first()
+            )
+            if not album:
+                return False, "Album not found."
 
-        session.delete(album)
-        session.commit()
-        return True, "Album deleted successfully."
-    except Exception as e:
-        session.rollback()
-        return False, str(e)
-    finally:
-        session.close()
+            session.delete(album)
+            _commit(session, photographer_username)
+            return True, "Album deleted successfully."
+        except Exception as e:
+            session.rollback()
+            return False, str(e)
 
 
+@timed("db.grant_album_access")
 def grant_album_access(
     attendee_username: str, photographer_username: str, album_slug: str
 ) -> Tuple[bool, str]:
     """Grant an attendee access to a specific album."""
-    session = db_config.get_session()
-    try:
+    with _session_scope() as session:
         attendee = session.query(User).filter_by(username=attendee_username).first()
         if not attendee:
             return False, "Attendee not found."
@@ -179,50 +539,152 @@ def grant_album_access(
             return False, "Access already granted."
 
         album.accessible_users.append(attendee)
-        session.commit()
+        _commit(session, attendee_username, photographer_username)
         return True, "Access granted."
-    finally:
-        session.close()
 
 
+def _insert_ignoring_conflicts(session, table):
+    """Return an INSERT for ``table`` that skips rows violating a unique key."""
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(table).prefix_with("IGNORE")
+    return dialect_insert(table).on_conflict_do_nothing()
+
+
+@timed("db.grant_album_access_bulk")
+def grant_album_access_bulk(
+    attendee_usernames: List[str], photographer_username: str, album_slug: str
+) -> Tuple[bool, str, List[Dict[str, str]]]:
+    """Grant many attendees access to one album in a fixed number of queries.
+
+    Returns ``(ok, message, results)`` where ``results`` holds one
+    ``{"username", "status"}`` entry per input row; status is one of
+    ``granted``, ``already_granted``, ``not_found`` or ``duplicate``.
+    """
+    with _session_scope() as session:
+        album_pk = session.execute(
+            select(Album.id).where(*_album_filter(photographer_username, album_slug))
+        ).scalar()
+        if album_pk is None:
+            return False, "Album not found.", []
+
+        wanted = list(dict.fromkeys(attendee_usernames))
+        user_ids = dict(
+            session.execute(
+                select(User.username, User.id).where(User.username.in_(wanted))
+            ).all()
+        ) if wanted else {}
+        already = set(
+            session.execute(
+                select(user_album_access.c.user_id).where(
+                    user_album_access.c.album_id == album_pk,
+                    user_album_access.c.user_id.in_(list(user_ids.values())),
+                )
+            ).scalars()
+        ) if user_ids else set()
+
+        results = []
+        to_insert = []
+        seen = set()
+        for username in attendee_usernames:
+            if username in seen:
+                results.append({"username": username, "status": "duplicate"})
+                continue
+            seen.add(username)
+            user_id = user_ids.get(username)
+            if user_id is None:
+                results.append({"username": username, "status": "not_found"})
+            elif user_id in already:
+                results.append({"username": username, "status": "already_granted"})
+            else:
+                results.append({"username": username, "status": "granted"})
+                to_insert.append({"user_id": user_id, "album_id": album_pk})
+
+        if to_insert:
+            session.execute(_insert_ignoring_conflicts(session, user_album_access), to_insert)
+            _commit(session, photographer_username, *user_ids.keys())
+
+        return True, f"Granted access to {len(to_insert)} users.", results
+
+
+ACTIVE_DELETION_STATUSES = ("pending", "running")
+
+
+def _album_is_deleting():
+    """SQL condition: the correlated :class:`Album` has a deletion in progress."""
+    return exists().where(
+        AlbumDeletion.photographer_id == Album.photographer_id,
+        AlbumDeletion.album_slug == Album.album_id,
+        AlbumDeletion.status.in_(ACTIVE_DELETION_STATUSES),
+    )
+
+
+@timed("db.get_album_access_usernames")
+def get_album_access_usernames(photographer_username: str, album_slug: str) -> List[str]:
+    """Usernames of everyone granted access to an album."""
+    with _read_session_scope(photographer_username) as session:
+        return list(session.execute(
+            select(User.username)
+            .join(user_album_access, user_album_access.c.user_id == User.id)
+            .join(Album, Album.id == user_album_access.c.album_id)
+            .where(*_album_filter(photographer_username, album_slug))
+        ).scalars())
+
+
+@timed("db.get_accessible_albums_for_user")
 def get_accessible_albums_for_user(username: str) -> List[Dict[str, Optional[str]]]:
-    """Return metadata for albums that a user can access."""
-    session = db_config.get_session()
-    try:
-        user = (
-            session.query(User)
-            .options(joinedload(User.accessible_albums).joinedload(Album.photographer))
-            .filter_by(username=username)
-            .first()
-        )
-        if not user:
-            return []
+    """Return metadata for albums that a user can access.
 
-        albums = []
-        for album in user.accessible_albums:
-            albums.append(
-                {
-                    "album_id": album.album_id,
-                    "name": album.name,
-                    "photographer": album.photographer.username if album.photographer else None,
-                }
+    Runs a single query joining the access table, the album and its
+    photographer.  ``photo_count`` and ``cover`` come from the maintained
+    counters on :class:`Album`; ``reconciled`` is False until they have been
+    checked against R2 (see :func:`set_album_stats`).
+    """
+    photographer = aliased(User)
+    with _read_session_scope(username) as session:
+        rows = (
+            session.query(
+                Album.album_id,
+                Album.name,
+                photographer.username,
+                Album.photo_count,
+                Album.cover_photo_path,
+                Album.stats_reconciled_at,
             )
-        return albums
-    finally:
-        session.close()
+            .join(user_album_access, user_album_access.c.album_id == Album.id)
+            .join(User, User.id == user_album_access.c.user_id)
+            .join(photographer, photographer.id == Album.photographer_id)
+            .filter(User.username == username, ~_album_is_deleting())
+            .all()
+        )
+        return [
+            {
+                "album_id": album_id,
+                "name": name,
+                "photographer": photographer_username,
+                "photo_count": photo_count or 0,
+                "cover": cover,
+                "reconciled": reconciled_at is not None,
+            }
+            for album_id, name, photographer_username, photo_count, cover, reconciled_at in rows
+        ]
 
 
+@timed("db.get_albums_for_photographer")
 def get_albums_for_photographer(username: str) -> List[Dict[str, Optional[str]]]:
     """Return album metadata for the given photographer."""
-    session = db_config.get_session()
-    try:
+    with _read_session_scope(username) as session:
         photographer = session.query(User).filter_by(username=username).first()
         if not photographer:
             return []
 
         albums = (
             session.query(Album)
-            .filter_by(photographer_id=photographer.id)
+            .filter(Album.photographer_id == photographer.id, ~_album_is_deleting())
             .all()
         )
 
@@ -238,16 +700,14 @@ def get_albums_for_photographer(username: str) -> List[Dict[str, Optional[str]]]
                 }
             )
         return result
-    finally:
-        session.close()
 
 
+@timed("db.update_user_reference_photo")
 def update_user_reference_photo(
     username: str, ref_photo_path: str, role: Optional[str] = None
 ) -> bool:
     """Update a user's reference photo path and optionally their role."""
-    session = db_config.get_session()
-    try:
+    with _session_scope() as session:
         user = session.query(User).filter_by(username=username).first()
         if not user:
             return False
@@ -255,22 +715,778 @@ def update_user_reference_photo(
         user.ref_photo_path = ref_photo_path
         if role:
             user.role = role
-        session.commit()
+        _commit(session, username)
+        invalidate_user_cache(username)
         return True
-    finally:
-        session.close()
 
 
+@timed("db.replace_user_reference_photo")
+def replace_user_reference_photo(username: str, ref_photo_path: str) -> Tuple[bool, Optional[str]]:
+    """Point a user at a new reference photo.
+
+    Returns ``(updated, previous_path)``; the previous path is read in the
+    same transaction on the primary, so it is safe to delete from R2.
+    """
+    with _session_scope() as session:
+        user = session.execute(
+            select(User).where(User.username == username).with_for_update()
+        ).scalar()
+        if not user:
+            return False, None
+
+        previous_path = user.ref_photo_path
+        user.ref_photo_path = ref_photo_path
+        _commit(session, username)
+        invalidate_user_cache(username)
+        return True, previous_path
+
+
+@timed("db.update_user_password")
 def update_user_password(username: str, new_password: str) -> bool:
     """Persist a new password for the given user."""
-    session = db_config.get_session()
-    try:
+    with _session_scope() as session:
         user = session.query(User).filter_by(username=username).first()
         if not user:
             return False
 
         user.password = new_password
-        session.commit()
+        _commit(session, username)
+        invalidate_user_cache(username)
         return True
-    finally:
-        session.close()
+
+
+def _album_filter(photographer_username: str, album_slug: str):
+    photographer_id = (
+        select(User.id).where(User.username == photographer_username).scalar_subquery()
+    )
+    return (Album.photographer_id == photographer_id, Album.album_id == album_slug)
+
+
+@timed("db.set_album_stats")
+def set_album_stats(
+    photographer_username: str, album_slug: str, photo_count: int, cover_path: Optional[str]
+) -> bool:
+    """Overwrite an album's photo counter and cover with values read from R2.
+
+    The album is marked reconciled even when it is empty, so listings stop
+    checking R2 for it.
+    """
+    with _session_scope() as session:
+        result = session.execute(
+            update(Album)
+            .where(*_album_filter(photographer_username, album_slug))
+            .values(
+                photo_count=photo_count,
+                cover_photo_path=cover_path,
+                stats_reconciled_at=func.now(),
+                updated_at=func.now(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        _commit(session, photographer_username)
+        return result.rowcount > 0
+
+
+@timed("db.record_photos_added")
+def record_photos_added(
+    photographer_username: str, album_slug: str, count: int = 1, object_key: Optional[str] = None
+) -> None:
+    """Bump an album's photo counter after a successful upload.
+
+    Counters only become authoritative once :func:`set_album_stats` has
+    reconciled them; until then they are left alone and reconciled from R2 on
+    listing.  ``object_key`` becomes the cover of a reconciled album without one.
+    """
+    reconciled = Album.stats_reconciled_at.isnot(None)
+    with _session_scope() as session:
+        session.execute(
+            update(Album)
+            .where(*_album_filter(photographer_username, album_slug))
+            .values(
+                photo_count=case(
+                    (reconciled, func.coalesce(Album.photo_count, 0) + count),
+                    else_=Album.photo_count,
+                ),
+                cover_photo_path=case(
+                    (and_(reconciled, Album.cover_photo_path.is_(None)), object_key),
+                    else_=Album.cover_photo_path,
+                ),
+                updated_at=func.now(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        _commit(session, photographer_username)
+
+
+@timed("db.record_photos_removed")
+def record_photos_removed(photographer_username: str, album_slug: str, removed_keys: List[str]) -> None:
+    """Decrement an album's photo counter and replace its cover if it was removed.
+
+    The new cover is another indexed photo of the album.  If photos remain but
+    none is indexed, the album is left to be reconciled from R2 again.
+    """
+    if not removed_keys:
+        return
+    removed = len(removed_keys)
+    cover_removed = Album.cover_photo_path.in_(removed_keys)
+    remaining = case((Album.photo_count > removed, Album.photo_count - removed), else_=0)
+    next_cover = (
+        select(Photo.object_key)
+        .where(Photo.album_id == Album.id, Photo.object_key.notin_(removed_keys))
+        .order_by(Photo.object_key)
+        .limit(1)
+        .scalar_subquery()
+    )
+    with _session_scope() as session:
+        session.execute(
+            update(Album)
+            .where(*_album_filter(photographer_username, album_slug))
+            .values(
+                photo_count=remaining,
+                cover_photo_path=case((cover_removed, next_cover), else_=Album.cover_photo_path),
+                stats_reconciled_at=case(
+                    (and_(cover_removed, next_cover.is_(None), remaining > 0), null()),
+                    else_=Album.stats_reconciled_at,
+                ),
+                updated_at=func.now(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        _commit(session, photographer_username)
+
+
+_PHOTO_INDEX_COLUMNS = (
+    Photo.id,
+    Photo.object_key,
+    Photo.filename,
+    Photo.content_hash,
+    Photo.phash,
+    Photo.size_bytes,
+    Photo.width,
+    Photo.height,
+    Photo.created_at,
+)
+
+
+def _photo_row(row) -> Dict[str, object]:
+    entry = dict(row._mapping)
+    if entry.get("created_at") is not None:
+        entry["created_at"] = entry["created_at"].isoformat()
+    return entry
+
+
+@timed("db.add_photos")
+def add_photos(
+    photographer_username: str, album_slug: str, photos: List[Dict[str, object]]
+) -> Tuple[bool, str]:
+    """Index uploaded photos of an album by content and perceptual hash.
+
+    Each entry needs ``object_key`` and ``content_hash`` and may carry
+    ``filename``, ``phash``, ``size_bytes``, ``width`` and ``height``.
+    Keys that are already indexed are left as they are.
+    """
+    if not photos:
+        return True, "Nothing to index."
+    with _session_scope() as session:
+        album_pk = session.execute(
+            select(Album.id).where(*_album_filter(photographer_username, album_slug))
+        ).scalar()
+        if album_pk is None:
+            return False, "Album not found."
+
+        session.execute(
+            _insert_ignoring_conflicts(session, Photo.__table__),
+            [
+                {
+                    "album_id": album_pk,
+                    "object_key": photo["object_key"],
+                    "filename": photo.get("filename"),
+                    "content_hash": photo["content_hash"],
+                    "phash": photo.get("phash"),
+                    "size_bytes": photo.get("size_bytes"),
+                    "width": photo.get("width"),
+                    "height": photo.get("height"),
+                }
+                for photo in photos
+            ],
+        )
+        _commit(session, photographer_username)
+        return True, f"Indexed {len(photos)} photos."
+
+
+@timed("db.get_album_photo_index")
+def get_album_photo_index(photographer_username: str, album_slug: str) -> List[Dict[str, object]]:
+    """Return the fingerprint index of every photo in an album, oldest first."""
+    with _read_session_scope(photographer_username) as session:
+        rows = session.execute(
+            select(*_PHOTO_INDEX_COLUMNS)
+            .join(Album, Photo.album_id == Album.id)
+            .where(*_album_filter(photographer_username, album_slug))
+            .order_by(Photo.id)
+        ).all()
+        return [_photo_row(row) for row in rows]
+
+
+@timed("db.record_renditions")
+def record_renditions(
+    photographer_username: str, album_slug: str, sizes_by_key: Mapping[str, Iterable[int]]
+) -> bool:
+    """Record which rendition sizes are stored for originals of an album.
+
+    ``sizes_by_key`` maps an original's R2 key to the sizes stored in every
+    rendition format.  Sizes that are already recorded are left as they are.
+    """
+    rows = [(object_key, size) for object_key, sizes in sizes_by_key.items() for size in sizes]
+    if not rows:
+        return True
+    with _session_scope() as session:
+        album_pk = session.execute(
+            select(Album.id).where(*_album_filter(photographer_username, album_slug))
+        ).scalar()
+        if album_pk is None:
+            return False
+        session.execute(
+            _insert_ignoring_conflicts(session, PhotoRendition.__table__),
+            [{"album_id": album_pk, "object_key": object_key, "size": size} for object_key, size in rows],
+        )
+        _commit(session, photographer_username)
+        return True
+
+
+# Keys per IN (...) list when looking up renditions of a listing page
+_RENDITION_LOOKUP_BATCH = 500
+
+
+@timed("db.get_rendition_sizes")
+def get_rendition_sizes(object_keys: List[str], username: Optional[str] = None) -> Dict[str, List[int]]:
+    """Stored rendition sizes, ascending, per original key; keys without any are omitted."""
+    sizes: Dict[str, List[int]] = {}
+    if not object_keys:
+        return sizes
+    with _read_session_scope(username) as session:
+        for start in range(0, len(object_keys), _RENDITION_LOOKUP_BATCH):
+            rows = session.execute(
+                select(PhotoRendition.object_key, PhotoRendition.size)
+                .where(PhotoRendition.object_key.in_(object_keys[start:start + _RENDITION_LOOKUP_BATCH]))
+                .order_by(PhotoRendition.size)
+            ).all()
+            for object_key, size in rows:
+                sizes.setdefault(object_key, []).append(size)
+    return sizes
+
+
+@timed("db.delete_photos_by_keys")
+def delete_photos_by_keys(photographer_username: str, object_keys: List[str]) -> int:
+    """Drop index and rendition rows for deleted R2 objects; returns how many photos were removed."""
+    if not object_keys:
+        return 0
+    with _session_scope() as session:
+        session.execute(
+            delete(PhotoRendition)
+            .where(PhotoRendition.object_key.in_(object_keys))
+            .execution_options(synchronize_session=False)
+        )
+        result = session.execute(
+            delete(Photo)
+            .where(Photo.object_key.in_(object_keys))
+            .execution_options(synchronize_session=False)
+        )
+        _commit(session, photographer_username)
+        return result.rowcount
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _upload_request_filter(photographer_username: str, idempotency_key: str):
+    return (
+        UploadRequest.photographer_id == select(User.id).where(User.username == photographer_username).scalar_subquery(),
+        UploadRequest.idempotency_key == idempotency_key,
+    )
+
+
+@timed("db.claim_upload_request")
+def claim_upload_request(
+    photographer_username: str, idempotency_key: str, album_slug: str
+) -> Tuple[str, Optional[Dict[str, object]]]:
+    """Claim an upload ``Idempotency-Key`` before doing the work.
+
+    Returns ``("claimed", None)`` for a new key, ``("in_progress", None)``
+    while another request holds it, or ``("completed", {"album_slug",
+    "object_key", "response"})`` once an earlier upload with the key finished.
+    Expired and abandoned claims are cleared first.
+    """
+    now = _utcnow()
+    with _session_scope() as session:
+        photographer_id = session.execute(
+            select(User.id).where(User.username == photographer_username)
+        ).scalar()
+        if photographer_id is None:
+            return "claimed", None
+
+        session.execute(
+            delete(UploadRequest)
+            .where(
+                *_upload_request_filter(photographer_username, idempotency_key),
+                or_(
+                    UploadRequest.created_at < now - timedelta(seconds=UPLOAD_IDEMPOTENCY_TTL_SECONDS),
+                    and_(
+                        UploadRequest.completed_at.is_(None),
+                        UploadRequest.created_at < now - timedelta(seconds=UPLOAD_IDEMPOTENCY_STALE_SECONDS),
+                    ),
+                ),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        existing = session.execute(
+            select(UploadRequest.album_slug, UploadRequest.object_key, UploadRequest.response, UploadRequest.completed_at)
+            .where(*_upload_request_filter(photographer_username, idempotency_key))
+        ).first()
+        if existing is None:
+            session.add(UploadRequest(
+                photographer_id=photographer_id,
+                idempotency_key=idempotency_key,
+                album_slug=album_slug,
+                created_at=now,
+            ))
+            try:
+                _commit(session, photographer_username)
+                return "claimed", None
+            except IntegrityError:
+                session.rollback()
+                return "in_progress", None
+
+        _commit(session, photographer_username)
+        if existing.completed_at is None:
+            return "in_progress", None
+        return "completed", {
+            "album_slug": existing.album_slug,
+            "object_key": existing.object_key,
+            "response": json.loads(existing.response) if existing.response else None,
+        }
+
+
+@timed("db.complete_upload_request")
+def complete_upload_request(
+    photographer_username: str, idempotency_key: str, object_key: Optional[str], response: Dict[str, object]
+) -> None:
+    """Record the outcome of a claimed upload so repeats can be answered from it."""
+    with _session_scope() as session:
+        session.execute(
+            update(UploadRequest)
+            .where(*_upload_request_filter(photographer_username, idempotency_key))
+            .values(object_key=object_key, response=json.dumps(response), completed_at=_utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        _commit(session, photographer_username)
+
+
+@timed("db.release_upload_request")
+def release_upload_request(photographer_username: str, idempotency_key: str) -> None:
+    """Drop an unfinished claim so the client can retry with the same key."""
+    with _session_scope() as session:
+        session.execute(
+            delete(UploadRequest)
+            .where(
+                *_upload_request_filter(photographer_username, idempotency_key),
+                UploadRequest.completed_at.is_(None),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        _commit(session, photographer_username)
+
+
+@timed("db.create_upload_session")
+def create_upload_session(
+    photographer_username: str,
+    album_slug: str,
+    filename: str,
+    size_bytes: int,
+    part_size: int,
+    object_key: str,
+    r2_upload_id: str,
+) -> Optional[Dict[str, object]]:
+    """Record a new resumable upload; returns it, or None if the photographer is unknown."""
+    now = _utcnow()
+    with _session_scope() as session:
+        photographer_id = session.execute(
+            select(User.id).where(User.username == photographer_username)
+        ).scalar()
+        if photographer_id is None:
+            return None
+        upload_session = UploadSession(
+            id=uuid.uuid4().hex,
+            photographer_id=photographer_id,
+            album_slug=album_slug,
+            filename=filename,
+            size_bytes=size_bytes,
+            part_size=part_size,
+            object_key=object_key,
+            r2_upload_id=r2_upload_id,
+            status="open",
+            created_at=now,
+            expires_at=now + timedelta(seconds=UPLOAD_SESSION_TTL_SECONDS),
+        )
+        session.add(upload_session)
+        _commit(session, photographer_username)
+        return _upload_session_row(upload_session)
+
+
+def _upload_session_row(upload_session: UploadSession) -> Dict[str, object]:
+    entry = upload_session.to_dict()
+    entry["object_key"] = upload_session.object_key
+    entry["r2_upload_id"] = upload_session.r2_upload_id
+    return entry
+
+
+@timed("db.get_upload_session")
+def get_upload_session(photographer_username: str, session_id: str) -> Optional[Dict[str, object]]:
+    """Return one of the photographer's upload sessions, or None."""
+    with _session_scope() as session:
+        upload_session = session.execute(
+            select(UploadSession)
+            .join(User, UploadSession.photographer_id == User.id)
+            .where(UploadSession.id == session_id, User.username == photographer_username)
+        ).scalar()
+        return _upload_session_row(upload_session) if upload_session else None
+
+
+@timed("db.touch_upload_session")
+def touch_upload_session(session_id: str) -> None:
+    """Push an open session's expiry out after activity."""
+    with _session_scope() as session:
+        session.execute(
+            update(UploadSession)
+            .where(UploadSession.id == session_id, UploadSession.status == "open")
+            .values(expires_at=_utcnow() + timedelta(seconds=UPLOAD_SESSION_TTL_SECONDS))
+            .execution_options(synchronize_session=False)
+        )
+        _commit(session)
+
+
+@timed("db.close_upload_session")
+def close_upload_session(session_id: str, status: str, job_id: Optional[str] = None) -> bool:
+    """Move an open session to ``status``; False if it was no longer open."""
+    with _session_scope() as session:
+        result = session.execute(
+            update(UploadSession)
+            .where(UploadSession.id == session_id, UploadSession.status == "open")
+            .values(status=status, job_id=job_id)
+            .execution_options(synchronize_session=False)
+        )
+        _commit(session)
+        return result.rowcount == 1
+
+
+@timed("db.expire_upload_sessions")
+def expire_upload_sessions(limit: int = 100) -> List[Dict[str, object]]:
+    """Mark open sessions past their expiry as expired and return them.
+
+    The caller aborts their multipart uploads; a session is only returned to
+    the caller that flipped it, so concurrent sweeps do not overlap.
+    """
+    with _session_scope() as session:
+        candidates = session.execute(
+            select(UploadSession)
+            .where(UploadSession.status == "open", UploadSession.expires_at < _utcnow())
+            .order_by(UploadSession.expires_at)
+            .limit(limit)
+        ).scalars().all()
+        expired = []
+        for upload_session in candidates:
+            result = session.execute(
+                update(UploadSession)
+                .where(UploadSession.id == upload_session.id, UploadSession.status == "open")
+                .values(status="expired")
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                expired.append(_upload_session_row(upload_session))
+        _commit(session)
+        return expired
+
+
+@timed("db.start_album_deletion")
+def start_album_deletion(photographer_username: str, album_slug: str) -> Optional[Dict[str, object]]:
+    """Mark an album as deleting; returns its deletion, or None if there is no such album.
+
+    If the album is already being deleted the existing deletion is returned.
+    """
+    with _session_scope() as session:
+        photographer_id = session.execute(
+            select(Album.photographer_id).where(*_album_filter(photographer_username, album_slug))
+        ).scalar()
+        if photographer_id is None:
+            return None
+        deletion = session.execute(
+            select(AlbumDeletion).where(
+                AlbumDeletion.photographer_id == photographer_id,
+                AlbumDeletion.album_slug == album_slug,
+                AlbumDeletion.status.in_(ACTIVE_DELETION_STATUSES),
+            )
+        ).scalar()
+        if deletion is None:
+            deletion = AlbumDeletion(
+                id=uuid.uuid4().hex,
+                photographer_id=photographer_id,
+                album_slug=album_slug,
+                status="pending",
+                deleted_objects=0,
+                created_at=_utcnow(),
+            )
+            session.add(deletion)
+            _commit(session, photographer_username)
+        return _album_deletion_row(deletion, photographer_username)
+
+
+def _album_deletion_row(deletion: AlbumDeletion, photographer_username: str) -> Dict[str, object]:
+    entry = deletion.to_dict()
+    entry["photographer"] = photographer_username
+    entry["lease_expires_at"] = deletion.lease_expires_at
+    return entry
+
+
+@timed("db.get_album_deletion")
+def get_album_deletion(photographer_username: str, deletion_id: str) -> Optional[Dict[str, object]]:
+    """Return one of the photographer's album deletions, or None."""
+    with _session_scope() as session:
+        deletion = session.execute(
+            select(AlbumDeletion)
+            .join(User, AlbumDeletion.photographer_id == User.id)
+            .where(AlbumDeletion.id == deletion_id, User.username == photographer_username)
+        ).scalar()
+        return _album_deletion_row(deletion, photographer_username) if deletion else None
+
+
+@timed("db.get_deleting_album_slugs")
+def get_deleting_album_slugs(photographer_username: str) -> List[str]:
+    """Slugs of the photographer's albums with a deletion in progress."""
+    with _session_scope() as session:
+        return list(session.execute(
+            select(AlbumDeletion.album_slug)
+            .join(User, AlbumDeletion.photographer_id == User.id)
+            .where(User.username == photographer_username, AlbumDeletion.status.in_(ACTIVE_DELETION_STATUSES))
+        ).scalars())
+
+
+@timed("db.claim_album_deletion")
+def claim_album_deletion(deletion_id: str, owner: str) -> Optional[Dict[str, object]]:
+    """Take (or renew) the lease on an unfinished deletion and return it.
+
+    Returns None if another worker holds an unexpired lease or the deletion
+    is over.
+    """
+    now = _utcnow()
+    with _session_scope() as session:
+        result = session.execute(
+            update(AlbumDeletion)
+            .where(
+                AlbumDeletion.id == deletion_id,
+                AlbumDeletion.status.in_(ACTIVE_DELETION_STATUSES),
+                or_(
+                    AlbumDeletion.lease_owner.is_(None),
+                    AlbumDeletion.lease_owner == owner,
+                    AlbumDeletion.lease_expires_at < now,
+                ),
+            )
+            .values(
+                status="running",
+                lease_owner=owner,
+                lease_expires_at=now + timedelta(seconds=ALBUM_DELETE_LEASE_SECONDS),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        _commit(session)
+        if result.rowcount != 1:
+            return None
+        deletion, photographer_username = session.execute(
+            select(AlbumDeletion, User.username)
+            .join(User, AlbumDeletion.photographer_id == User.id)
+            .where(AlbumDeletion.id == deletion_id)
+        ).one()
+        return _album_deletion_row(deletion, photographer_username)
+
+
+@timed("db.record_album_deletion_progress")
+def record_album_deletion_progress(
+    deletion_id: str, owner: str, deleted: int = 0, total_objects: Optional[int] = None
+) -> bool:
+    """Add ``deleted`` objects to the progress and renew the lease; False if the lease was lost."""
+    values = {
+        "deleted_objects": AlbumDeletion.deleted_objects + deleted,
+        "lease_expires_at": _utcnow() + timedelta(seconds=ALBUM_DELETE_LEASE_SECONDS),
+    }
+    if total_objects is not None:
+        values["total_objects"] = total_objects
+    with _session_scope() as session:
+        result = session.execute(
+            update(AlbumDeletion)
+            .where(AlbumDeletion.id == deletion_id, AlbumDeletion.lease_owner == owner, AlbumDeletion.status == "running")
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        _commit(session)
+        return result.rowcount == 1
+
+
+@timed("db.finish_album_deletion")
+def finish_album_deletion(deletion_id: str, owner: str, error: Optional[str] = None) -> bool:
+    """Close a deletion as done, deleting the album row, or as failed with ``error``."""
+    with _session_scope() as session:
+        deletion = session.execute(
+            select(AlbumDeletion).where(
+                AlbumDeletion.id == deletion_id,
+                AlbumDeletion.lease_owner == owner,
+                AlbumDeletion.status == "running",
+            )
+        ).scalar()
+        if deletion is None:
+            return False
+        if error is None:
+            album = session.execute(
+                select(Album).where(
+                    Album.photographer_id == deletion.photographer_id,
+                    Album.album_id == deletion.album_slug,
+                )
+            ).scalar()
+            if album is not None:
+                session.delete(album)
+        deletion.status = "failed" if error else "done"
+        deletion.error = error
+        deletion.lease_owner = None
+        deletion.lease_expires_at = None
+        deletion.finished_at = _utcnow()
+        _commit(session)
+        return True
+
+
+@timed("db.get_stalled_album_deletions")
+def get_stalled_album_deletions() -> List[str]:
+    """IDs of unfinished deletions no worker holds a live lease on."""
+    with _session_scope() as session:
+        return list(session.execute(
+            select(AlbumDeletion.id).where(
+                AlbumDeletion.status.in_(ACTIVE_DELETION_STATUSES),
+                or_(AlbumDeletion.lease_expires_at.is_(None), AlbumDeletion.lease_expires_at < _utcnow()),
+            )
+        ).scalars())
+
+
+ACTIVE_JOB_STATUSES = ("queued", "running")
+
+
+def _job_is_stale(job: BackgroundJob, now: datetime) -> bool:
+    return job.status in ACTIVE_JOB_STATUSES and job.updated_at < now - timedelta(seconds=JOB_STALE_SECONDS)
+
+
+def _job_row(job: BackgroundJob, now: Optional[datetime] = None) -> Dict[str, object]:
+    entry = job.to_dict()
+    entry["owner"] = job.owner
+    if _job_is_stale(job, now or _utcnow()):
+        entry["status"] = "failed"
+        entry["error"] = "The job was interrupted before it finished."
+    return entry
+
+
+@timed("db.create_job")
+def create_job(kind: str, owner: str, dedupe_key: Optional[str] = None) -> Tuple[Dict[str, object], bool]:
+    """Record a queued job, unless one with ``dedupe_key`` is already live.
+
+    Returns ``(job, created)``.  ``created`` is False when a queued, running
+    or succeeded job with the key exists; that job is returned and the caller
+    must not run the work again.  A failed or abandoned job with the key is
+    reset to queued and handed to the caller instead.  Jobs that finished
+    more than ``JOB_RETENTION_SECONDS`` ago are dropped first.
+    """
+    now = _utcnow()
+    with _session_scope() as session:
+        session.execute(
+            delete(BackgroundJob)
+            .where(BackgroundJob.finished_at < now - timedelta(seconds=JOB_RETENTION_SECONDS))
+            .execution_options(synchronize_session=False)
+        )
+        if dedupe_key:
+            taken_over = session.execute(
+                update(BackgroundJob)
+                .where(
+                    BackgroundJob.dedupe_key == dedupe_key,
+                    or_(
+                        BackgroundJob.status == "failed",
+                        and_(
+                            BackgroundJob.status.in_(ACTIVE_JOB_STATUSES),
+                            BackgroundJob.updated_at < now - timedelta(seconds=JOB_STALE_SECONDS),
+                        ),
+                    ),
+                )
+                .values(
+                    kind=kind, owner=owner, status="queued", result=None, error=None,
+                    created_at=now, updated_at=now, finished_at=None,
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            existing = session.execute(
+                select(BackgroundJob).where(BackgroundJob.dedupe_key == dedupe_key)
+            ).scalar()
+            if existing is not None:
+                row = _job_row(existing, now)
+                _commit(session)
+                return row, bool(taken_over)
+
+        job = BackgroundJob(
+            id=uuid.uuid4().hex, kind=kind, owner=owner, dedupe_key=dedupe_key,
+            status="queued", created_at=now, updated_at=now,
+        )
+        session.add(job)
+        try:
+            _commit(session)
+        except IntegrityError:
+            # Another worker created the job with this key first
+            session.rollback()
+            existing = session.execute(
+                select(BackgroundJob).where(BackgroundJob.dedupe_key == dedupe_key)
+            ).scalar()
+            return _job_row(existing, now), False
+        return _job_row(job, now), True
+
+
+@timed("db.get_job")
+def get_job(job_id: str) -> Optional[Dict[str, object]]:
+    # Always the primary: a replica may lag behind the job's progress
+    with _session_scope() as session:
+        job = session.get(BackgroundJob, job_id)
+        return _job_row(job) if job is not None else None
+
+
+@timed("db.find_job")
+def find_job(dedupe_key: str) -> Optional[Dict[str, object]]:
+    """The queued, running or succeeded job submitted with ``dedupe_key``."""
+    with _session_scope() as session:
+        job = session.execute(
+            select(BackgroundJob).where(BackgroundJob.dedupe_key == dedupe_key)
+        ).scalar()
+        if job is None:
+            return None
+        row = _job_row(job)
+        return row if row["status"] != "failed" else None
+
+
+@timed("db.update_job")
+def update_job(job_id: str, status: str, result: object = None, error: Optional[str] = None) -> None:
+    """Move a job to ``running``, or finish it as ``succeeded``/``failed``."""
+    now = _utcnow()
+    values = {"status": status, "updated_at": now}
+    if status not in ACTIVE_JOB_STATUSES:
+        values.update(
+            result=json.dumps(result, default=str) if result is not None else None,
+            error=error,
+            finished_at=now,
+        )
+    with _session_scope() as session:
+        session.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id == job_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        _commit(session)
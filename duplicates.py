@@ -0,0 +1,99 @@
+"""Exact and near-duplicate matching over photo fingerprints.
+
+Photos are compared by sha256 content hash (exact) and by the Hamming
+distance between their 64-bit difference hashes (near, see
+``imaging.dhash``).  Grouping avoids comparing every pair: splitting the hash
+into ``threshold + 1`` chunks, any two hashes within ``threshold`` bits must
+agree exactly on at least one chunk, so only photos sharing a chunk are
+compared.
+"""
+
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from config import DUPLICATE_HAMMING_THRESHOLD
+
+HASH_BITS = 64
+
+
+def hamming(a: str, b: str) -> int:
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def find_matches(
+    content_hash: str,
+    phash: Optional[str],
+    candidates: Sequence[Dict[str, object]],
+    threshold: int = DUPLICATE_HAMMING_THRESHOLD,
+) -> List[Tuple[Dict[str, object], str, int]]:
+    """Return ``(candidate, "exact" | "near", distance)`` for each duplicate, closest first."""
+    matches = []
+    for candidate in candidates:
+        if candidate.get("content_hash") == content_hash:
+            matches.append((candidate, "exact", 0))
+        elif phash and candidate.get("phash"):
+            distance = hamming(phash, candidate["phash"])
+            if distance <= threshold:
+                matches.append((candidate, "near", distance))
+    matches.sort(key=lambda match: match[2])
+    return matches
+
+
+def _chunks(threshold: int) -> List[Tuple[int, int]]:
+    count = min(threshold + 1, HASH_BITS)
+    edges = [HASH_BITS * index // count for index in range(count + 1)]
+    return list(zip(edges, edges[1:]))
+
+
+def group_duplicates(
+    entries: Sequence[Dict[str, object]], threshold: int = DUPLICATE_HAMMING_THRESHOLD
+) -> List[Dict[str, object]]:
+    """Union-find ``entries`` into duplicate groups of two or more.
+
+    Each group is ``{"match": "exact" | "near", "photos": [...]}``; a group
+    is ``exact`` only when all its photos share one content hash.
+    """
+    parent = list(range(len(entries)))
+
+    def find(index: int) -> int:
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    def union(a: int, b: int) -> None:
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    by_content: Dict[object, int] = {}
+    for index, entry in enumerate(entries):
+        first = by_content.setdefault(entry.get("content_hash"), index)
+        if first != index:
+            union(first, index)
+
+    hashed = [(index, int(entry["phash"], 16)) for index, entry in enumerate(entries) if entry.get("phash")]
+    for start, end in _chunks(threshold):
+        mask = (1 << (end - start)) - 1
+        buckets: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        for index, value in hashed:
+            buckets[(value >> start) & mask].append((index, value))
+        for bucket in buckets.values():
+            for position, (index, value) in enumerate(bucket):
+                for other_index, other_value in bucket[position + 1:]:
+                    if find(index) != find(other_index) and bin(value ^ other_value).count("1") <= threshold:
+                        union(index, other_index)
+
+    members: Dict[int, List[int]] = defaultdict(list)
+    for index in range(len(entries)):
+        members[find(index)].append(index)
+
+    groups = []
+    for indexes in members.values():
+        if len(indexes) < 2:
+            continue
+        photos = [entries[index] for index in indexes]
+        exact = len({photo.get("content_hash") for photo in photos}) == 1
+        groups.append({"match": "exact" if exact else "near", "photos": photos})
+    groups.sort(key=lambda group: -len(group["photos"]))
+    return groups
@@ -0,0 +1,105 @@
+"""Helpers for the ML service's per-album embeddings files.
+
+The ML service keeps one JSON document per album in the bucket root, named
+``{photographer}-{album}_embeddings.json``, which refers to photos by their
+public URL.  The app never interprets the embeddings themselves; when an
+album is copied or merged it only rewrites those URLs and joins documents,
+so faces do not have to be embedded again.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+
+def embedding_file_name(photographer: str, album_id: str) -> str:
+    return f"{photographer}-{album_id}_embeddings.json"
+
+
+def rewrite_urls(document: Any, old_prefix: str, new_prefix: str) -> Any:
+    """Return ``document`` with every string (and key) starting with ``old_prefix`` re-rooted."""
+    if isinstance(document, str):
+        return new_prefix + document[len(old_prefix):] if document.startswith(old_prefix) else document
+    if isinstance(document, list):
+        return [rewrite_urls(item, old_prefix, new_prefix) for item in document]
+    if isinstance(document, dict):
+        return {
+            rewrite_urls(key, old_prefix, new_prefix): rewrite_urls(value, old_prefix, new_prefix)
+            for key, value in document.items()
+        }
+    return document
+
+
+def _is_url(value: Any) -> bool:
+    return isinstance(value, str) and "://" in value
+
+
+def _entry_identity(entry: Any) -> Optional[str]:
+    """What makes a list entry a duplicate: its photo URL, else (for dicts) its content."""
+    if _is_url(entry):
+        return entry
+    if isinstance(entry, dict):
+        url = next((value for value in entry.values() if _is_url(value)), None)
+        if url is not None:
+            return url
+        return hashlib.sha256(json.dumps(entry, sort_keys=True, default=str).encode()).hexdigest()
+    return None
+
+
+def _drop_known_parallel_urls(target: Dict[str, Any], source: Dict[str, Any]) -> Dict[str, Any]:
+    """Remove from ``source``'s parallel arrays the positions whose URL ``target`` already has."""
+    url_key = next(
+        (key for key, value in source.items()
+         if isinstance(value, list) and value and all(_is_url(item) for item in value)),
+        None,
+    )
+    if url_key is None or not isinstance(target.get(url_key), list):
+        return source
+    urls = source[url_key]
+    seen = set(target[url_key])
+    keep = []
+    for index, url in enumerate(urls):
+        if url not in seen:
+            seen.add(url)
+            keep.append(index)
+    if len(keep) == len(urls):
+        return source
+    return {
+        key: [value[index] for index in keep] if isinstance(value, list) and len(value) == len(urls) else value
+        for key, value in source.items()
+    }
+
+
+def merge_documents(target: Any, source: Any) -> Any:
+    """Join two embeddings documents of the same shape.
+
+    Lists are concatenated and dicts merged key by key (recursively), so both
+    a list of entries and parallel ``{"urls": [...], "embeddings": [...]}``
+    arrays stay aligned.  A photo the target already has (same URL, or for
+    entries without one the same content) is not added again, and a dict key
+    that is a photo URL keeps the target's value.  For anything else the
+    target wins.
+    """
+    if target is None:
+        return source
+    if isinstance(target, list) and isinstance(source, list):
+        seen = {identity for identity in map(_entry_identity, target) if identity is not None}
+        merged = list(target)
+        for entry in source:
+            identity = _entry_identity(entry)
+            if identity is not None:
+                if identity in seen:
+                    continue
+                seen.add(identity)
+            merged.append(entry)
+        return merged
+    if isinstance(target, dict) and isinstance(source, dict):
+        source = _drop_known_parallel_urls(target, source)
+        merged = dict(target)
+        for key, value in source.items():
+            if key not in target:
+                merged[key] = value
+            elif not _is_url(key):
+                merged[key] = merge_documents(target[key], value)
+        return merged
+    return target
@@ -154,6 +154,20 @@ document.addEventListener('DOMContentLoaded', async () => {
     let isInAlbumSelectMode = false;
     let selectedAlbumIds = new Set();
 
+    // Thumbnail markup: WebP rendition with JPEG fallback, falling back to the
+    // original if renditions have not been generated for this photo yet.
+    function renditionImage(photo, originalUrl, size, alt, className, loading = 'lazy') {
+        const rendition = photo.renditions && photo.renditions[size];
+        if (!rendition) {
+            return `<img src="${originalUrl}" alt="${alt}" class="${className}" loading="${loading}">`;
+        }
+        return `<picture>
+                    <source type="image/webp" srcset="${rendition.webp}">
+                    <img src="${rendition.jpg}" alt="${alt}" class="${className}" loading="${loading}" data-original="${originalUrl}"
+                         onerror="this.onerror=null; this.parentNode.querySelector('source')?.remove(); this.src=this.dataset.original;">
+                </picture>`;
+    }
+
     function displayAlbums(albums) {
         if (!DOMElements.albumGrid || !DOMElements.noAlbumsMessage) return;
 
@@ -194,7 +208,7 @@ document.addEventListener('DOMContentLoaded', async () => {
             card.innerHTML = `
                 <div class="relative">
                     <div class="w-full h-48 bg-gray-200 overflow-hidden cursor-pointer img-container">
-                        <img src="${coverUrl}" alt="${album.name}" class="w-full h-full object-cover group-hover:scale-105 transition-transform">
+                        ${album.cover ? renditionImage({ renditions: album.cover_renditions }, coverUrl, '1280', album.name, 'w-full h-full object-cover group-hover:scale-105 transition-transform', 'eager') : `<img src="${coverUrl}" alt="${album.name}" class="w-full h-full object-cover group-hover:scale-105 transition-transform">`}
                     </div>
                     ${selectIndicator}
                     ${shareButtonHTML}
@@ -367,25 +381,70 @@ document.addEventListener('DOMContentLoaded', async () => {
         DOMElements.noPhotosMessage = document.getElementById('no-photos-message');
     }
 
+    // Album photos are fetched a page at a time as the photographer scrolls
+    const PHOTO_PAGE_SIZE = 100;
+    let photoPageObserver = null;
+
+    async function fetchAlbumPhotoPage(albumId, cursor) {
+        const params = new URLSearchParams({ limit: PHOTO_PAGE_SIZE });
+        if (cursor) params.set('after', cursor);
+        const token = localStorage.getItem('authToken');
+        const response = await fetch(`/api/albums/${albumId}/photos?${params}`, {
+            headers: { 'Authorization': `Bearer ${token}` }
+        });
+        if (!response.ok) throw new Error('Failed to fetch photos');
+        return response.json();
+    }
+
+    // Loads the following pages whenever a sentinel below the grid scrolls into view
+    function watchForMorePhotos(albumId, cursor) {
+        if (!cursor) return;
+        const sentinel = document.createElement('div');
+        sentinel.className = 'h-px';
+        DOMElements.photoGrid.after(sentinel);
+        let loading = false;
+        const observer = new IntersectionObserver(async (entries) => {
+            if (!entries[0].isIntersecting || loading) return;
+            loading = true;
+            try {
+                const page = await fetchAlbumPhotoPage(albumId, cursor);
+                cursor = page.next_cursor;
+                displayAlbumPhotos(page.photos, true);
+            } catch (error) {
+                console.error('Error loading more photos:', error);
+            } finally {
+                loading = false;
+            }
+            observer.unobserve(sentinel);
+            if (cursor && observer === photoPageObserver) {
+                // Re-observing fires again at once if the sentinel is still visible
+                observer.observe(sentinel);
+            } else {
+                observer.disconnect();
+                sentinel.remove();
+            }
+        }, { rootMargin: '800px' });
+        photoPageObserver = observer;
+        observer.observe(sentinel);
+    }
+
     async function loadAlbumPhotos(albumId) {
         if (!DOMElements.photoGrid || !DOMElements.photoGridLoader) return;
 
+        if (photoPageObserver) {
+            photoPageObserver.disconnect();
+            photoPageObserver = null;
+        }
+
         try {
             // Show loading state
             DOMElements.photoGridLoader.style.display = 'grid';
             DOMElements.photoGrid.style.display = 'none';
 
-            // Fetch photos from the API
-            const token = localStorage.getItem('authToken');
-            const response = await fetch(`/api/albums/${albumId}/photos`, {
-                headers: { 'Authorization': `Bearer ${token}` }
-            });
-
-            if (!response.ok) throw new Error('Failed to fetch photos');
-            const photos = await response.json();
-
-            // Display photos
-            displayAlbumPhotos(photos);
+            // Fetch the first page from the API and display it
+            const page = await fetchAlbumPhotoPage(albumId, null);
+            displayAlbumPhotos(page.photos);
+            watchForMorePhotos(albumId, page.next_cursor);
 
         } catch (error) {
             console.error('Error loading album photos:', error);
@@ -401,11 +460,16 @@ document.addEventListener('DOMContentLoaded', async () => {
     let selectedPhotoIds = new Set();
     let currentAlbumPhotos = [];
 
-    function displayAlbumPhotos(photos) {
+    function displayAlbumPhotos(photos, append = false) {
         if (!DOMElements.photoGrid || !DOMElements.noPhotosMessage) return;
 
-        DOMElements.photoGrid.innerHTML = '';
-        currentAlbumPhotos = photos || [];
+        photos = photos || [];
+        if (append) {
+            currentAlbumPhotos = currentAlbumPhotos.concat(photos);
+        } else {
+            DOMElements.photoGrid.innerHTML = '';
+            currentAlbumPhotos = photos;
+        }
         const hasPhotos = currentAlbumPhotos.length > 0;
 
         DOMElements.noPhotosMessage.style.display = hasPhotos ? 'none' : 'block';
@@ -413,14 +477,14 @@ document.addEventListener('DOMContentLoaded', async () => {
 
         if (!hasPhotos) return;
 
-        currentAlbumPhotos.forEach(photo => {
+        photos.forEach(photo => {
             const photoItem = document.createElement('div');
             photoItem.className = 'photo-item group relative aspect-square rounded-lg overflow-hidden cursor-pointer shadow-sm hover:shadow-xl transition-all duration-300';
             photoItem.dataset.photoId = photo.id;
             photoItem.innerHTML = `
-                <img src="${photo.url}" alt="${photo.name}" class="w-full h-full object-cover" loading="lazy">
+                ${renditionImage(photo, photo.url, '320', photo.name, 'w-full h-full object-cover')}
                 <div class="photo-overlay absolute inset-0 bg-black bg-opacity-0 group-hover:bg-opacity-20 transition-opacity duration-300"></div>
-                <div class="photo-select-indicator absolute top-2 right-2 h-7 w-7 rounded-full border-2 border-white bg-black/30 flex items-center justify-center transition-all duration-200 hidden">
+                <div class="photo-select-indicator absolute top-2 right-2 h-7 w-7 rounded-full border-2 border-white bg-black/30 flex items-center justify-center transition-all duration-200 ${isInSelectMode ? '' : 'hidden'}">
                     <i class="fas fa-check text-white text-sm"></i>
                 </div>
                 <div class="absolute bottom-0 left-0 right-0 p-2 bg-gradient-to-t from-black/50 to-transparent">
@@ -690,6 +754,148 @@ document.addEventListener('DOMContentLoaded', async () => {
         });
     }
 
+    // Retries reuse one Idempotency-Key, so an upload that reached the server
+    // before the connection dropped is not stored (or embedded) twice.
+    async function uploadWithRetry(formData, token, attempts = 3) {
+        const idempotencyKey = window.crypto && crypto.randomUUID
+            ? crypto.randomUUID()
+            : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+        let lastError;
+        for (let attempt = 0; attempt < attempts; attempt++) {
+            if (attempt > 0) {
+                await new Promise(resolve => setTimeout(resolve, 1000 * 2 ** attempt));
+            }
+            try {
+                const response = await fetch('/api/upload-single-file', {
+                    method: 'POST',
+                    headers: { 'Authorization': `Bearer ${token}`, 'Idempotency-Key': idempotencyKey },
+                    body: formData
+                });
+                if (response.status !== 409 && response.status !== 503) return response;
+                lastError = new Error(`Upload returned ${response.status}`);
+            } catch (error) {
+                lastError = error;
+            }
+        }
+        throw lastError;
+    }
+
+    // Direct uploads send the bytes straight to R2 via presigned URLs; the app
+    // only finalizes. Falls back to /api/upload-single-file when disabled.
+    let directUploadsAvailable = true;
+
+    async function pollJob(statusUrl, token) {
+        for (;;) {
+            const response = await fetch(statusUrl, { headers: { 'Authorization': `Bearer ${token}` } });
+            const job = await response.json();
+            if (!response.ok) throw new Error(job.error || 'Upload job not found');
+            if (job.status === 'succeeded') return job.result;
+            if (job.status === 'failed') throw new Error(job.error || 'Upload processing failed');
+            await new Promise(resolve => setTimeout(resolve, 1000));
+        }
+    }
+
+    async function uploadDirect(file, albumId, token) {
+        const headers = { 'Authorization': `Bearer ${token}`, 'Content-Type': 'application/json' };
+        const start = await fetch('/api/uploads/direct', {
+            method: 'POST',
+            headers,
+            body: JSON.stringify({ album: albumId, filename: file.name, size: file.size })
+        });
+        if (start.status === 404) {
+            directUploadsAvailable = false;
+            return null;
+        }
+        const upload = await start.json();
+        if (!start.ok) throw new Error(upload.error || `Failed to upload ${file.name}`);
+
+        const finalize = { album: albumId, key: upload.key, filename: file.name };
+        try {
+            if (upload.multipart) {
+                const { part_size: partSize, parts } = upload.multipart;
+                const etags = await Promise.all(parts.map(async part => {
+                    const offset = (part.part_number - 1) * partSize;
+                    const response = await fetch(part.url, { method: 'PUT', body: file.slice(offset, offset + partSize) });
+                    if (!response.ok) throw new Error(`Part ${part.part_number} failed`);
+                    return { part_number: part.part_number, etag: response.headers.get('ETag') };
+                }));
+                finalize.multipart = { upload_id: upload.multipart.upload_id, parts: etags };
+            } else {
+                const response = await fetch(upload.url, {
+                    method: 'PUT',
+                    headers: { 'Content-Type': upload.content_type },
+                    body: file
+                });
+                if (!response.ok) throw new Error(`Failed to upload ${file.name}`);
+            }
+        } catch (error) {
+            fetch('/api/uploads/direct/abort', { method: 'POST', headers, body: JSON.stringify(finalize) });
+            throw error;
+        }
+
+        const response = await fetch('/api/uploads/direct/finalize', {
+            method: 'POST',
+            headers,
+            body: JSON.stringify(finalize)
+        });
+        const job = await response.json();
+        if (!response.ok) throw new Error(job.error || `Failed to upload ${file.name}`);
+        return pollJob(job.status_url, token);
+    }
+
+    // Large files go through a resumable upload session: chunks are sent at
+    // part-aligned offsets and, after a failure (or a page reload), sending
+    // resumes from the first part the server does not have yet.
+    const RESUMABLE_UPLOAD_THRESHOLD = 8 * 1024 * 1024;
+
+    async function uploadResumable(file, albumId, token) {
+        const auth = { 'Authorization': `Bearer ${token}` };
+        const jsonHeaders = { ...auth, 'Content-Type': 'application/json' };
+        const storageKey = `uploadSession:${albumId}:${file.name}:${file.size}:${file.lastModified}`;
+
+        let session = null;
+        const savedId = localStorage.getItem(storageKey);
+        if (savedId) {
+            const response = await fetch(`/api/upload-sessions/${savedId}`, { headers: auth });
+            if (response.ok) session = await response.json();
+            if (!session || session.status !== 'open') session = null;
+        }
+        if (!session) {
+            const response = await fetch('/api/upload-sessions', {
+                method: 'POST',
+                headers: jsonHeaders,
+                body: JSON.stringify({ album: albumId, filename: file.name, size: file.size })
+            });
+            session = await response.json();
+            if (!response.ok) throw new Error(session.error || `Failed to upload ${file.name}`);
+            localStorage.setItem(storageKey, session.id);
+        }
+
+        const sessionUrl = `/api/upload-sessions/${session.id}`;
+        let offset = session.next_offset;
+        let failures = 0;
+        while (offset < file.size) {
+            const chunk = file.slice(offset, offset + session.max_chunk_bytes);
+            try {
+                const response = await fetch(`${sessionUrl}?offset=${offset}`, { method: 'PUT', headers: auth, body: chunk });
+                if (!response.ok) throw new Error(`Chunk at ${offset} returned ${response.status}`);
+                offset += chunk.size;
+                failures = 0;
+            } catch (error) {
+                if (++failures > 5) throw error;
+                await new Promise(resolve => setTimeout(resolve, 1000 * 2 ** failures));
+                const progress = await fetch(sessionUrl, { headers: auth }).then(r => r.json()).catch(() => null);
+                if (progress && progress.next_offset !== undefined) offset = progress.next_offset;
+            }
+        }
+
+        const response = await fetch(`${sessionUrl}/complete`, { method: 'POST', headers: jsonHeaders, body: '{}' });
+        const job = await response.json();
+        if (!response.ok) throw new Error(job.error || `Failed to upload ${file.name}`);
+        localStorage.removeItem(storageKey);
+        return pollJob(job.status_url, token);
+    }
+
     async function handlePhotoUpload(event, albumId) {
         const files = Array.from(event.target.files);
         if (files.length === 0) return;
@@ -713,18 +919,20 @@ document.addEventListener('DOMContentLoaded', async () => {
                     DOMElements.uploadStatusText.textContent = `Uploading ${i + 1} of ${files.length}: ${file.name}`;
                 }
 
-                const formData = new FormData();
-                formData.append('file', file);
-                formData.append('album', albumId);
+                let uploaded = directUploadsAvailable ? await uploadDirect(file, albumId, token) : null;
+                if (!uploaded && file.size > RESUMABLE_UPLOAD_THRESHOLD) {
+                    uploaded = await uploadResumable(file, albumId, token);
+                }
+                if (!uploaded) {
+                    const formData = new FormData();
+                    formData.append('file', file);
+                    formData.append('album', albumId);
 
-                const response = await fetch('/api/upload-single-file', {
-                    method: 'POST',
-                    headers: { 'Authorization': `Bearer ${token}` },
-                    body: formData
-                });
+                    const response = await uploadWithRetry(formData, token);
 
-                if (!response.ok) {
-                    throw new Error(`Failed to upload ${file.name}`);
+                    if (!response.ok) {
+                        throw new Error(`Failed to upload ${file.name}`);
+                    }
                 }
 
                 completedCount++;
@@ -867,7 +1075,9 @@ document.addEventListener('DOMContentLoaded', async () => {
                 }
 
                 const result = await response.json();
-                showToast(`Successfully deleted ${result.deleted_count || selectedAlbumIds.size} album(s)`, 'success');
+                // Deletion finishes in the background; the albums are already hidden
+                const deleted = result.deletions ? result.deletions.length : selectedAlbumIds.size;
+                showToast(`Deleting ${deleted} album(s)`, 'success');
 
                 // Exit select mode and reload albums
                 exitAlbumSelectMode();
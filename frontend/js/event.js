@@ -4,6 +4,11 @@ document.addEventListener('DOMContentLoaded', () => {
     let currentLightboxIndex = 0;
     let currentPhotographer = '';
     let currentAlbum = '';
+    // Full-access galleries are fetched a page at a time as the guest scrolls
+    const PHOTO_PAGE_SIZE = 60;
+    let photoPagesUrl = '';
+    let nextPhotoCursor = null;
+    let photoPageObserver = null;
 
     // --- DOM Elements ---
     const views = {
@@ -214,11 +219,30 @@ document.addEventListener('DOMContentLoaded', () => {
 
 
     // --- Photo Rendering ---
-    const renderPhotos = (photos) => {
-        photosContainer.innerHTML = '';
-        currentlyDisplayedPhotos = photos;
+    // Thumbnail markup: WebP rendition with JPEG fallback, falling back to the
+    // original if renditions have not been generated for this photo yet.
+    const renditionImage = (photo, originalUrl, size, alt, className, loading = 'lazy') => {
+        const rendition = photo.renditions && photo.renditions[size];
+        if (!rendition) {
+            return `<img src="${originalUrl}" alt="${alt}" class="${className}" loading="${loading}">`;
+        }
+        return `<picture>
+                    <source type="image/webp" srcset="${rendition.webp}">
+                    <img src="${rendition.jpg}" alt="${alt}" class="${className}" loading="${loading}" data-original="${originalUrl}"
+                         onerror="this.onerror=null; this.parentNode.querySelector('source')?.remove(); this.src=this.dataset.original;">
+                </picture>`;
+    };
 
-        if (!photos || photos.length === 0) {
+    const renderPhotos = (photos, append = false) => {
+        const startIndex = append ? currentlyDisplayedPhotos.length : 0;
+        if (append) {
+            currentlyDisplayedPhotos = currentlyDisplayedPhotos.concat(photos);
+        } else {
+            photosContainer.innerHTML = '';
+            currentlyDisplayedPhotos = photos;
+        }
+
+        if (!currentlyDisplayedPhotos || currentlyDisplayedPhotos.length === 0) {
             photosContainer.className = 'col-span-full';
             photosContainer.innerHTML = `<p class="text-center text-gray-500 py-10">No photos were found in this album.</p>`;
             return;
@@ -226,7 +250,8 @@ document.addEventListener('DOMContentLoaded', () => {
 
         photosContainer.className = 'grid grid-cols-2 sm:grid-cols-3 md:grid-cols-4 lg:grid-cols-5 gap-4';
 
-        photos.forEach((photo, index) => {
+        photos.forEach((photo, pageIndex) => {
+            const index = startIndex + pageIndex;
             // Derive photo name from URL if not provided (VIP search only returns url/score)
             const photoUrl = photo.url || '';
             let photoName = photo.name;
@@ -249,7 +274,7 @@ document.addEventListener('DOMContentLoaded', () => {
             const photoCard = document.createElement('div');
             photoCard.className = 'photo-item aspect-square bg-gray-200 rounded-lg overflow-hidden group relative cursor-pointer';
             photoCard.innerHTML = `
-                <img src="${photoUrl}" alt="${photoName}" class="w-full h-full object-cover transition-transform duration-300 group-hover:scale-105" loading="lazy">
+                ${renditionImage(photo, photoUrl, '320', photoName, 'w-full h-full object-cover transition-transform duration-300 group-hover:scale-105')}
                 <div class="photo-overlay absolute inset-0 opacity-0 group-hover:opacity-100 transition-opacity duration-300"></div>
                 <button data-url="${photoUrl}" data-name="${photoName}" class="photo-download-btn absolute top-2 right-2 h-10 w-10 bg-black bg-opacity-40 rounded-full flex items-center justify-center opacity-0 group-hover:opacity-100 transition-opacity z-10" title="Download Photo">
                     <i class="fas fa-download text-white text-lg"></i>
@@ -291,6 +316,82 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     };
 
+    // --- Paged Gallery ---
+    const photoPageUrl = (cursor) => {
+        const params = new URLSearchParams({ limit: PHOTO_PAGE_SIZE, format: 'compact' });
+        if (cursor) params.set('after', cursor);
+        return `${photoPagesUrl}?${params}`;
+    };
+
+    // Rebuilds full photo entries from a compact page (base URLs plus names);
+    // bit i of a photo's renditions mask means rendition_sizes[i] is stored
+    const expandCompactPage = (page) => ({
+        next_cursor: page.next_cursor || null,
+        photos: (page.photos || []).map((name, index) => {
+            const mask = (page.renditions || [])[index] || 0;
+            const sizes = page.rendition_sizes.filter((size, bit) => mask & (1 << bit));
+            return {
+                id: name,
+                name,
+                url: page.base_url + name,
+                renditions: sizes.length ? Object.fromEntries(sizes.map(size => [
+                    size,
+                    Object.fromEntries(page.rendition_formats.map(ext => [ext, `${page.rendition_base_url}${size}/${name}.${ext}`])),
+                ])) : null,
+            };
+        }),
+    });
+
+    const loadNextPhotoPage = async () => {
+        if (!nextPhotoCursor) return;
+        const response = await fetch(photoPageUrl(nextPhotoCursor));
+        if (!response.ok) throw new Error(`HTTP error! Status: ${response.status}`);
+        const page = expandCompactPage(await response.json());
+        nextPhotoCursor = page.next_cursor;
+        renderPhotos(page.photos, true);
+    };
+
+    const loadAllPhotos = async () => {
+        while (nextPhotoCursor) await loadNextPhotoPage();
+    };
+
+    // Renders the first page straight away; later pages load as a sentinel
+    // below the grid scrolls into view.
+    const loadPagedPhotos = async (url) => {
+        photoPagesUrl = url;
+        const firstPage = expandCompactPage(await fetchPhotos(photoPageUrl(null)));
+        nextPhotoCursor = firstPage.next_cursor;
+        stopLoadingAnimation();
+        showView('gallery');
+        renderPhotos(firstPage.photos);
+        if (!nextPhotoCursor) return;
+
+        const sentinel = document.createElement('div');
+        sentinel.className = 'h-px';
+        photosContainer.after(sentinel);
+        let loading = false;
+        photoPageObserver = new IntersectionObserver(async (entries) => {
+            if (!entries[0].isIntersecting || loading) return;
+            loading = true;
+            try {
+                await loadNextPhotoPage();
+            } catch (error) {
+                console.error('Failed to load more photos:', error);
+            } finally {
+                loading = false;
+            }
+            photoPageObserver.unobserve(sentinel);
+            if (nextPhotoCursor) {
+                // Re-observing fires again at once if the sentinel is still visible
+                photoPageObserver.observe(sentinel);
+            } else {
+                photoPageObserver.disconnect();
+                sentinel.remove();
+            }
+        }, { rootMargin: '800px' });
+        photoPageObserver.observe(sentinel);
+    };
+
     // --- Main Application Logic ---
     const init = async () => {
         const urlParams = new URLSearchParams(window.location.search);
@@ -369,10 +470,7 @@ document.addEventListener('DOMContentLoaded', () => {
             }
         } else if (linkType === 'full') {
             startLoadingAnimation('full');
-            const photos = await fetchPhotos(`/api/event/${photographer}/${album}`);
-            stopLoadingAnimation();
-            showView('gallery');
-            renderPhotos(photos);
+            await loadPagedPhotos(`/api/event/${photographer}/${album}`);
         } else {
             stopLoadingAnimation();
             showView('loading');
@@ -467,6 +565,11 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // MODIFIED: Listener for the "Download All" button - uses ZIP endpoint
     downloadAllBtn.addEventListener('click', async () => {
+        try {
+            await loadAllPhotos();
+        } catch (error) {
+            console.error('Failed to load remaining photos:', error);
+        }
         if (currentlyDisplayedPhotos.length === 0) {
             alert("There are no photos to download.");
             return;
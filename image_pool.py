@@ -0,0 +1,124 @@
+"""Process pool for CPU-bound image work.
+
+Pillow releases the GIL for parts of decoding and encoding but not for
+everything around them, so request threads doing image work contend for one
+core.  Jobs submitted here run in ``IMAGE_POOL_WORKERS`` separate processes
+instead.  Jobs take and return plain bytes (see ``imaging.process_upload``)
+so that only encoded buffers cross the process boundary.
+
+At most ``IMAGE_POOL_MAX_PENDING`` jobs may be queued or running; beyond
+that :func:`run` raises :class:`ImagePoolBusy` straight away, which the app
+turns into a 503 with ``Retry-After`` rather than letting uploads pile up in
+memory.
+
+Workers are started with the ``spawn`` method, so they never inherit the
+parent's threads, sockets or database connections.  The pool is created on
+first use and recreated if the process has forked since, or if a worker died.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional, TypeVar
+
+from config import IMAGE_POOL_MAX_PENDING, IMAGE_POOL_TIMEOUT_SECONDS, IMAGE_POOL_WORKERS
+
+T = TypeVar("T")
+
+
+class ImagePoolBusy(Exception):
+    """Raised when the image pool is saturated; callers should retry later."""
+
+
+_lock = threading.Lock()
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_slots = threading.BoundedSemaphore(max(1, IMAGE_POOL_MAX_PENDING))
+_pending = 0
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor, _executor_pid
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(
+                max_workers=IMAGE_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _discard_executor(executor: ProcessPoolExecutor) -> None:
+    global _executor
+    with _lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _acquire_slot() -> None:
+    global _pending
+    if not _slots.acquire(blocking=False):
+        raise ImagePoolBusy("Image processing is at capacity, please retry shortly.")
+    with _lock:
+        _pending += 1
+
+
+def _release_slot(_future: Optional[Future] = None) -> None:
+    global _pending
+    with _lock:
+        _pending -= 1
+    _slots.release()
+
+
+def worker_pids() -> List[int]:
+    """PIDs of this process's live pool workers, for memory accounting."""
+    executor = _executor
+    if executor is None or _executor_pid != os.getpid():
+        return []
+    # ProcessPoolExecutor keeps its worker processes in a private dict
+    return list(getattr(executor, "_processes", None) or {})
+
+
+def pending_jobs() -> int:
+    """Jobs currently queued or running."""
+    return _pending
+
+
+def run(func: Callable[..., T], *args, timeout: float = IMAGE_POOL_TIMEOUT_SECONDS, **kwargs) -> T:
+    """Run ``func(*args, **kwargs)`` in the pool and wait for its result.
+
+    ``func`` must be a module-level function.  With ``IMAGE_POOL_WORKERS=0``
+    the job runs inline, still subject to the pending-job limit.
+    """
+    _acquire_slot()
+    if IMAGE_POOL_WORKERS <= 0:
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _release_slot()
+
+    executor = _get_executor()
+    try:
+        future = executor.submit(func, *args, **kwargs)
+    except BrokenProcessPool:
+        _release_slot()
+        _discard_executor(executor)
+        raise
+    except BaseException:
+        _release_slot()
+        raise
+    # The slot is held until the job really finishes, even if we stop waiting.
+    future.add_done_callback(_release_slot)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        raise ImagePoolBusy("Image processing timed out, please retry shortly.") from None
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start a fresh pool next time.
+        _discard_executor(executor)
+        raise
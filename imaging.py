@@ -0,0 +1,258 @@
+"""Pure image transforms used by the upload pipeline.
+
+Everything here takes and returns plain bytes/Pillow objects and does no I/O
+against R2 or the database, so it can run in any thread or process.
+"""
+
+import functools
+import hashlib
+import io
+import os
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from PIL import Image, ImageOps
+
+import memory
+from config import (
+    REFERENCE_PHOTO_FACE_MARGIN,
+    REFERENCE_PHOTO_JPEG_QUALITY,
+    REFERENCE_PHOTO_MAX_SIZE,
+    RENDITION_JPEG_QUALITY,
+    RENDITION_SIZES,
+    RENDITION_WEBP_QUALITY,
+    WATERMARK_LOGO_PATH,
+)
+
+# (file extension, Pillow format, content type); WebP first, JPEG as fallback.
+RENDITION_FORMATS = (
+    ("webp", "WEBP", "image/webp"),
+    ("jpg", "JPEG", "image/jpeg"),
+)
+
+
+class Rendition(NamedTuple):
+    size: int
+    ext: str
+    content_type: str
+    data: bytes
+
+
+class ProcessedUpload(NamedTuple):
+    image: bytes
+    renditions: List[Rendition]
+    # Pixel cap the memory budget imposed on the decode, if any
+    max_pixels: Optional[int] = None
+
+
+def _encode(image: Image.Image, pil_format: str) -> bytes:
+    buffer = io.BytesIO()
+    if pil_format == "WEBP":
+        image.save(buffer, "WEBP", quality=RENDITION_WEBP_QUALITY, method=4)
+    else:
+        image.save(buffer, "JPEG", quality=RENDITION_JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def generate_renditions(image_bytes: bytes, sizes: Sequence[int] = RENDITION_SIZES) -> List[Rendition]:
+    """Downscale ``image_bytes`` to each size (longest edge) in every format.
+
+    Images are never upscaled; a size larger than the original is encoded at
+    the original resolution.  Sizes are produced largest first, each one
+    resized from the previous, so the full-resolution frame is scaled once.
+    """
+    with Image.open(io.BytesIO(image_bytes)) as source:
+        return _renditions_of(prepare_image(source, max_size=max(sizes)), sizes)
+
+
+def _renditions_of(image: Image.Image, sizes: Sequence[int]) -> List[Rendition]:
+    """Encode renditions of an upright RGB image, shrinking it in place."""
+    renditions = []
+    for size in sorted(sizes, reverse=True):
+        if max(image.size) > size:
+            image.thumbnail((size, size), Image.LANCZOS)
+        for ext, pil_format, content_type in RENDITION_FORMATS:
+            renditions.append(Rendition(size, ext, content_type, _encode(image, pil_format)))
+    return renditions
+
+
+@functools.lru_cache(maxsize=32)
+def _scaled_logo(logo_path: str, mtime_ns: int, width: int) -> Tuple[Image.Image, Image.Image]:
+    """Logo resized to ``width`` as an (RGB, alpha mask) pair, cached per size."""
+    with Image.open(logo_path) as logo:
+        logo = logo.convert("RGBA")
+        height = max(1, int(logo.height * width / logo.width))
+        logo = logo.resize((width, height), Image.LANCZOS)
+    return logo.convert("RGB"), logo.getchannel("A")
+
+
+def prepare_image(image: Image.Image, max_pixels: Optional[int] = None, max_size: Optional[int] = None) -> Image.Image:
+    """Return an opened image upright and in RGB, decoding no more pixels than asked for.
+
+    ``max_size`` bounds the longest edge; the image is decoded at no less
+    than that and resampled down, so quality is kept.  ``max_pixels`` is a
+    memory cap: JPEGs are decoded straight at the largest 1/2, 1/4 or 1/8
+    scale that fits under it, even if that leaves fewer pixels than allowed,
+    so the full-size frame is never allocated.
+    """
+    draft_size = target = None
+    if max_size and max(image.size) > max_size:
+        scale = max_size / max(image.size)
+        target = (max_size, max_size)
+        draft_size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    if max_pixels and image.width * image.height > max_pixels:
+        scale = (max_pixels / (image.width * image.height)) ** 0.5
+        pixel_target = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+        if draft_size is None or pixel_target[0] * pixel_target[1] < draft_size[0] * draft_size[1]:
+            target = pixel_target
+            draft_size = (pixel_target[0] // 2 + 1, pixel_target[1] // 2 + 1)
+    if target:
+        image.draft("RGB", draft_size)
+        # thumbnail() reduce()s and resamples whatever draft() could not.
+        image.thumbnail(target, Image.LANCZOS)
+    ImageOps.exif_transpose(image, in_place=True)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return image
+
+
+def composite_logo(image: Image.Image, logo_path: str = WATERMARK_LOGO_PATH) -> Image.Image:
+    """Blend the logo into the top-right corner of an RGB image, in place.
+
+    The logo is a tenth of the image width.  Only the logo's bounding box is
+    touched; the rest of the frame is never copied.
+    """
+    width = max(1, image.width // 10)
+    logo_rgb, logo_mask = _scaled_logo(logo_path, os.stat(logo_path).st_mtime_ns, width)
+    image.paste(logo_rgb, (image.width - logo_rgb.width, 0), logo_mask)
+    return image
+
+
+def watermark_bytes(
+    image_bytes: bytes,
+    logo_path: str = WATERMARK_LOGO_PATH,
+    max_pixels: Optional[int] = None,
+    max_size: Optional[int] = None,
+    image_format: Optional[str] = None,
+    quality: int = 95,
+) -> bytes:
+    """Return ``image_bytes`` upright, watermarked and re-encoded.
+
+    The output keeps the source format unless ``image_format`` is given.
+    """
+    with Image.open(io.BytesIO(image_bytes)) as source:
+        image_format = image_format or source.format or "JPEG"
+        image = prepare_image(source, max_pixels=max_pixels, max_size=max_size)
+        composite_logo(image, logo_path)
+        buffer = io.BytesIO()
+        image.save(buffer, image_format, quality=quality)
+    return buffer.getvalue()
+
+
+def process_upload(
+    image_bytes: bytes,
+    logo_path: Optional[str] = WATERMARK_LOGO_PATH,
+    max_pixels: Optional[int] = None,
+    image_format: Optional[str] = None,
+    sizes: Sequence[int] = RENDITION_SIZES,
+    quality: int = 95,
+) -> ProcessedUpload:
+    """Watermark an uploaded photo and build its renditions from one decode.
+
+    This is the unit of work the upload route hands to the image pool; it
+    takes and returns only bytes so it pickles cheaply.  ``logo_path=None``
+    skips the watermark.  Without ``max_pixels`` the image memory budget is
+    checked here, in the process that decodes, and may downscale the decode
+    or raise :class:`memory.OverBudget`.
+    """
+    with Image.open(io.BytesIO(image_bytes)) as source:
+        if max_pixels is None:
+            max_pixels = memory.plan_image_work(source.width, source.height, source.format)
+        image_format = image_format or source.format or "JPEG"
+        image = prepare_image(source, max_pixels=max_pixels)
+        if logo_path:
+            composite_logo(image, logo_path)
+        buffer = io.BytesIO()
+        image.save(buffer, image_format, quality=quality)
+        return ProcessedUpload(buffer.getvalue(), _renditions_of(image, sizes), max_pixels)
+
+
+def normalize_reference_photo(
+    image_bytes: bytes,
+    max_size: int = REFERENCE_PHOTO_MAX_SIZE,
+    quality: int = REFERENCE_PHOTO_JPEG_QUALITY,
+) -> bytes:
+    """Return a reference photo upright, bounded to ``max_size`` and as JPEG."""
+    with Image.open(io.BytesIO(image_bytes)) as source:
+        max_pixels = memory.plan_image_work(source.width, source.height, source.format)
+        image = prepare_image(source, max_pixels=max_pixels, max_size=max_size)
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def crop_to_face(
+    image_bytes: bytes,
+    box: Sequence[float],
+    margin: float = REFERENCE_PHOTO_FACE_MARGIN,
+    quality: int = REFERENCE_PHOTO_JPEG_QUALITY,
+) -> bytes:
+    """Crop an upright photo to a face box ``(x1, y1, x2, y2)`` plus ``margin``.
+
+    The margin is a fraction of the face's width/height added on each side,
+    so the ML service still sees enough context to re-detect the face.
+    """
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        x1, y1, x2, y2 = box
+        pad_x, pad_y = (x2 - x1) * margin, (y2 - y1) * margin
+        crop_box = (
+            max(0, int(x1 - pad_x)),
+            max(0, int(y1 - pad_y)),
+            min(image.width, int(x2 + pad_x + 0.5)),
+            min(image.height, int(y2 + pad_y + 0.5)),
+        )
+        if crop_box[2] <= crop_box[0] or crop_box[3] <= crop_box[1]:
+            return image_bytes
+        buffer = io.BytesIO()
+        image.crop(crop_box).convert("RGB").save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+class Fingerprint(NamedTuple):
+    content_hash: str
+    phash: Optional[str]
+    width: Optional[int]
+    height: Optional[int]
+
+
+def dhash(image: Image.Image) -> str:
+    """64-bit difference hash of an image as 16 hex digits.
+
+    Each bit says whether a pixel of a 9x8 grayscale thumbnail is brighter
+    than its right-hand neighbour, so re-encodes, resizes and light edits
+    of the same photo land within a few bits of each other.
+    """
+    pixels = list(image.convert("L").resize((9, 8), Image.BOX).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return f"{bits:016x}"
+
+
+def fingerprint(image_bytes: bytes) -> Fingerprint:
+    """Content hash, perceptual hash and upright size of an uploaded image.
+
+    JPEGs are decoded at 1/8 scale, which is plenty for a 9x8 hash.  Images
+    Pillow cannot decode still get a content hash.
+    """
+    content_hash = hashlib.sha256(image_bytes).hexdigest()
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            width, height = image.size
+            if image.getexif().get(0x0112) in (5, 6, 7, 8):
+                width, height = height, width
+            image.draft("L", (64, 64))
+            ImageOps.exif_transpose(image, in_place=True)
+            return Fingerprint(content_hash, dhash(image), width, height)
+    except (OSError, ValueError, SyntaxError):
+        return Fingerprint(content_hash, None, None, None)
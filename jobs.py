@@ -0,0 +1,114 @@
+"""Background jobs with their status in the database.
+
+Work that should not hold a request open (ingesting a photo the browser
+uploaded straight to R2, copying an album, ...) is submitted here and runs on
+a small thread pool of ``JOB_WORKERS`` in the accepting worker.  Each job's
+status and result are stored in the ``background_jobs`` table, so clients can
+poll ``GET /api/jobs/<id>`` through any worker, and a ``dedupe_key`` is
+unique across workers.
+
+A job whose worker dies stops changing status; after ``JOB_STALE_SECONDS``
+it reports as failed and submitting it again starts it afresh, so job
+functions must be safe to run again from scratch.  Finished jobs are dropped
+after ``JOB_RETENTION_SECONDS``.
+"""
+
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Dict, Optional
+
+import db
+from config import JOB_WORKERS
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class Job:
+    """Snapshot of a job's row, as returned by ``db.create_job``/``db.get_job``."""
+
+    def __init__(self, row: Dict[str, object]):
+        self._row = row
+        self.id = row["id"]
+        self.kind = row["kind"]
+        self.owner = row["owner"]
+        self.status = row["status"]
+
+    def to_dict(self) -> Dict[str, object]:
+        return {key: value for key, value in self._row.items() if key != "owner"}
+
+
+class JobRunner:
+    """Thread pool that runs jobs and records their progress in the database.
+
+    ``context`` is called around every job, e.g. ``app.app_context``, so job
+    functions can use the same helpers as request handlers.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, context: Optional[Callable[[], ContextManager]] = None):
+        self._workers = max(1, workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._context = context or nullcontext
+        self._lock = threading.Lock()
+        # Jobs this worker is queuing or running: id -> status
+        self._local: Dict[str, str] = {}
+
+    def init_app(self, app) -> None:
+        """Run jobs inside ``app``'s application context."""
+        self._context = app.app_context
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="job")
+        return self._executor
+
+    def submit(self, kind: str, owner: str, func: Callable, *args, dedupe_key: Optional[str] = None, **kwargs) -> Job:
+        """Queue ``func(*args, **kwargs)``; its return value becomes the job's result.
+
+        If a job with the same ``dedupe_key`` is queued, running or has
+        succeeded (on any worker), that job is returned instead of starting
+        another.
+        """
+        row, created = db.create_job(kind, owner, dedupe_key)
+        job = Job(row)
+        if created:
+            with self._lock:
+                self._local[job.id] = QUEUED
+                self._get_executor().submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _run(self, job: Job, func: Callable, args, kwargs) -> None:
+        with self._lock:
+            self._local[job.id] = RUNNING
+        try:
+            with self._context():
+                db.update_job(job.id, RUNNING)
+                result = func(*args, **kwargs)
+                db.update_job(job.id, SUCCEEDED, result=result)
+        except Exception as exc:
+            print(f"[jobs] {job.kind} {job.id} failed: {exc}\n{traceback.format_exc()}")
+            db.update_job(job.id, FAILED, error=str(exc))
+        finally:
+            with self._lock:
+                self._local.pop(job.id, None)
+
+    def find(self, dedupe_key: str) -> Optional[Job]:
+        """The queued, running or succeeded job submitted with ``dedupe_key``."""
+        row = db.find_job(dedupe_key)
+        return Job(row) if row else None
+
+    def get(self, job_id: str) -> Optional[Job]:
+        row = db.get_job(job_id)
+        return Job(row) if row else None
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs this worker is queuing or running, per status."""
+        with self._lock:
+            counts = {QUEUED: 0, RUNNING: 0}
+            for status in self._local.values():
+                counts[status] += 1
+            return counts
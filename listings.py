@@ -0,0 +1,62 @@
+"""JSON shapes of album photo listings.
+
+The full format repeats every photo's URL and rendition URLs; the compact
+format (``?format=compact``) sends the album's base URLs and rendition layout
+once and then a single column of photo names, from which clients rebuild::
+
+    url       = base_url + name
+    rendition = rendition_base_url + size + "/" + name + "." + format
+
+A second column, ``renditions``, holds one bitmask per photo: bit ``i`` is
+set when ``rendition_sizes[i]`` is stored, and a photo with ``0`` has no
+renditions and is shown from its original.
+"""
+
+from typing import Dict, List, Mapping, Sequence
+
+from config import RENDITION_SIZES
+from imaging import RENDITION_FORMATS
+from r2_storage import get_object_url
+from renditions import ORIGINALS_ROOT, rendition_prefix, rendition_urls
+
+LISTING_FORMATS = ("full", "compact")
+
+
+def originals_prefix(photographer: str, album_id: str) -> str:
+    return f"{ORIGINALS_ROOT}/{photographer}/{album_id}/"
+
+
+def full_photo_entries(
+    photographer: str, album_id: str, keys: Sequence[str], stored_sizes: Mapping[str, Sequence[int]]
+) -> List[Dict[str, object]]:
+    """``[{id, url, name, renditions}, ...]`` for original keys of one album.
+
+    ``stored_sizes`` maps keys to their stored rendition sizes (see
+    ``db.get_rendition_sizes``); ``renditions`` is None for the others.
+    """
+    photos = []
+    for key in keys:
+        photo_id = key.split("/")[-1]
+        photos.append({
+            "id": photo_id,
+            "url": get_object_url(key),
+            "name": photo_id,
+            "renditions": rendition_urls(photographer, album_id, photo_id, stored_sizes.get(key)),
+        })
+    return photos
+
+
+def compact_photo_listing(
+    photographer: str, album_id: str, keys: Sequence[str], stored_sizes: Mapping[str, Sequence[int]]
+) -> Dict[str, object]:
+    """The same photos as base URLs plus columns of names and rendition bitmasks."""
+    bits = {size: 1 << index for index, size in enumerate(RENDITION_SIZES)}
+    return {
+        "format": "compact",
+        "base_url": get_object_url(originals_prefix(photographer, album_id)),
+        "rendition_base_url": get_object_url(rendition_prefix(photographer, album_id)),
+        "rendition_sizes": [str(size) for size in RENDITION_SIZES],
+        "rendition_formats": [ext for ext, _pil_format, _content_type in RENDITION_FORMATS],
+        "photos": [key.split("/")[-1] for key in keys],
+        "renditions": [sum(bits.get(size, 0) for size in stored_sizes.get(key, ())) for key in keys],
+    }
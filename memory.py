@@ -0,0 +1,183 @@
+"""Per-request memory high-water tracking and memory budgets.
+
+Pillow allocates image buffers outside the Python allocator, so tracemalloc
+misses most of what the image and archive routes use.  Instead a single
+background thread samples the RSS of the worker plus its image pool
+processes (where photos are actually decoded) while at least one tracker is
+active and records each tracker's peak.  Peaks are worker-wide, so
+concurrent requests inflate each other's numbers; they are still good enough
+to tell which route and request pushed a worker towards its limit.
+
+Budgets are checked before expensive work starts; the image budget is
+applied by ``imaging.process_upload`` inside the pool process, against the
+image it is about to decode.  Over-budget work is either degraded (smaller
+working set) or rejected with :class:`OverBudget`, which the app turns into
+a 503.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional, Set, Union
+
+from config import (
+    MEMORY_BUDGET_IMAGE_BYTES,
+    MEMORY_BUDGET_MODE,
+    MEMORY_BUDGET_ZIP_BYTES,
+    MEMORY_SAMPLE_INTERVAL_SECONDS,
+    MEMORY_SOFT_LIMIT_BYTES,
+)
+
+# Working-set estimate per decoded pixel while watermarking: the decoded RGB
+# frame plus the transient copy made when EXIF orientation rotates it.
+IMAGE_BYTES_PER_PIXEL = 6
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, OSError, ValueError):
+    _PAGE_SIZE = 4096
+
+
+class OverBudget(Exception):
+    """Raised when work would exceed its memory budget in ``reject`` mode."""
+
+
+def _rss_of(pid: Union[int, str] = "self") -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/statm") as handle:
+            return int(handle.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def current_rss_bytes() -> Optional[int]:
+    """Resident set size of this process plus its image pool workers, or ``None`` where unavailable."""
+    rss = _rss_of()
+    if rss is None:
+        return None
+    # Imported here: image_pool workers import this module through imaging
+    import image_pool
+
+    return rss + sum(_rss_of(pid) or 0 for pid in image_pool.worker_pids())
+
+
+class Tracker:
+    """Peak RSS observed while a block of work was running."""
+
+    __slots__ = ("label", "baseline", "peak", "started")
+
+    def __init__(self, label: str):
+        self.label = label
+        self.baseline = current_rss_bytes() or 0
+        self.peak = self.baseline
+        self.started = time.perf_counter()
+
+    def sample(self, rss: int) -> None:
+        if rss > self.peak:
+            self.peak = rss
+
+    @property
+    def peak_delta(self) -> int:
+        return max(0, self.peak - self.baseline)
+
+
+_trackers: Set[Tracker] = set()
+_trackers_lock = threading.Lock()
+_sampler_wakeup = threading.Event()
+_sampler_started = False
+
+
+def _sampler() -> None:
+    while True:
+        _sampler_wakeup.wait()
+        rss = current_rss_bytes()
+        with _trackers_lock:
+            active = list(_trackers)
+            if not active:
+                _sampler_wakeup.clear()
+        if rss is not None:
+            for tracker in active:
+                tracker.sample(rss)
+        time.sleep(MEMORY_SAMPLE_INTERVAL_SECONDS)
+
+
+def _ensure_sampler() -> None:
+    global _sampler_started
+    if _sampler_started:
+        return
+    with _trackers_lock:
+        if not _sampler_started:
+            threading.Thread(target=_sampler, name="rss-sampler", daemon=True).start()
+            _sampler_started = True
+
+
+def start(label: str) -> Tracker:
+    """Begin tracking peak RSS; pair with :func:`stop`."""
+    _ensure_sampler()
+    tracker = Tracker(label)
+    with _trackers_lock:
+        _trackers.add(tracker)
+    _sampler_wakeup.set()
+    return tracker
+
+
+def stop(tracker: Tracker) -> Tracker:
+    rss = current_rss_bytes()
+    if rss is not None:
+        tracker.sample(rss)
+    with _trackers_lock:
+        _trackers.discard(tracker)
+    return tracker
+
+
+@contextmanager
+def track(label: str) -> Iterator[Tracker]:
+    tracker = start(label)
+    try:
+        yield tracker
+    finally:
+        stop(tracker)
+
+
+def over_soft_limit() -> bool:
+    """True when the worker and its pool are already above ``MEMORY_SOFT_LIMIT_BYTES``."""
+    if MEMORY_SOFT_LIMIT_BYTES <= 0:
+        return False
+    rss = current_rss_bytes()
+    return rss is not None and rss > MEMORY_SOFT_LIMIT_BYTES
+
+
+# Formats Pillow can decode at a reduced scale (``Image.draft``); any other
+# format is decoded at full size before it can be downscaled.
+DRAFT_FORMATS = ("JPEG",)
+
+
+def plan_image_work(width: int, height: int, image_format: Optional[str] = None) -> Optional[int]:
+    """Check an image against the image budget before decoding it.
+
+    Returns ``None`` when the full-resolution image fits, otherwise the
+    maximum pixel count to downscale to (``degrade`` mode).  Raises
+    :class:`OverBudget` in ``reject`` mode, and in ``degrade`` mode for
+    formats that cannot be decoded at a reduced scale (anything but JPEG).
+    """
+    if MEMORY_BUDGET_IMAGE_BYTES <= 0:
+        return None
+    if width * height * IMAGE_BYTES_PER_PIXEL <= MEMORY_BUDGET_IMAGE_BYTES:
+        return None
+    if MEMORY_BUDGET_MODE == "reject":
+        raise OverBudget(f"{width}x{height} image exceeds the image memory budget")
+    if image_format not in DRAFT_FORMATS:
+        raise OverBudget(f"{width}x{height} {image_format or 'image'} exceeds the image memory budget and cannot be downscaled while decoding")
+    return MEMORY_BUDGET_IMAGE_BYTES // IMAGE_BYTES_PER_PIXEL
+
+
+def zip_spool_threshold() -> int:
+    """Bytes of archive kept in memory before spilling to a temporary file."""
+    return MEMORY_BUDGET_ZIP_BYTES if MEMORY_BUDGET_ZIP_BYTES > 0 else 1 << 62
+
+
+def check_zip_size(total_bytes: int) -> None:
+    """Raise :class:`OverBudget` when a ``reject``-mode archive grows too large."""
+    if MEMORY_BUDGET_ZIP_BYTES > 0 and MEMORY_BUDGET_MODE == "reject" and total_bytes > MEMORY_BUDGET_ZIP_BYTES:
+        raise OverBudget("archive exceeds the zip memory budget")
@@ -0,0 +1,211 @@
+"""Low-overhead request and stage timing, exported in Prometheus text format.
+
+Every request is attributed to its Flask route rule; code on the hot path
+records how long each stage took with :func:`stage` or :func:`timed`.  A
+histogram observation is two ``perf_counter`` calls, a bisect and a short
+locked update, so this is meant to stay enabled in production.
+"""
+
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+REQUEST_DURATION = "faceapp_request_duration_seconds"
+STAGE_DURATION = "faceapp_stage_duration_seconds"
+REQUEST_PEAK_MEMORY = "faceapp_request_peak_memory_bytes"
+
+MEMORY_BUCKETS = tuple(float(mib << 20) for mib in (1, 4, 16, 32, 64, 128, 256, 512, 1024, 2048))
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_route: ContextVar[str] = ContextVar("metrics_route", default="-")
+
+
+class Histogram:
+    """Cumulative-bucket histogram; callers hold the registry lock."""
+
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Registry:
+    """Holds histograms keyed by metric name and label set."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._buckets: Dict[str, Sequence[float]] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Labels, float]]]]]] = []
+
+    def describe(self, name: str, help_text: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self._help[name] = help_text
+        self._buckets[name] = buckets
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        with self._lock:
+            series = self._histograms.get(name)
+            if series is None:
+                series = self._histograms[name] = {}
+            histogram = series.get(labels)
+            if histogram is None:
+                histogram = series[labels] = Histogram(self._buckets.get(name, DEFAULT_BUCKETS))
+            histogram.observe(value)
+
+    def register_collector(self, collector) -> None:
+        """Add a callable yielding ``(name, type, help, [(labels, value)])`` at scrape time."""
+        self._collectors.append(collector)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            snapshot = {
+                name: {labels: (list(h.counts), h.total, h.count, h.buckets) for labels, h in series.items()}
+                for name, series in self._histograms.items()
+            }
+
+        for name in sorted(snapshot):
+            lines.append(f"# HELP {name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, (counts, total, count, buckets) in sorted(snapshot[name].items()):
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception as exc:
+                print(f"metrics: collector failed: {exc}")
+                continue
+            for name, metric_type, help_text, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+registry = Registry()
+registry.describe(REQUEST_DURATION, "Request latency by route, method and status class.")
+registry.describe(STAGE_DURATION, "Time spent in an instrumented stage, by route.")
+registry.describe(REQUEST_PEAK_MEMORY, "Peak RSS growth while serving a tracked request, by route.", MEMORY_BUCKETS)
+
+
+def set_route(route: str):
+    """Attribute stages on this thread/context to ``route``; returns a reset token."""
+    return _route.set(route)
+
+
+def reset_route(token) -> None:
+    _route.reset(token)
+
+
+def current_route() -> str:
+    return _route.get()
+
+
+def observe_request(route: str, method: str, status_code: int, seconds: float) -> None:
+    labels = (("route", route), ("method", method), ("status", f"{status_code // 100}xx"))
+    registry.observe(REQUEST_DURATION, labels, seconds)
+
+
+def observe_peak_memory(route: str, peak_bytes: int) -> None:
+    registry.observe(REQUEST_PEAK_MEMORY, (("route", route),), peak_bytes)
+
+
+def observe_stage(name: str, seconds: float, route: Optional[str] = None) -> None:
+    registry.observe(STAGE_DURATION, (("route", route or _route.get()), ("stage", name)), seconds)
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as stage ``name`` of the current route."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start)
+
+
+def timed(name: Optional[str] = None):
+    """Decorator recording each call as a stage (default ``module.function``)."""
+
+    def decorator(func):
+        stage_name = name or f"{func.__module__}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe_stage(stage_name, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def propagate_route(func):
+    """Wrap ``func`` so it reports stages under the caller's route in worker threads."""
+    route = _route.get()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _route.set(route)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _route.reset(token)
+
+    return wrapper
+
+
+def render() -> str:
+    return registry.render()
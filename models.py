@@ -1,9 +1,12 @@
 # models.py
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Table
+from sqlalchemy import create_engine, inspect, text, Column, Integer, BigInteger, String, Boolean, DateTime, Text, ForeignKey, Table, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from sqlalchemy.sql import func
+import itertools
+import json
 import os
+import threading
 
 Base = declarative_base()
 
@@ -58,6 +61,8 @@ class Album(Base):
     photographer_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     cover_photo_path = Column(String(500), nullable=True)  # Path to cover photo in R2
     photo_count = Column(Integer, default=0)
+    # When photo_count/cover were last reconciled with R2; None until then
+    stats_reconciled_at = Column(DateTime, nullable=True)
     is_public = Column(Boolean, default=False)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
@@ -65,6 +70,8 @@ class Album(Base):
     # Relationships
     photographer = relationship("User", back_populates="albums")
     accessible_users = relationship("User", secondary=user_album_access, back_populates="accessible_albums")
+    photos = relationship("Photo", back_populates="album", cascade="all, delete-orphan")
+    renditions = relationship("PhotoRendition", back_populates="album", cascade="all, delete-orphan")
     
     def __repr__(self):
         return f'<Album {self.name}>'
@@ -82,39 +89,319 @@ class Album(Base):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+class Photo(Base):
+    """Fingerprint index of an uploaded photo, used for duplicate detection."""
+    __tablename__ = 'photos'
+    __table_args__ = (UniqueConstraint('object_key', name='uq_photos_object_key'),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    album_id = Column(Integer, ForeignKey('albums.id', ondelete='CASCADE'), nullable=False, index=True)
+    object_key = Column(String(500), nullable=False)  # Key of the original in R2
+    filename = Column(String(255), nullable=True)  # Name as uploaded
+    content_hash = Column(String(64), nullable=False, index=True)  # sha256 of the uploaded bytes
+    phash = Column(String(16), nullable=True)  # 64-bit difference hash, hex
+    size_bytes = Column(BigInteger, nullable=True)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=func.now())
+
+    album = relationship("Album", back_populates="photos")
+
+    def __repr__(self):
+        return f'<Photo {self.object_key}>'
+
+    def to_dict(self):
+        return {
+            'object_key': self.object_key,
+            'filename': self.filename,
+            'content_hash': self.content_hash,
+            'phash': self.phash,
+            'size_bytes': self.size_bytes,
+            'width': self.width,
+            'height': self.height,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class PhotoRendition(Base):
+    """A rendition size of an original that is stored in R2 in every format."""
+    __tablename__ = 'photo_renditions'
+    __table_args__ = (UniqueConstraint('object_key', 'size', name='uq_photo_renditions_key_size'),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    album_id = Column(Integer, ForeignKey('albums.id', ondelete='CASCADE'), nullable=False, index=True)
+    object_key = Column(String(500), nullable=False)  # Key of the original in R2
+    size = Column(Integer, nullable=False)  # Longest edge, one of RENDITION_SIZES
+    created_at = Column(DateTime, default=func.now())
+
+    album = relationship("Album", back_populates="renditions")
+
+    def __repr__(self):
+        return f'<PhotoRendition {self.object_key} {self.size}>'
+
+class UploadRequest(Base):
+    """An upload's ``Idempotency-Key`` and the response it produced."""
+    __tablename__ = 'upload_requests'
+    __table_args__ = (UniqueConstraint('photographer_id', 'idempotency_key', name='uq_upload_requests_key'),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    photographer_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    idempotency_key = Column(String(255), nullable=False)
+    album_slug = Column(String(100), nullable=False)
+    object_key = Column(String(500), nullable=True)  # Set once the upload has finished
+    response = Column(Text, nullable=True)  # JSON body returned to the first request
+    created_at = Column(DateTime, nullable=False)
+    completed_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<UploadRequest {self.idempotency_key}>'
+
+class UploadSession(Base):
+    """A resumable upload, backed by an R2 multipart upload of ``object_key``."""
+    __tablename__ = 'upload_sessions'
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex, handed to the client
+    photographer_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    album_slug = Column(String(100), nullable=False)
+    filename = Column(String(255), nullable=False)
+    size_bytes = Column(BigInteger, nullable=False)
+    part_size = Column(Integer, nullable=False)
+    object_key = Column(String(500), nullable=False)  # Staging key under incoming/
+    r2_upload_id = Column(String(1024), nullable=False)
+    status = Column(String(20), nullable=False, default='open')  # 'open', 'completed', 'aborted', 'expired'
+    job_id = Column(String(32), nullable=True)  # Ingest job started on completion
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<UploadSession {self.id}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'album_id': self.album_slug,
+            'filename': self.filename,
+            'size': self.size_bytes,
+            'part_size': self.part_size,
+            'status': self.status,
+            'job_id': self.job_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
+
+class BackgroundJob(Base):
+    """Status and outcome of a background job, shared by every worker.
+
+    ``dedupe_key`` is unique, so two workers cannot start the same job; a
+    failed or abandoned job with that key is taken over by the next submit.
+    """
+    __tablename__ = 'background_jobs'
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex, handed to the client
+    kind = Column(String(50), nullable=False)
+    owner = Column(String(80), nullable=False, index=True)  # Username of the submitter
+    dedupe_key = Column(String(500), unique=True, nullable=True)
+    status = Column(String(20), nullable=False, default='queued')  # 'queued', 'running', 'succeeded', 'failed'
+    result = Column(Text, nullable=True)  # JSON return value of the job function
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)  # Last status change, to spot abandoned jobs
+    finished_at = Column(DateTime, nullable=True, index=True)
+
+    def __repr__(self):
+        return f'<BackgroundJob {self.kind} {self.status}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class AlbumDeletion(Base):
+    """Background deletion of an album's R2 objects, embeddings and DB row.
+
+    While a deletion is pending or running the album is hidden from listings
+    and its slug cannot be reused.  A worker holds a lease on the row while
+    it works; if the worker dies the lease lapses and another one resumes.
+    """
+    __tablename__ = 'album_deletions'
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex
+    photographer_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    album_slug = Column(String(100), nullable=False)
+    status = Column(String(20), nullable=False, default='pending')  # 'pending', 'running', 'done', 'failed'
+    total_objects = Column(Integer, nullable=True)  # Counted when the work starts
+    deleted_objects = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    lease_owner = Column(String(64), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<AlbumDeletion {self.album_slug} {self.status}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'album_id': self.album_slug,
+            'status': self.status,
+            'total_objects': self.total_objects,
+            'deleted_objects': self.deleted_objects,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+def _normalize_db_url(db_url):
+    # Handle PostgreSQL URL format (for production)
+    if db_url.startswith('postgres://'):
+        db_url = db_url.replace('postgres://', 'postgresql://', 1)
+    return db_url
+
+
+def _display_db_url(db_url):
+    """Mask the password in a database URL for logging."""
+    if db_url.startswith('postgresql://') and '@' in db_url:
+        user_info, host_part = db_url.split('@', 1)
+        user_mask = user_info.split('://', 1)[-1].split(':', 1)[0]
+        return f"postgresql://{user_mask}:***@{host_part}"
+    return db_url
+
+
 # Database configuration
 class DatabaseConfig:
+    """Primary (and optional replica) engines, created on first use.
+
+    Nothing connects at import time. Engines are also rebuilt lazily in a
+    forked child (e.g. a gunicorn worker started with ``--preload``): the
+    parent's pooled connections are dropped without being closed, so the two
+    processes never share a socket.
+    """
+
     def __init__(self):
         # Use SQLite for development, easily switchable to PostgreSQL/MySQL for production
-        db_url = os.environ.get('DATABASE_URL', 'sqlite:///face_recognition_app.db')
-        display_url = db_url
-        if db_url.startswith('postgresql://') and '@' in db_url:
-            user_info, host_part = db_url.split('@', 1)
-            user_mask = user_info.split('://', 1)[-1].split(':', 1)[0]
-            display_url = f"postgresql://{user_mask}:***@{host_part}"
-        print(f"DatabaseConfig: connecting using {display_url}")
-        
-        # Handle PostgreSQL URL format (for production)
-        if db_url.startswith('postgres://'):
-            db_url = db_url.replace('postgres://', 'postgresql://', 1)
-        
-        self.engine = create_engine(
+        self.db_url = _normalize_db_url(os.environ.get('DATABASE_URL', 'sqlite:///face_recognition_app.db'))
+        # Optional read replicas (comma-separated URLs). Read-only helpers in
+        # db.py are routed here; with none configured reads use the primary.
+        self.replica_urls = [
+            _normalize_db_url(url.strip())
+            for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',')
+            if url.strip()
+        ]
+        self._lock = threading.Lock()
+        self._pid = None
+        self._engine = None
+        self._session_factory = None
+        self._replica_engines = []
+        self._replica_sessions = []
+        self._replica_cycle = None
+        self._replica_lock = threading.Lock()
+
+    def _ensure_engines(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._engine is not None:
+                # Forked: forget the parent's connections, keep the engines
+                for engine in [self._engine] + self._replica_engines:
+                    engine.dispose(close=False)
+            else:
+                print(f"DatabaseConfig: connecting using {_display_db_url(self.db_url)}")
+                self._engine = self._create_engine(self.db_url)
+                self._session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self._engine)
+                for url in self.replica_urls:
+                    print(f"DatabaseConfig: read replica {_display_db_url(url)}")
+                    engine = self._create_engine(url)
+                    self._replica_engines.append(engine)
+                    self._replica_sessions.append(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+                self._replica_cycle = itertools.cycle(self._replica_sessions) if self._replica_sessions else None
+            self._pid = os.getpid()
+
+    @property
+    def engine(self):
+        self._ensure_engines()
+        return self._engine
+
+    @property
+    def SessionLocal(self):
+        self._ensure_engines()
+        return self._session_factory
+
+    @property
+    def replica_engines(self):
+        self._ensure_engines()
+        return self._replica_engines
+
+    @staticmethod
+    def _create_engine(db_url):
+        return create_engine(
             db_url,
             echo=os.environ.get('DATABASE_ECHO', 'False').lower() == 'true',
             pool_pre_ping=True,
             pool_recycle=300
         )
-        
-        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
     
     def create_tables(self):
-        """Create all tables"""
+        """Create all tables, and add nullable columns missing from existing ones"""
         Base.metadata.create_all(bind=self.engine)
+        self._add_missing_columns()
+
+    def _add_missing_columns(self):
+        inspector = inspect(self.engine)
+        with self.engine.begin() as connection:
+            for table in Base.metadata.sorted_tables:
+                existing = {column["name"] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name in existing or not column.nullable:
+                        continue
+                    column_type = column.type.compile(dialect=self.engine.dialect)
+                    print(f"DatabaseConfig: adding column {table.name}.{column.name}")
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
     
     def get_session(self):
         """Get database session"""
         return self.SessionLocal()
 
+    @property
+    def has_replicas(self):
+        return bool(self.replica_urls)
+
+    def get_read_session(self):
+        """Get a session on the next read replica (round-robin), or the primary."""
+        self._ensure_engines()
+        if self._replica_cycle is None:
+            return self.SessionLocal()
+        with self._replica_lock:
+            session_factory = next(self._replica_cycle)
+        return session_factory()
+
+    def pool_stats(self):
+        """Return connection pool statistics for the primary and each replica."""
+        engines = [("primary", self.engine)] + [
+            (f"replica-{index}", engine) for index, engine in enumerate(self.replica_engines)
+        ]
+        stats = []
+        for name, engine in engines:
+            pool = engine.pool
+            entry = {
+                "engine": name,
+                "url": engine.url.render_as_string(hide_password=True),
+                "pool": type(pool).__name__,
+            }
+            for attr in ("size", "checkedin", "checkedout", "overflow"):
+                method = getattr(pool, attr, None)
+                if callable(method):
+                    entry[attr] = method()
+            stats.append(entry)
+        return stats
+
 # Global database instance
 db_config = DatabaseConfig()
 
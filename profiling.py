@@ -0,0 +1,166 @@
+"""On-demand cProfile hook for live requests.
+
+Disabled unless ``PROFILING_ENABLED=true``.  When enabled, a request is
+profiled if it carries a valid ``X-Profile-Request`` header (see
+:func:`sign`) or is picked by ``PROFILING_SAMPLE_RATE``.  Each profile is
+written to ``PROFILING_DIR/<route>/`` and only the newest
+``PROFILING_MAX_FILES`` per route are kept.
+
+Only one request is profiled at a time per process: the interpreter allows a
+single active profiler on newer Pythons, and it keeps the overhead bounded.
+Requests arriving while another is being profiled run normally.
+"""
+
+import cProfile
+import hashlib
+import hmac
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from config import (
+    PROFILING_DIR,
+    PROFILING_ENABLED,
+    PROFILING_MAX_FILES,
+    PROFILING_SAMPLE_RATE,
+    PROFILING_SECRET,
+)
+
+PROFILE_HEADER = "X-Profile-Request"
+SIGNATURE_MAX_AGE_SECONDS = 300
+
+_active = threading.Lock()
+
+
+def sign(secret: str = PROFILING_SECRET, timestamp: Optional[int] = None) -> str:
+    """Return a value for the ``X-Profile-Request`` header."""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    digest = hmac.new(secret.encode(), str(timestamp).encode(), hashlib.sha256).hexdigest()
+    return f"{timestamp}.{digest}"
+
+
+def verify_signature(value: Optional[str], secret: str = PROFILING_SECRET) -> bool:
+    """Check a signed header value against ``secret`` and its age."""
+    if not value or not secret or "." not in value:
+        return False
+    timestamp, _, digest = value.partition(".")
+    try:
+        age = abs(time.time() - int(timestamp))
+    except ValueError:
+        return False
+    if age > SIGNATURE_MAX_AGE_SECONDS:
+        return False
+    expected = hmac.new(secret.encode(), timestamp.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, digest)
+
+
+def start(header_value: Optional[str]) -> Optional[cProfile.Profile]:
+    """Start profiling the current request if it was requested or sampled."""
+    if not PROFILING_ENABLED:
+        return None
+    requested = verify_signature(header_value)
+    if not requested and (PROFILING_SAMPLE_RATE <= 0 or random.random() >= PROFILING_SAMPLE_RATE):
+        return None
+    if not _active.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler (e.g. a debugger) already owns the hook.
+        _active.release()
+        return None
+    return profiler
+
+
+def finish(profiler: Optional[cProfile.Profile], route: str) -> Optional[str]:
+    """Stop ``profiler``, write it under the route's directory and rotate."""
+    if profiler is None:
+        return None
+    try:
+        profiler.disable()
+    finally:
+        _active.release()
+
+    directory = os.path.join(PROFILING_DIR, _route_slug(route))
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.prof")
+        profiler.dump_stats(path)
+        _rotate(directory)
+        return path
+    except OSError as exc:
+        print(f"profiling: could not write profile for {route}: {exc}")
+        return None
+
+
+def _route_slug(route: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", route).strip("_") or "root"
+
+
+def _profile_files(directory: str) -> List[str]:
+    try:
+        names = sorted(name for name in os.listdir(directory) if name.endswith(".prof"))
+    except OSError:
+        return []
+    return [os.path.join(directory, name) for name in names]
+
+
+def _rotate(directory: str) -> None:
+    files = _profile_files(directory)
+    for path in files[: max(0, len(files) - PROFILING_MAX_FILES)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def list_routes() -> Dict[str, int]:
+    """Return ``{route directory: number of stored profiles}``."""
+    try:
+        entries = sorted(os.listdir(PROFILING_DIR))
+    except OSError:
+        return {}
+    return {
+        name: len(_profile_files(os.path.join(PROFILING_DIR, name)))
+        for name in entries
+        if os.path.isdir(os.path.join(PROFILING_DIR, name))
+    }
+
+
+def top_functions(route: Optional[str] = None, limit: int = 25, sort: str = "cumulative") -> List[Dict[str, object]]:
+    """Aggregate stored profiles (one route or all) and return the top functions."""
+    routes = [_route_slug(route)] if route else list(list_routes())
+    files = [path for name in routes for path in _profile_files(os.path.join(PROFILING_DIR, name))]
+    if not files:
+        return []
+
+    stats = pstats.Stats(files[0])
+    for path in files[1:]:
+        stats.add(path)
+    sort_field = {"cumulative": "cumtime", "tottime": "tottime", "ncalls": "ncalls"}.get(sort, "cumtime")
+
+    rows = [
+        {
+            "function": f"{filename}:{line}({function})",
+            "ncalls": ncalls,
+            "tottime": round(tottime, 6),
+            "cumtime": round(cumtime, 6),
+        }
+        for (filename, line, function), (_cc, ncalls, tottime, cumtime, _callers) in stats.stats.items()
+    ]
+    rows.sort(key=lambda row: row[sort_field], reverse=True)
+    return rows[:limit]
+
+
+if __name__ == "__main__":
+    # Print a header value for a one-off profiled request:
+    #   curl -H "X-Profile-Request: $(python profiling.py)" ...
+    if not PROFILING_SECRET:
+        raise SystemExit("Set PROFILING_SECRET first.")
+    print(sign())
@@ -1,16 +1,51 @@
 # r2_storage.py
-import boto3
 import os
-from config import R2_CONFIG
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import R2_CONFIG, R2_COPY_CONCURRENCY, R2_DELETE_CONCURRENCY, R2_MULTIPART_CONCURRENCY, R2_MULTIPART_PART_SIZE
+from metrics import timed
 
-# Initialize S3 client for Cloudflare R2
-s3 = boto3.client(
-    "s3",
-    endpoint_url=R2_CONFIG["endpoint_url"],
-    aws_access_key_id=R2_CONFIG["aws_access_key_id"],
-    aws_secret_access_key=R2_CONFIG["aws_secret_access_key"],
-)
+_client_lock = threading.Lock()
+_client = None
+_client_pid = None
 
+
+def get_s3_client():
+    """The S3 client for Cloudflare R2, created on first use in each process.
+
+    boto3 is only imported here, so importing this module stays cheap, and a
+    forked worker builds its own client instead of sharing the parent's
+    connection pool.
+    """
+    global _client, _client_pid
+    if _client_pid == os.getpid():
+        return _client
+    with _client_lock:
+        if _client_pid != os.getpid():
+            import boto3
+            from botocore.config import Config
+
+            _client = boto3.client(
+                "s3",
+                endpoint_url=R2_CONFIG["endpoint_url"],
+                aws_access_key_id=R2_CONFIG["aws_access_key_id"],
+                aws_secret_access_key=R2_CONFIG["aws_secret_access_key"],
+                config=Config(signature_version="s3v4"),  # R2 only accepts SigV4 presigned URLs
+            )
+            _client_pid = os.getpid()
+    return _client
+
+
+class _LazyClient:
+    """Stands in for the client at module level: ``s3.get_object(...)`` etc."""
+
+    def __getattr__(self, name):
+        return getattr(get_s3_client(), name)
+
+
+s3 = _LazyClient()
+
+@timed("r2.upload_to_r2")
 def upload_to_r2(local_file_path, r2_object_path):
     """Upload a local file to Cloudflare R2 storage
     
@@ -43,6 +78,33 @@ def upload_to_r2(local_file_path, r2_object_path):
         print(f"Error uploading to R2: {e}")
         return False, None
 
+@timed("r2.upload_bytes_to_r2")
+def upload_bytes_to_r2(data, r2_object_path, content_type=None):
+    """Upload an in-memory buffer to Cloudflare R2 storage
+    
+    Args:
+        data: Bytes to store
+        r2_object_path: Path/key for the object in R2
+        content_type: Content type; guessed from the key's extension if omitted
+        
+    Returns:
+        Tuple (success, url)
+    """
+    try:
+        s3.put_object(
+            Bucket=R2_CONFIG["bucket_name"],
+            Key=r2_object_path,
+            Body=data,
+            ContentType=content_type or get_content_type(r2_object_path),
+            ACL='public-read'
+        )
+        url = f"{R2_CONFIG['public_base_url']}/{r2_object_path}"
+        return True, url
+    except Exception as e:
+        print(f"Error uploading to R2: {e}")
+        return False, None
+
+@timed("r2.list_objects")
 def list_objects(prefix="", delimiter="", limit=1000):
     """List objects in the R2 bucket
     
@@ -90,6 +152,47 @@ def list_objects(prefix="", delimiter="", limit=1000):
         print(f"Error listing objects in R2: {e}")
         return []
 
+@timed("r2.list_all_objects")
+def list_all_objects(prefix=""):
+    """List every object key under a prefix, following pagination
+    
+    Args:
+        prefix: Prefix filter for objects
+        
+    Returns:
+        List of object keys
+    """
+    keys = []
+    try:
+        paginator = s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=R2_CONFIG["bucket_name"], Prefix=prefix):
+            keys.extend(item['Key'] for item in page.get('Contents', []))
+    except Exception as e:
+        print(f"Error listing objects in R2: {e}")
+    return keys
+
+@timed("r2.list_objects_page")
+def list_objects_page(prefix="", limit=1000, start_after=""):
+    """List one page of objects under a prefix, in key order
+
+    Args:
+        prefix: Prefix filter for objects
+        limit: Maximum number of keys to return (R2 caps this at 1,000)
+        start_after: Only return keys that sort after this key
+
+    Returns:
+        Tuple (keys, is_truncated)
+    """
+    params = {"Bucket": R2_CONFIG["bucket_name"], "Prefix": prefix, "MaxKeys": limit}
+    if start_after:
+        params["StartAfter"] = start_after
+    try:
+        response = s3.list_objects_v2(**params)
+        return [item['Key'] for item in response.get('Contents', [])], response.get('IsTruncated', False)
+    except Exception as e:
+        print(f"Error listing objects in R2: {e}")
+        return [], False
+
 def get_object_url(object_key):
     """Get the public URL for an R2 object
     
@@ -119,6 +222,7 @@ def get_content_type(file_path):
     
     return content_types.get(extension, 'application/octet-stream')
 
+@timed("r2.delete_from_r2")
 def delete_from_r2(r2_object_key):
     """Delete an object from Cloudflare R2 storage
     
@@ -141,6 +245,91 @@ def delete_from_r2(r2_object_key):
         print(error_msg)
         return False, error_msg
 
+DELETE_OBJECTS_MAX_KEYS = 1000
+
+def _delete_chunk(keys):
+    try:
+        response = s3.delete_objects(
+            Bucket=R2_CONFIG["bucket_name"],
+            Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True},
+        )
+    except Exception as e:
+        return {key: str(e) for key in keys}
+    return {
+        error["Key"]: f"{error.get('Code', 'Error')}: {error.get('Message', '')}".rstrip(": ")
+        for error in response.get("Errors", [])
+    }
+
+@timed("r2.delete_objects_bulk")
+def delete_objects_bulk(object_keys):
+    """Delete many objects with DeleteObjects, 1,000 keys per request
+    
+    Requests run concurrently, up to R2_DELETE_CONCURRENCY at a time.
+    
+    Args:
+        object_keys: Keys of the objects to delete
+        
+    Returns:
+        Tuple (deleted_keys, errors) where errors maps each key that could not
+        be deleted to its error message
+    """
+    keys = list(dict.fromkeys(object_keys))
+    if not keys:
+        return [], {}
+    chunks = [keys[start:start + DELETE_OBJECTS_MAX_KEYS] for start in range(0, len(keys), DELETE_OBJECTS_MAX_KEYS)]
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(R2_DELETE_CONCURRENCY, len(chunks)))) as pool:
+        for chunk_errors in pool.map(_delete_chunk, chunks):
+            errors.update(chunk_errors)
+    if errors:
+        print(f"R2_STORAGE: {len(errors)} of {len(keys)} objects could not be deleted")
+    return [key for key in keys if key not in errors], errors
+
+@timed("r2.copy_object")
+def copy_object(source_key, destination_key):
+    """Copy an object inside the bucket without downloading it
+    
+    Args:
+        source_key: Key of the object to copy
+        destination_key: Key of the copy
+        
+    Returns:
+        Tuple (success: bool, error_message: str or None)
+    """
+    try:
+        s3.copy_object(
+            Bucket=R2_CONFIG["bucket_name"],
+            Key=destination_key,
+            CopySource={"Bucket": R2_CONFIG["bucket_name"], "Key": source_key},
+            MetadataDirective="COPY",
+            ACL='public-read'
+        )
+        return True, None
+    except Exception as e:
+        error_msg = f"Error copying {source_key} to {destination_key} in R2: {e}"
+        print(error_msg)
+        return False, error_msg
+
+def copy_objects_bulk(key_pairs):
+    """Copy many objects server-side, up to R2_COPY_CONCURRENCY at a time
+    
+    Args:
+        key_pairs: Iterable of (source_key, destination_key)
+        
+    Returns:
+        Tuple (copied, errors) where copied lists the destination keys written
+        and errors maps each failed source key to its error message
+    """
+    pairs = list(key_pairs)
+    if not pairs:
+        return [], {}
+    with ThreadPoolExecutor(max_workers=max(1, min(R2_COPY_CONCURRENCY, len(pairs)))) as pool:
+        results = list(pool.map(lambda pair: copy_object(*pair), pairs))
+    copied = [destination for (_source, destination), (success, _error) in zip(pairs, results) if success]
+    errors = {source: error for (source, _destination), (success, error) in zip(pairs, results) if not success}
+    return copied, errors
+
+@timed("r2.get_object_bytes")
 def get_object_bytes(object_key):
     """Download an object's bytes from R2 for proxied download
     
@@ -157,4 +346,215 @@ def get_object_bytes(object_key):
         return body, content_type, None
     except Exception as e:
         print(f"Error getting object bytes from R2: {e}")
-        return None, None, str(e)
\ No newline at end of file
+        return None, None, str(e)
+
+
+@timed("r2.head_object")
+def head_object(object_key):
+    """Fetch an object's metadata without downloading it
+    
+    Args:
+        object_key: The key of the object in R2
+        
+    Returns:
+        Dict with 'size', 'content_type' and 'etag', or None if missing
+    """
+    try:
+        response = s3.head_object(Bucket=R2_CONFIG["bucket_name"], Key=object_key)
+        return {
+            "size": response.get("ContentLength", 0),
+            "content_type": response.get("ContentType", "application/octet-stream"),
+            "etag": response.get("ETag", "").strip('"'),
+        }
+    except Exception as e:
+        print(f"Error reading metadata of {object_key} from R2: {e}")
+        return None
+
+def presigned_put_url(object_key, content_type, expires_in):
+    """Create a URL the browser can PUT an object's bytes to directly
+    
+    Args:
+        object_key: Path/key the object will be stored under
+        content_type: Content type the client must send with the PUT
+        expires_in: Seconds the URL stays valid
+        
+    Returns:
+        Presigned URL string
+    """
+    return s3.generate_presigned_url(
+        "put_object",
+        Params={"Bucket": R2_CONFIG["bucket_name"], "Key": object_key, "ContentType": content_type},
+        ExpiresIn=expires_in,
+    )
+
+@timed("r2.create_multipart_upload")
+def create_multipart_upload(object_key, content_type=None):
+    """Start a multipart upload
+    
+    Args:
+        object_key: Path/key the assembled object will be stored under
+        content_type: Content type; guessed from the key's extension if omitted
+        
+    Returns:
+        Tuple (success, upload_id)
+    """
+    try:
+        response = s3.create_multipart_upload(
+            Bucket=R2_CONFIG["bucket_name"],
+            Key=object_key,
+            ContentType=content_type or get_content_type(object_key),
+        )
+        return True, response["UploadId"]
+    except Exception as e:
+        print(f"Error starting multipart upload in R2: {e}")
+        return False, None
+
+def presigned_part_url(object_key, upload_id, part_number, expires_in):
+    """Create a URL the browser can PUT one part of a multipart upload to
+    
+    Args:
+        object_key: Key of the multipart upload
+        upload_id: Upload ID from create_multipart_upload
+        part_number: 1-based part number
+        expires_in: Seconds the URL stays valid
+        
+    Returns:
+        Presigned URL string
+    """
+    return s3.generate_presigned_url(
+        "upload_part",
+        Params={
+            "Bucket": R2_CONFIG["bucket_name"],
+            "Key": object_key,
+            "UploadId": upload_id,
+            "PartNumber": part_number,
+        },
+        ExpiresIn=expires_in,
+    )
+
+@timed("r2.complete_multipart_upload")
+def complete_multipart_upload(object_key, upload_id, parts):
+    """Assemble the uploaded parts into the final object
+    
+    Args:
+        object_key: Key of the multipart upload
+        upload_id: Upload ID from create_multipart_upload
+        parts: List of {'part_number', 'etag'} dicts
+        
+    Returns:
+        Tuple (success: bool, error_message: str or None)
+    """
+    try:
+        s3.complete_multipart_upload(
+            Bucket=R2_CONFIG["bucket_name"],
+            Key=object_key,
+            UploadId=upload_id,
+            MultipartUpload={
+                "Parts": [
+                    {"PartNumber": int(part["part_number"]), "ETag": part["etag"]}
+                    for part in sorted(parts, key=lambda part: int(part["part_number"]))
+                ]
+            },
+        )
+        return True, None
+    except Exception as e:
+        error_msg = f"Error completing multipart upload {object_key} in R2: {e}"
+        print(error_msg)
+        return False, error_msg
+
+@timed("r2.abort_multipart_upload")
+def abort_multipart_upload(object_key, upload_id):
+    """Abort a multipart upload and discard its parts
+    
+    Args:
+        object_key: Key of the multipart upload
+        upload_id: Upload ID from create_multipart_upload
+        
+    Returns:
+        Tuple (success: bool, error_message: str or None)
+    """
+    try:
+        s3.abort_multipart_upload(Bucket=R2_CONFIG["bucket_name"], Key=object_key, UploadId=upload_id)
+        return True, None
+    except Exception as e:
+        error_msg = f"Error aborting multipart upload {object_key} in R2: {e}"
+        print(error_msg)
+        return False, error_msg
+
+@timed("r2.upload_part")
+def upload_part(object_key, upload_id, part_number, data):
+    """Upload one part of a multipart upload
+    
+    Args:
+        object_key: Key of the multipart upload
+        upload_id: Upload ID from create_multipart_upload
+        part_number: 1-based part number
+        data: Bytes of the part
+        
+    Returns:
+        Tuple (success, etag)
+    """
+    try:
+        response = s3.upload_part(
+            Bucket=R2_CONFIG["bucket_name"],
+            Key=object_key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=data,
+        )
+        return True, response["ETag"]
+    except Exception as e:
+        print(f"Error uploading part {part_number} of {object_key} to R2: {e}")
+        return False, None
+
+def upload_parts(object_key, upload_id, data, first_part_number=1, part_size=R2_MULTIPART_PART_SIZE):
+    """Split a buffer into parts and upload them concurrently
+    
+    Up to R2_MULTIPART_CONCURRENCY parts are in flight at once.
+    
+    Args:
+        object_key: Key of the multipart upload
+        upload_id: Upload ID from create_multipart_upload
+        data: Bytes covering one or more consecutive parts
+        first_part_number: Part number of the first part in ``data``
+        part_size: Size of every part but the last
+        
+    Returns:
+        Tuple (success, parts) where parts is a list of {'part_number', 'etag'}
+    """
+    view = memoryview(data)
+    chunks = [
+        (first_part_number + index, view[offset:offset + part_size])
+        for index, offset in enumerate(range(0, len(data), part_size))
+    ]
+    with ThreadPoolExecutor(max_workers=max(1, min(R2_MULTIPART_CONCURRENCY, len(chunks)))) as pool:
+        results = list(pool.map(lambda chunk: upload_part(object_key, upload_id, chunk[0], bytes(chunk[1])), chunks))
+    parts = [
+        {"part_number": part_number, "etag": etag}
+        for (part_number, _chunk), (success, etag) in zip(chunks, results)
+        if success
+    ]
+    return len(parts) == len(chunks), parts
+
+@timed("r2.list_parts")
+def list_parts(object_key, upload_id):
+    """List the parts R2 has received for a multipart upload
+    
+    Args:
+        object_key: Key of the multipart upload
+        upload_id: Upload ID from create_multipart_upload
+        
+    Returns:
+        List of {'part_number', 'size', 'etag'} sorted by part number, or
+        None if the upload does not exist (completed, aborted or expired)
+    """
+    parts = []
+    try:
+        paginator = s3.get_paginator("list_parts")
+        for page in paginator.paginate(Bucket=R2_CONFIG["bucket_name"], Key=object_key, UploadId=upload_id):
+            for part in page.get("Parts", []):
+                parts.append({"part_number": part["PartNumber"], "size": part["Size"], "etag": part["ETag"]})
+    except Exception as e:
+        print(f"Error listing parts of {object_key} in R2: {e}")
+        return None
+    return sorted(parts, key=lambda part: part["part_number"])
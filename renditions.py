@@ -0,0 +1,97 @@
+"""R2 key layout and storage for downscaled photo renditions.
+
+Every original at ``event_albums/{photographer}/{album}/{photo_id}`` gets
+renditions at::
+
+    event_renditions/{photographer}/{album}/{size}/{photo_id}.{webp|jpg}
+
+They live outside the album prefix so album listings, photo counts and the
+embedding pipeline only ever see originals.  URLs are derived from the key
+layout without listing R2, but only for the sizes recorded in the
+``photo_renditions`` table as stored in every format, so a photo whose
+renditions failed falls back to its original.  Albums uploaded before
+renditions (or that table) existed need ``python backfill_renditions.py`` once.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from config import RENDITION_SIZES
+from imaging import RENDITION_FORMATS, Rendition, generate_renditions
+from r2_storage import get_object_url, upload_bytes_to_r2
+
+ORIGINALS_ROOT = "event_albums"
+RENDITIONS_ROOT = "event_renditions"
+
+
+def rendition_prefix(photographer: str, album_id: str) -> str:
+    return f"{RENDITIONS_ROOT}/{photographer}/{album_id}/"
+
+
+def rendition_key(photographer: str, album_id: str, photo_id: str, size: int, ext: str) -> str:
+    return f"{rendition_prefix(photographer, album_id)}{size}/{photo_id}.{ext}"
+
+
+def rendition_keys(photographer: str, album_id: str, photo_id: str) -> List[str]:
+    """All rendition keys of one photo, for deletes."""
+    return [
+        rendition_key(photographer, album_id, photo_id, size, ext)
+        for size in RENDITION_SIZES
+        for ext, _pil_format, _content_type in RENDITION_FORMATS
+    ]
+
+
+def complete_sizes(photographer: str, album_id: str, photo_id: str, existing_keys: Set[str]) -> List[int]:
+    """Sizes of one photo whose rendition keys in every format are among ``existing_keys``."""
+    return [
+        size for size in RENDITION_SIZES
+        if all(
+            rendition_key(photographer, album_id, photo_id, size, ext) in existing_keys
+            for ext, _pil_format, _content_type in RENDITION_FORMATS
+        )
+    ]
+
+
+def rendition_urls(
+    photographer: str, album_id: str, photo_id: str, sizes: Optional[Sequence[int]]
+) -> Optional[Dict[str, Dict[str, str]]]:
+    """``{"320": {"webp": url, "jpg": url}, "1280": {...}}`` for the stored ``sizes`` of one photo.
+
+    Returns None when no size is stored, so clients use the original.
+    """
+    if not sizes:
+        return None
+    return {
+        str(size): {
+            ext: get_object_url(rendition_key(photographer, album_id, photo_id, size, ext))
+            for ext, _pil_format, _content_type in RENDITION_FORMATS
+        }
+        for size in sizes
+    }
+
+
+def rendition_urls_for_key(
+    object_key: Optional[str], sizes: Optional[Sequence[int]]
+) -> Optional[Dict[str, Dict[str, str]]]:
+    """Rendition URLs for an original's full R2 key (e.g. an album cover)."""
+    if not object_key:
+        return None
+    parts = object_key.split("/")
+    if len(parts) != 4 or parts[0] != ORIGINALS_ROOT:
+        return None
+    _root, photographer, album_id, photo_id = parts
+    return rendition_urls(photographer, album_id, photo_id, sizes)
+
+
+def upload_renditions(photographer: str, album_id: str, photo_id: str, renditions: Iterable[Rendition]) -> List[int]:
+    """Upload already-encoded renditions of one photo; returns the sizes stored in every format."""
+    stored, failed = set(), set()
+    for rendition in renditions:
+        key = rendition_key(photographer, album_id, photo_id, rendition.size, rendition.ext)
+        success, _url = upload_bytes_to_r2(rendition.data, key, rendition.content_type)
+        (stored if success else failed).add(rendition.size)
+    return sorted(stored - failed)
+
+
+def store_renditions(photographer: str, album_id: str, photo_id: str, image_bytes: bytes) -> List[int]:
+    """Generate and upload every rendition of one photo; returns the sizes stored in every format."""
+    return upload_renditions(photographer, album_id, photo_id, generate_renditions(image_bytes))
@@ -0,0 +1,167 @@
+"""In-memory manifest of the frontend's static files.
+
+At startup (``load()``, called by ``create_app``) every file under
+``frontend/`` is read once, hashed, and (for text types) precompressed with
+gzip and, if the optional ``brotli`` package is installed, brotli.  HTML pages have their local ``src``/``href``
+references rewritten to ``?v=<hash>`` URLs, so a request carrying the
+current hash can be cached as immutable while pages themselves are always
+revalidated with their ETag.  After that, serving a file never touches the
+filesystem.
+
+Paths with a file extension that are not in the manifest are 404s; only
+extensionless paths fall back to ``index.html`` (client-side routes).
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+from typing import Dict, NamedTuple, Optional
+
+from flask import Response
+
+import compression
+from config import STATIC_ASSETS_RELOAD
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+# Minimum size worth precompressing; smaller files barely shrink.
+PRECOMPRESS_MIN_BYTES = 512
+
+_REFERENCE_PATTERN = re.compile(r'(\b(?:src|href)=")([^"?#:]+)(")')
+
+
+class Asset(NamedTuple):
+    content_type: str
+    etag: str
+    # Encoding ("identity", "gzip", "br") -> body
+    bodies: Dict[str, bytes]
+
+
+def _content_type(path: str) -> str:
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type in ("application/javascript", "application/json"):
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+def _build_asset(path: str, data: bytes) -> Asset:
+    content_type = _content_type(path)
+    bodies = {"identity": data}
+    if content_type.startswith(COMPRESSIBLE_TYPES) and len(data) >= PRECOMPRESS_MIN_BYTES:
+        bodies["gzip"] = gzip.compress(data, compresslevel=9, mtime=0)
+        if compression.brotli is not None:
+            bodies["br"] = compression.brotli.compress(data, quality=11)
+        # Keep a variant only if it is actually smaller
+        bodies = {encoding: body for encoding, body in bodies.items() if encoding == "identity" or len(body) < len(data)}
+    return Asset(content_type, hashlib.sha256(data).hexdigest()[:16], bodies)
+
+
+class StaticAssets:
+    """Serve a directory of static files from memory."""
+
+    def __init__(self, root: str, reload: bool = STATIC_ASSETS_RELOAD):
+        self.root = root
+        self.reload = reload
+        self._signature = None
+        self.assets: Dict[str, Asset] = {}
+
+    def _scan(self) -> Dict[str, str]:
+        """Relative URL path -> filesystem path of every file under the root."""
+        files = {}
+        for directory, _dirnames, filenames in os.walk(self.root):
+            for filename in filenames:
+                full_path = os.path.join(directory, filename)
+                files[os.path.relpath(full_path, self.root).replace(os.sep, "/")] = full_path
+        return files
+
+    def _current_signature(self, files: Dict[str, str]):
+        return tuple(sorted((path, os.stat(full_path).st_mtime_ns) for path, full_path in files.items()))
+
+    def load(self) -> None:
+        """Read, hash and precompress every file; HTML last so it can reference the others' hashes."""
+        files = self._scan()
+        raw = {}
+        for path, full_path in files.items():
+            with open(full_path, "rb") as handle:
+                raw[path] = handle.read()
+
+        assets = {path: _build_asset(path, data) for path, data in raw.items() if not path.endswith(".html")}
+        pages = {
+            path: _build_asset(path, self._rewrite_html(path, data, assets))
+            for path, data in raw.items() if path.endswith(".html")
+        }
+        assets.update(pages)
+        self.assets = assets
+        self._signature = self._current_signature(files) if self.reload else None
+
+    def _rewrite_html(self, page_path: str, html: bytes, assets: Dict[str, Asset]) -> bytes:
+        """Append ``?v=<hash>`` to a page's references to non-HTML assets."""
+        page_dir = posixpath.dirname(page_path)
+
+        def versioned(match):
+            reference = match.group(2)
+            asset = assets.get(self._resolve(page_dir, reference))
+            if asset is None:
+                return match.group(0)
+            return f"{match.group(1)}{reference}?v={asset.etag}{match.group(3)}"
+
+        try:
+            text = html.decode("utf-8")
+        except UnicodeDecodeError:
+            return html
+        return _REFERENCE_PATTERN.sub(versioned, text).encode("utf-8")
+
+    @staticmethod
+    def _resolve(page_dir: str, reference: str) -> str:
+        if reference.startswith("/"):
+            path = posixpath.normpath(reference.lstrip("/"))
+        else:
+            path = posixpath.normpath(posixpath.join(page_dir, reference))
+        # Pages also reach assets through the /frontend/ URL prefix
+        return path[len("frontend/"):] if path.startswith("frontend/") else path
+
+    def _refresh_if_changed(self) -> None:
+        if self._current_signature(self._scan()) != self._signature:
+            self.load()
+
+    def get(self, path: str) -> Optional[Asset]:
+        if self.reload:
+            self._refresh_if_changed()
+        return self.assets.get(path)
+
+    def lookup(self, path: str) -> Optional[str]:
+        """Manifest path for a request path, with the client-side route fallback, or None for a 404."""
+        path = path.strip("/") or "index.html"
+        if self.get(path) is not None:
+            return path
+        if not posixpath.splitext(path)[1] and self.get("index.html") is not None:
+            return "index.html"
+        return None
+
+    def response(self, path: str, request) -> Optional[Response]:
+        """Response for a request path, or None if no asset matches."""
+        path = self.lookup(path)
+        if path is None:
+            return None
+        asset = self.assets[path]
+
+        encoding = compression.choose_encoding(request.accept_encodings)
+        if encoding not in asset.bodies:
+            encoding = "gzip" if "gzip" in asset.bodies and request.accept_encodings["gzip"] else "identity"
+        etag = asset.etag if encoding == "identity" else f"{asset.etag}-{encoding}"
+
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = Response(asset.bodies[encoding], content_type=asset.content_type)
+            if encoding != "identity":
+                response.headers["Content-Encoding"] = encoding
+        response.set_etag(etag)
+        response.vary.add("Accept-Encoding")
+        versioned = request.args.get("v") == asset.etag and not path.endswith(".html")
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if versioned else REVALIDATE_CACHE_CONTROL
+        return response
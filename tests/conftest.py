@@ -0,0 +1,57 @@
+"""Shared setup: a throwaway SQLite database and the in-memory R2 stand-in.
+
+The environment is set before anything imports ``config``, so the app under
+test never talks to the real bucket or database.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from bench import fake_r2  # noqa: E402
+
+_workdir = tempfile.mkdtemp(prefix="faceapp-tests-")
+_r2_server, _r2_store = fake_r2.start(0)
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(_workdir, 'test.db')}",
+    R2_ENDPOINT_URL=f"http://127.0.0.1:{_r2_server.server_address[1]}",
+    R2_BUCKET_NAME="test",
+    R2_PUBLIC_BASE_URL=fake_r2.public_url(_r2_server, "test"),
+    IMAGE_POOL_WORKERS="0",
+)
+
+
+@pytest.fixture(scope="session")
+def r2_store():
+    return _r2_store
+
+
+@pytest.fixture(scope="session")
+def app_module():
+    import app
+    import db
+
+    db.init_db()
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def as_user(app_module, monkeypatch):
+    """Authenticate every request as ``(username, role)``."""
+
+    def login(username, role="photographer"):
+        monkeypatch.setattr(app_module, "verify_token", lambda _token: {"sub": username, "role": role})
+        return {"Authorization": "Bearer test"}
+
+    return login
@@ -0,0 +1,47 @@
+"""``import app`` stays fast and builds no clients (see bench/import_time.py)."""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from bench.import_time import DEFAULT_BUDGET_MS, REPO_ROOT
+
+_PROBE = """
+import json
+import app, models, r2_storage
+print(json.dumps({
+    "r2_client": r2_storage._client is not None,
+    "db_engine": models.db_config._engine is not None,
+    "static_manifest": bool(app.static_assets.assets),
+}))
+"""
+
+
+def _import_app():
+    """Import the app in a fresh interpreter; returns ``(import_ms, side_effects)``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE],
+        cwd=REPO_ROOT, env=dict(os.environ), check=True, capture_output=True, text=True,
+    )
+    # "import time: <self us> | <cumulative us> | <module>"; the app's own line
+    # covers everything it imported
+    cumulative_us = next(
+        int(line.split("|")[1])
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:") and line.split("|")[2].strip() == "app"
+    )
+    return cumulative_us / 1000, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_builds_no_clients():
+    _import_ms, side_effects = _import_app()
+    assert side_effects == {"r2_client": False, "db_engine": False, "static_manifest": False}
+
+
+def test_import_time_within_budget():
+    # The first run also warms the bytecode cache
+    _import_app()
+    import_ms = statistics.median(_import_app()[0] for _ in range(3))
+    assert import_ms <= DEFAULT_BUDGET_MS, f"import app took {import_ms:.0f} ms, budget {DEFAULT_BUDGET_MS} ms"
@@ -0,0 +1,62 @@
+"""Round-trips per request on paths that used to open a session per helper."""
+
+import uuid
+
+import db
+
+
+def _photographer():
+    username = f"p_{uuid.uuid4().hex[:8]}"
+    db.add_user(username, "pw", "photographer", None)
+    return username
+
+
+def _attendees(count):
+    users = [{"username": f"a_{uuid.uuid4().hex[:8]}", "password": "pw", "role": "attendee"} for _ in range(count)]
+    db.add_users_bulk(users)
+    return [user["username"] for user in users]
+
+
+def test_create_album_uses_one_connection(client, as_user):
+    username = _photographer()
+    headers = as_user(username)
+
+    with db.count_queries() as counter:
+        response = client.post("/api/create-album", json={"name": "Wedding"}, headers=headers)
+
+    assert response.status_code == 201
+    assert counter.checkouts == 1
+    assert counter.statements == 4
+
+
+def test_zombie_album_retry_uses_one_connection(client, as_user):
+    username = _photographer()
+    headers = as_user(username)
+    # In the database but with nothing in R2
+    assert db.add_album(username, "reception", "Reception")[0]
+
+    with db.count_queries() as counter:
+        response = client.post("/api/create-album", json={"name": "Reception"}, headers=headers)
+
+    assert response.status_code == 201
+    assert counter.checkouts == 1
+    assert counter.statements == 12
+
+
+def test_bulk_grant_query_count_does_not_grow_with_rows(client, as_user):
+    username = _photographer()
+    headers = as_user(username)
+    assert db.add_album(username, "party", "Party")[0]
+
+    counts = []
+    for size in (3, 30):
+        usernames = _attendees(size) + ["missing-user"]
+        with db.count_queries() as counter:
+            response = client.post(
+                "/api/grant-access/bulk", json={"album_id": "party", "usernames": usernames}, headers=headers
+            )
+        assert response.status_code == 200
+        assert counter.checkouts == 1
+        counts.append(counter.statements)
+
+    assert counts[0] == counts[1] == 4